@@ -0,0 +1,104 @@
+import hashlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+# Reads from Postgres may change at any moment: browsers keep a copy but always revalidate it
+CACHE_CONTROL_PRIVADO = "private, no-cache"
+# Errors and degraded bodies (an upstream was down, the data is partial) must not be kept by anyone
+CACHE_CONTROL_DEGRADADO = "no-store"
+
+
+def cache_http(ttl: int, stale_while_revalidate: Optional[int] = None):
+    """
+    Mark a GET endpoint as publicly cacheable for `ttl` seconds (browser and
+    Vercel's edge via s-maxage). Past the TTL the edge may keep serving the old
+    copy for `stale_while_revalidate` seconds (default: ttl) while it refreshes.
+    Apply it below the @router.get decorator; CacheHTTPMiddleware reads it.
+    The policy only covers 200 responses: errors get CACHE_CONTROL_DEGRADADO,
+    and so should a 200 the endpoint knows is degraded (set it on the
+    response to override the public policy).
+    """
+    swr = ttl if stale_while_revalidate is None else stale_while_revalidate
+    valor = f"public, max-age={ttl}, s-maxage={ttl}, stale-while-revalidate={swr}"
+
+    def decorar(endpoint):
+        endpoint.__cache_control__ = valor
+        return endpoint
+    return decorar
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/"x" and "x" match each other."""
+    if not if_none_match:
+        return False
+    etiquetas = [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+    return "*" in etiquetas or etag.removeprefix("W/") in etiquetas
+
+
+class CacheHTTPMiddleware:
+    """
+    For successful GETs: set Cache-Control from the endpoint's @cache_http
+    (CACHE_CONTROL_PRIVADO otherwise), add a strong ETag hashed from the body
+    unless the endpoint set its own, and answer 304 Not Modified when the
+    client's If-None-Match already has it. Streaming responses pass through
+    untouched since their body is not known up front. Errors (4xx/5xx) from a
+    @cache_http endpoint get CACHE_CONTROL_DEGRADADO, so an edge never keeps
+    an error, and a 200 the endpoint marked no-store gets no ETag either.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        inicio = None
+
+        async def enviar(message):
+            nonlocal inicio
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                # Held back until the body shows whether it is complete
+                inicio = message
+                return
+            if message["type"] == "http.response.start" and message["status"] >= 400 and hasattr(scope.get("endpoint"), "__cache_control__"):
+                headers = MutableHeaders(scope=message)
+                if "cache-control" not in headers:
+                    headers["cache-control"] = CACHE_CONTROL_DEGRADADO
+            if message["type"] != "http.response.body" or inicio is None:
+                await send(message)
+                return
+
+            if message.get("more_body", False):
+                await send(inicio)
+                await send(message)
+                inicio = None
+                return
+
+            headers = MutableHeaders(scope=inicio)
+            if "cache-control" not in headers:
+                endpoint = scope.get("endpoint")
+                headers["cache-control"] = getattr(endpoint, "__cache_control__", CACHE_CONTROL_PRIVADO)
+            if "no-store" in headers["cache-control"]:
+                await send(inicio)
+                await send(message)
+                inicio = None
+                return
+            etag = headers.get("etag")
+            if etag is None:
+                etag = headers["etag"] = '"' + hashlib.sha256(message.get("body", b"")).hexdigest()[:32] + '"'
+
+            if etag_coincide(if_none_match, etag):
+                del headers["content-length"]
+                del headers["content-type"]
+                await send({**inicio, "status": 304})
+                await send({"type": "http.response.body", "body": b""})
+            else:
+                await send(inicio)
+                await send(message)
+            inicio = None
+
+        await self.app(scope, receive, enviar)
@@ -0,0 +1,130 @@
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Already compressed or binary formats gain nothing from a second pass
+_TIPOS_COMPRIMIBLES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def _comprimible(content_type: Optional[str]) -> bool:
+    return content_type is not None and content_type.startswith(_TIPOS_COMPRIMIBLES)
+
+
+def _elegir_codificacion(accept_encoding: str) -> Optional[str]:
+    aceptadas = set()
+    for parte in accept_encoding.split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        if parametros.replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        aceptadas.add(nombre.strip().lower())
+    if brotli is not None and "br" in aceptadas:
+        return "br"
+    if "gzip" in aceptadas:
+        return "gzip"
+    return None
+
+
+class _Compresor:
+    """Incremental gzip/Brotli encoder; flush() after every chunk keeps streams flowing."""
+
+    def __init__(self, codificacion: str, gzip_level: int, brotli_quality: int):
+        self.codificacion = codificacion
+        if codificacion == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, data: bytes, final: bool) -> bytes:
+        if self.codificacion == "br":
+            salida = self._br.process(data)
+            return salida + (self._br.finish() if final else self._br.flush())
+        salida = self._gz.compress(data)
+        return salida + self._gz.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompresionMiddleware:
+    """
+    Brotli (when the brotli package is installed and the client accepts it) or
+    gzip for text/JSON responses. Complete bodies under `minimum_size` bytes
+    are sent as-is. Streaming responses are compressed chunk by chunk and
+    flushed each time, so they are never buffered; binary and already-encoded
+    responses pass through. A strong ETag becomes weak once the bytes are
+    re-encoded.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        codificacion = _elegir_codificacion(Headers(scope=scope).get("accept-encoding", ""))
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        compresor: Optional[_Compresor] = None
+
+        def preparar_headers(headers: MutableHeaders):
+            headers["content-encoding"] = codificacion
+            headers.add_vary_header("Accept-Encoding")
+            del headers["content-length"]
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["etag"] = "W/" + etag
+
+        async def enviar(message):
+            nonlocal inicio, compresor
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if _comprimible(headers.get("content-type")) and "content-encoding" not in headers:
+                    # Held back until the first chunk shows the body size
+                    inicio = message
+                    return
+                await send(message)
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if compresor is not None:
+                cuerpo = compresor.comprimir(message.get("body", b""), final=not message.get("more_body", False))
+                await send({"type": "http.response.body", "body": cuerpo, "more_body": message.get("more_body", False)})
+                return
+
+            if inicio is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            streaming = message.get("more_body", False)
+            if not streaming and len(body) < self.minimum_size:
+                await send(inicio)
+                await send(message)
+                inicio = None
+                return
+
+            compresor = _Compresor(codificacion, self.gzip_level, self.brotli_quality)
+            headers = MutableHeaders(scope=inicio)
+            preparar_headers(headers)
+            cuerpo = compresor.comprimir(body, final=not streaming)
+            if not streaming:
+                headers["content-length"] = str(len(cuerpo))
+            await send(inicio)
+            await send({"type": "http.response.body", "body": cuerpo, "more_body": streaming})
+            inicio = None
+
+        await self.app(scope, receive, enviar)
@@ -0,0 +1,46 @@
+import functools
+from decimal import Decimal
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+
+def _por_defecto(valor):
+    """Types orjson does not serialize natively."""
+    if isinstance(valor, BaseModel):
+        return valor.model_dump(mode="json")
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (set, frozenset)):
+        return list(valor)
+    raise TypeError(f"Type is not JSON serializable: {type(valor).__name__}")
+
+
+class OrjsonResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson, which serializes datetimes, UUIDs and
+    numpy values natively and is several times faster than json.dumps on
+    large lists. NaN/Infinity become null instead of invalid JSON.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+@functools.lru_cache(maxsize=None)
+def _adaptador(tipo) -> TypeAdapter:
+    return TypeAdapter(tipo)
+
+
+def respuesta_modelo(contenido, tipo=None, status_code: int = 200, headers: dict | None = None) -> Response:
+    """
+    Serialize an already-built response model (or a list[Model] when `tipo`
+    is given) straight to JSON bytes with pydantic's Rust serializer, skipping
+    FastAPI's second validate-and-encode pass over every object.
+    """
+    if tipo is None:
+        contenido_json = contenido.model_dump_json()
+    else:
+        contenido_json = _adaptador(tipo).dump_json(contenido)
+    return Response(content=contenido_json, status_code=status_code, media_type="application/json", headers=headers)
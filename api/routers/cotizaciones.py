@@ -1,54 +1,32 @@
-from datetime import date, datetime, timedelta
+import logging
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Query
 import httpx
-import httpx
-from uvicorn import logging
 
 import models
-from services.cafci import download_cafci_to_memory, get_cafci_data_list, normalize_string
-from services.crypto_service import get_crypto_service
-from services.exchange_service import get_exchange_service
-from services.fci_service import get_fci_service
-from services.instrumento_service import get_instrumento_service
+from api.cache_http import cache_http
+from api.responses import OrjsonResponse
+from services.catalogo_cafci import CatalogoCAFCI, get_catalogo_cafci
+from services.crypto_service import CryptoService, get_crypto_service
+from services.exchange_service import ExchangeService, get_exchange_service
+from services.fci_service import FCIService, get_fci_service
+from services.instrumento_service import InstrumentoService, get_instrumento_service
 from services.yahoo_service import get_current_price_value
 
 router = APIRouter(prefix="/api/cotizaciones", tags=["Cotizaciones"])
+logger = logging.getLogger(__name__)
 
-_COT2_CACHE = None
-_COT2_LIST_CACHE_DURATION = timedelta(hours=24)
-
-_FONDOS_CACHE = {
-    "data": [],
-    "last_updated": None
-}
-
-def load_data_into_cache():
-    """Helper to encapsulate the download and storage logic"""
-    print("🚀 Fetching/Refreshing CAFCI data...")
-    download = download_cafci_to_memory()
-    
-    if download["success"]:
-        global _FONDOS_CACHE
-        _FONDOS_CACHE["data"] = get_cafci_data_list(download["file"])
-        _FONDOS_CACHE["last_updated"] = date.today()
-        print(f"✅ Loaded {len(_FONDOS_CACHE['data'])} funds into memory.")
-    else:
-        print(f"❌ Failed to load CAFCI data: {download['message']}")
-
-def get_fondos():
-    """Access point for the data that checks for expiration"""
-    today = date.today()
-    
-    # If cache is empty OR the date is from a previous day, refresh it
-    if not _FONDOS_CACHE["last_updated"] or _FONDOS_CACHE["last_updated"] < today:
-        load_data_into_cache()
-        
-    return _FONDOS_CACHE["data"]
+# HTTP cache lifetimes follow the TTL of the service behind each route
+_TTL_CRYPTO = int(CryptoService.CACHE_DURATION.total_seconds())
+_TTL_DOLAR = int(ExchangeService.CACHE_DURATION.total_seconds())
+_TTL_INSTRUMENTO = int(InstrumentoService.CACHE_DURATION.total_seconds())
+_TTL_FCI_QUOTE = int(FCIService.CACHE_DURATION.total_seconds())
+_TTL_CATALOGO = int(CatalogoCAFCI.CACHE_DURATION.total_seconds())
 
 
 @router.get("/instrumento/{ticker}", response_model=models.InstrumentoPriceOut)
+@cache_http(_TTL_INSTRUMENTO)
 async def get_instrumento_price(ticker: str):
     """
     Get the latest price + currency of a financial instrument by scraping the
@@ -71,11 +49,12 @@ async def get_instrumento_price(ticker: str):
 
 
 @router.get("/fci/clase-fondos", response_model=models.ClaseFondoSearchOut)
+@cache_http(_TTL_CATALOGO)
 async def search_clase_fondos(
     id: Optional[str] = Query(None, description="Optional exact clase_fondo id."),
-    nombre: Optional[str] = Query(None, description="Optional comma-separated keywords. Each must appear in the clase_fondo's `nombre` (case-insensitive)."),
+    nombre: Optional[str] = Query(None, description="Optional comma-separated keywords. Each must appear in the clase_fondo's `nombre` (ignoring case and accents)."),
     fondoId: Optional[str] = Query(None, description="Optional parent fondo id (matches `clase_fondo.fondoId`)."),
-    clear_cache: bool = Query(False, description="If true, refresh the CAFCI catalog cache (24h) and this search's result cache before searching."),
+    clear_cache: bool = Query(False, description="If true, refresh the CAFCI catalog cache (24h) before searching."),
     log: bool = Query(False, description="If true, log internal HTTP calls and inputs/outputs."),
 ):
     """
@@ -106,10 +85,11 @@ async def search_clase_fondos(
 
 
 @router.get("/fci/search", response_model=models.FCISearchOut)
+@cache_http(_TTL_CATALOGO)
 async def search_fcis(
     codigo_cnv: Optional[str] = Query(None, description="Optional exact CNV code."),
-    nombre: Optional[str] = Query(None, description="Optional comma-separated keywords. Each must appear in the fund's `nombre` (case-insensitive)."),
-    clear_cache: bool = Query(False, description="If true, refresh the CAFCI catalog cache (24h) and this search's result cache before searching."),
+    nombre: Optional[str] = Query(None, description="Optional comma-separated keywords. Each must appear in the fund's `nombre` (ignoring case and accents)."),
+    clear_cache: bool = Query(False, description="If true, refresh the CAFCI catalog cache (24h) before searching."),
     log: bool = Query(False, description="If true, log internal HTTP calls and inputs/outputs."),
 ):
     """
@@ -141,6 +121,7 @@ async def search_fcis(
 
 
 @router.get("/fci/{fondo_id}/{clase_id}", response_model=models.FCIQuoteOut)
+@cache_http(_TTL_FCI_QUOTE)
 async def get_fci_quote(fondo_id: str, clase_id: str, log: bool = Query(False, description="If true, log internal HTTP calls and inputs/outputs.")):
     """
     Get the latest quote for a mutual fund (FCI) from CAFCI.
@@ -165,10 +146,11 @@ async def get_fci_quote(fondo_id: str, clase_id: str, log: bool = Query(False, d
 
 
 @router.get("2/fci/search", response_model=models.FCINamesOut, tags=["Cotizaciones2"])
+@cache_http(_TTL_CATALOGO)
 async def cotizaciones2_search_fcis(
     codigo_cnv: Optional[str] = Query(None, description="Optional exact CNV code."),
-    nombre: Optional[str] = Query(None, description="Optional comma-separated keywords. Each must appear in the fondo's or clase's `nombre` (case-insensitive)."),
-    clear_cache: bool = Query(False, description="If true, refresh the 24h cached estadisticas JSON."),
+    nombre: Optional[str] = Query(None, description="Optional comma-separated keywords. Each must appear in the fondo's or clase's `nombre`, ignoring case and accents."),
+    clear_cache: bool = Query(False, description="If true, reload the 24h cached CAFCI catalog."),
     log: bool = Query(False, description="If true, log HTTP call info and counts."),
 ):
     """
@@ -180,74 +162,16 @@ async def cotizaciones2_search_fcis(
         raise HTTPException(status_code=400, detail="at least one of codigo_cnv or nombre must be provided")
 
     try:
-        # try to use cached fondos list
-        global _COT2_CACHE
-        fondos = None
-        if not clear_cache and _COT2_CACHE is not None:
-            ts, cached_fondos = _COT2_CACHE
-            if datetime.now() - ts < _COT2_LIST_CACHE_DURATION:
-                fondos = cached_fondos
-                if log:
-                    logging.getLogger(__name__).info(f"Cotizaciones2 cache hit -> {len(fondos)} fondos")
-
-        if fondos is None:
-            url = "https://estadisticas.cafci.org.ar/consulta-de-fondos.json"
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                resp = await client.get(url)
-                if log:
-                    logging.getLogger(__name__).info(f"GET {url} -> status={resp.status_code}, bytes={len(resp.content) if resp.content is not None else 0}")
-            if resp.status_code >= 400:
-                raise HTTPException(status_code=503, detail=f"Error fetching CAFCI estadisticas: status {resp.status_code}")
-
-            resp_json = resp.json()
-            data = resp_json.get("Response", {}).get("json", resp_json)
-            fondos = data.get("fondos", []) or []
-            _COT2_CACHE = (datetime.now(), fondos)
-
-        results = []
-        keywords = [kw.strip().lower() for kw in (nombre or "").split(",") if kw.strip()]
-
-        for fondo in fondos:
-            fondo_id = fondo.get("id")
-            codigo = fondo.get("codigo_cnv") or fondo.get("codigoCNV") or fondo.get("codigoCnv")
-            fondo_nombre = (fondo.get("nombre") or "")
-            moneda_obj = fondo.get("moneda")
-            if isinstance(moneda_obj, dict):
-                moneda = moneda_obj.get("nombre") or str(moneda_obj.get("id", ""))
-            elif moneda_obj is None:
-                moneda = None
-            else:
-                moneda = str(moneda_obj)
-            clases = fondo.get("clases") or []
-
-            # If codigo_cnv provided and doesn't match, skip entire fondo
-            if codigo_cnv and (codigo is None or str(codigo).strip() != codigo_cnv.strip()):
-                continue
-
-            for clase in clases:
-                clase_id = clase.get("id")
-                clase_nombre = (clase.get("nombre") or "")
-
-                # keyword matching: match if ALL keywords appear in fondo.nombre OR in clase.nombre
-                if keywords:
-                    match_fondo = fondo_nombre and all(k in fondo_nombre.lower() for k in keywords)
-                    match_clase = clase_nombre and all(k in clase_nombre.lower() for k in keywords)
-                    if not (match_fondo or match_clase):
-                        continue
-
-                results.append({
-                    "fondo_id": str(fondo_id) if fondo_id is not None else "",
-                    "codigo_cnv": codigo,
-                    "fondo_nombre": fondo.get("nombre"),
-                    "fondo_moneda": moneda,
-                    "clase_id": str(clase_id) if clase_id is not None else "",
-                    "clase_nombre": clase.get("nombre"),
-                })
-
+        keywords = [kw.strip() for kw in (nombre or "").split(",") if kw.strip()]
+        results = await get_catalogo_cafci().search_clases(
+            codigo_cnv=(codigo_cnv or "").strip(), keywords=keywords, refresh=clear_cache, log=log
+        )
         if log:
-            logging.getLogger(__name__).info(f"Cotizaciones2 returned {len(results)} entries")
+            logger.info(f"Cotizaciones2 returned {len(results)} entries")
 
         return {"fcis": results}
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=f"Error fetching CAFCI estadisticas: {str(e)}")
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail=f"Error fetching CAFCI estadisticas: {str(e)}")
     except Exception as e:
@@ -270,6 +194,7 @@ async def yahoo_price(symbol: str):
     }
 
 @router.get("/dolar", response_model=list[models.DolarOut])
+@cache_http(_TTL_DOLAR)
 async def get_all_dolar_rates():
     """Get all USD/ARS exchange rates from DolarAPI"""
     try:
@@ -294,6 +219,7 @@ async def get_all_dolar_rates():
 
 
 @router.get("/dolar/{tipo}", response_model=models.DolarOut)
+@cache_http(_TTL_DOLAR)
 async def get_dolar_especifico(tipo: str):
     """
     Get specific USD/ARS exchange rate from DolarAPI
@@ -309,6 +235,7 @@ async def get_dolar_especifico(tipo: str):
 
 
 @router.get("/crypto/{crypto_id}", response_model=models.CryptoOut)
+@cache_http(_TTL_CRYPTO)
 async def get_crypto_price(crypto_id: str):
     """
     Get cryptocurrency price in USD and ARS from CoinGecko
@@ -324,6 +251,7 @@ async def get_crypto_price(crypto_id: str):
 
 
 @router.get("/crypto/top/{limit}", response_model=list[models.CryptoTopOut])
+@cache_http(_TTL_CRYPTO)
 async def get_top_cryptos(
     limit: int = 10,
     vs_currency: str = Query("usd", description="Currency: usd, ars, eur, etc.")
@@ -337,25 +265,21 @@ async def get_top_cryptos(
         raise HTTPException(status_code=500, detail=f"Error fetching top cryptos: {str(e)}")
 
 @router.get("/fondos")
+@cache_http(_TTL_CATALOGO)
 async def search_fondos(
     names: Optional[str] = Query(None, description="Comma-separated keywords"),
     codigo_cnv: Optional[int] = None,
     codigo_cafci: Optional[int] = None
 ):
-    results = get_fondos()
-
-    if names:
-        keywords = [normalize_string(k.strip()) for k in names.split(",") if k.strip()]
-        results = [
-            f for f in results 
-            if all(kw in normalize_string(f["nombre"]) for kw in keywords)
-        ]
-
-    if codigo_cnv is not None:
-        results = [f for f in results if f["codigo_cnv"] == codigo_cnv]
-
-    if codigo_cafci is not None:
-        results = [f for f in results if f["codigo_cafci"] == codigo_cafci]
+    keywords = [k.strip() for k in (names or "").split(",") if k.strip()]
+    try:
+        results = await get_catalogo_cafci().search_precios(
+            keywords=keywords, codigo_cnv=codigo_cnv, codigo_cafci=codigo_cafci
+        )
+    except ConnectionError as e:
+        logger.warning(f"/fondos: CAFCI workbook unavailable: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
 
-    return results
+    # Plain dicts of str/float/int: skip jsonable_encoder's walk over thousands of fondos
+    return OrjsonResponse(results)
 
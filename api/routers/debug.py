@@ -0,0 +1,34 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from api.routers.drive import require_api_key
+from services.cache import cache_stats, get_cache
+
+
+router = APIRouter(prefix="/api/debug", tags=["Debug"], dependencies=[Depends(require_api_key)])
+
+
+@router.get("/cache")
+async def inspect_cache(
+    namespace: Optional[str] = Query(None, description="Only this cache (exchange, crypto, instrumento, fci, cafci_catalogo)."),
+    keys: bool = Query(False, description="If true, also list the cached keys of `namespace` with age, size and reads."),
+):
+    """
+    Stats of the service quote caches: hits, stale hits, misses, evictions,
+    expirations, entries and bytes per namespace, plus the single-flight
+    counters and the shared backend in use. Service caches are created with
+    their service, so those namespaces only show up once something has used
+    them in this instance.
+    """
+    stats = cache_stats()
+    if namespace is None:
+        if keys:
+            raise HTTPException(status_code=400, detail="keys=true requires a namespace")
+        return stats
+    if namespace not in stats:
+        raise HTTPException(status_code=404, detail=f"Unknown cache namespace '{namespace}'")
+    resultado = {namespace: stats[namespace]}
+    if keys:
+        resultado[namespace]["keys"] = get_cache(namespace).keys()
+    return resultado
@@ -1,82 +1,221 @@
 from typing import Optional, Union
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
 from models import CategoriaOut, CategoriasCrear, SubcategoriaOut, CategoriaBasicOut
 
 import db
+import db_async
+from api.cache_http import CACHE_CONTROL_PRIVADO, etag_coincide
+from api.responses import respuesta_modelo
+import exportar
+import importar
 import models
 
-from db import (
+from db_async import (
+    obtener_catalogo,
     obtener_categoria_por_id,
-    obtener_categorias,
-    obtener_subcategorias,
 )
-from structure import CategoriaDeletionError, SubcategoriaDeletionError
+from structure import CategoriaDeletionError, InvalidCursorError, InvalidQueryParamError, SubcategoriaDeletionError
 
 router = APIRouter()
 
 
 @router.post("/api/movimientos-gasto",  response_model=models.MovimientoGastoSearchResults, tags=["Movimiento Gasto"])
-def buscar_movimientos_gasto(params: models.MovimientoGastoQueryParams):
-    movimientos = db.obtener_movimientos_gasto(
-        id=params.id,
+async def buscar_movimientos_gasto(params: models.MovimientoGastoQueryParams):
+    try:
+        movimientos = await db_async.obtener_movimientos_gasto(
+            id=params.id,
+            categoriaIds=params.categoriaIds,
+            subcategoriaIds=params.subcategoriaIds,
+            detalleSubcategoriaIds=params.detalleSubcategoriaIds,
+            tiposDePago=params.tiposDePago,
+            active=params.active,
+            monto_min=params.monto_min,
+            monto_max=params.monto_max,
+            comentarios=params.comentarios,
+            comentarios_modo=params.comentarios_modo,
+            desde_fecha=params.desde_fecha,
+            hasta_fecha=params.hasta_fecha,
+            page_size=params.page_size,
+            page_number=params.page_number,
+            sort_by=params.sort_by,
+            sort_direction=params.sort_direction,
+            pagination_mode=params.pagination_mode,
+            cursor=params.cursor,
+            total_mode=params.total_mode,
+            load_mode=params.load_mode,
+        )
+    except (InvalidCursorError, InvalidQueryParamError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return respuesta_modelo(movimientos)
+
+@router.post("/api/movimientos-gasto/resumen", response_model=models.MovimientoGastoResumenOut, tags=["Movimiento Gasto"])
+async def resumir_movimientos_gasto(params: models.MovimientoGastoResumenParams):
+    try:
+        grupos = await db_async.obtener_resumen_movimientos_gasto(
+            group_by=params.group_by,
+            periodo=params.periodo,
+            id=params.id,
+            categoriaIds=params.categoriaIds,
+            subcategoriaIds=params.subcategoriaIds,
+            detalleSubcategoriaIds=params.detalleSubcategoriaIds,
+            tiposDePago=params.tiposDePago,
+            active=params.active,
+            monto_min=params.monto_min,
+            monto_max=params.monto_max,
+            comentarios=params.comentarios,
+            comentarios_modo=params.comentarios_modo,
+            desde_fecha=params.desde_fecha,
+            hasta_fecha=params.hasta_fecha,
+        )
+    except (InvalidCursorError, InvalidQueryParamError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"grupos": grupos}
+
+@router.post("/api/movimientos-gasto/resumen-mensual", response_model=models.MovimientoGastoResumenOut, tags=["Movimiento Gasto"])
+async def resumen_mensual_movimientos_gasto(params: models.ResumenMensualParams):
+    grupos = await db_async.obtener_resumen_mensual(
         categoriaIds=params.categoriaIds,
         subcategoriaIds=params.subcategoriaIds,
-        detalleSubcategoriaIds=params.detalleSubcategoriaIds,
         tiposDePago=params.tiposDePago,
-        active=params.active,
-        monto_min=params.monto_min,
-        monto_max=params.monto_max,
-        comentarios=params.comentarios,
-        desde_fecha=params.desde_fecha,
-        hasta_fecha=params.hasta_fecha,
-        page_size=params.page_size,
-        page_number=params.page_number,
-        sort_by=params.sort_by,
-        sort_direction=params.sort_direction,
+        desde_mes=params.desde_mes,
+        hasta_mes=params.hasta_mes,
     )
-    return movimientos
+    return {"grupos": grupos}
+
+@router.post("/api/movimientos-gasto/importar", response_model=models.MovimientoGastoImportOut, tags=["Movimiento Gasto"])
+def importar_movimientos_gasto(archivo: UploadFile = File(...)):
+    """
+    Bulk-create movimientos from a CSV or XLSX file whose header row names the
+    columns fecha, subcategoriaId, detalleSubcategoriaId, tipoDePago, monto and
+    comentarios. Valid rows are inserted; invalid ones are returned in `errores`.
+    """
+    try:
+        filas = importar.leer_filas(archivo.filename, archivo.file)
+        return db.importar_movimientos_gasto(filas)
+    except importar.FormatoImportacionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+def _respuesta_exportacion(formato: str, nombre: str, columnas, lotes) -> StreamingResponse:
+    if formato not in exportar.FORMATOS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid formato '{formato}', expected one of {', '.join(exportar.FORMATOS)}")
+    try:
+        contenido = exportar.stream_exportacion(formato, columnas, lotes)
+    except exportar.ExportacionNoDisponibleError as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    headers = {"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'}
+    return StreamingResponse(contenido, media_type=exportar.FORMATOS[formato], headers=headers)
+
+@router.post("/api/movimientos-gasto/exportar", tags=["Movimiento Gasto"])
+def exportar_movimientos_gasto(params: models.MovimientoGastoFiltros, formato: str = Query("csv", description="csv, xlsx or parquet")):
+    """Stream every movimiento matching the filters as CSV, XLSX or Parquet, newest first."""
+    try:
+        lotes = db.iterar_movimientos_gasto(
+            id=params.id,
+            categoriaIds=params.categoriaIds,
+            subcategoriaIds=params.subcategoriaIds,
+            detalleSubcategoriaIds=params.detalleSubcategoriaIds,
+            tiposDePago=params.tiposDePago,
+            active=params.active,
+            monto_min=params.monto_min,
+            monto_max=params.monto_max,
+            comentarios=params.comentarios,
+            comentarios_modo=params.comentarios_modo,
+            desde_fecha=params.desde_fecha,
+            hasta_fecha=params.hasta_fecha,
+        )
+    except (InvalidCursorError, InvalidQueryParamError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return _respuesta_exportacion(formato, "movimientos-gasto", db.COLUMNAS_EXPORT_MOVIMIENTOS, lotes)
+
+@router.post("/api/vencimientos/exportar", tags=["Vencimientos"])
+def exportar_vencimientos(params: models.VencimientoFiltros, formato: str = Query("csv", description="csv, xlsx or parquet")):
+    """Stream every vencimiento matching the filters as CSV, XLSX or Parquet, oldest first."""
+    try:
+        lotes = db.iterar_vencimientos(
+            id=params.id,
+            categoriaIds=params.categoriaIds,
+            subcategoriaIds=params.subcategoriaIds,
+            esAnual=params.esAnual,
+            fechaConfirmada=params.fechaConfirmada,
+            pagado=params.pagado,
+            active=params.active,
+            monto_min=params.monto_min,
+            monto_max=params.monto_max,
+            comentarios=params.comentarios,
+            comentarios_modo=params.comentarios_modo,
+            desde_fecha=params.desde_fecha,
+            hasta_fecha=params.hasta_fecha,
+        )
+    except (InvalidCursorError, InvalidQueryParamError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return _respuesta_exportacion(formato, "vencimientos", db.COLUMNAS_EXPORT_VENCIMIENTOS, lotes)
 
 @router.post("/api/vencimientos", response_model=models.VencimientoSearchResults, tags=["Vencimientos"])
-def buscar_vencimientos(params: models.VencimientoQueryParams):
+async def buscar_vencimientos(params: models.VencimientoQueryParams):
     if not params.model_fields_set:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="At least one query parameter must be provided"
         )
-    vencimientos = db.obtener_vencimientos(
-        id=params.id,
-        categoriaIds=params.categoriaIds,
-        subcategoriaIds=params.subcategoriaIds,
-        esAnual=params.esAnual,
-        fechaConfirmada=params.fechaConfirmada,
-        pagado=params.pagado,
-        active=params.active,
-        monto_min=params.monto_min,
-        monto_max=params.monto_max,
-        comentarios=params.comentarios,
-        desde_fecha=params.desde_fecha,
-        hasta_fecha=params.hasta_fecha,
-        page_size=params.page_size,
-        page_number=params.page_number,
-        sort_by=params.sort_by,
-        sort_direction=params.sort_direction,
-    )
-    return vencimientos
+    try:
+        vencimientos = await db_async.obtener_vencimientos(
+            id=params.id,
+            categoriaIds=params.categoriaIds,
+            subcategoriaIds=params.subcategoriaIds,
+            esAnual=params.esAnual,
+            fechaConfirmada=params.fechaConfirmada,
+            pagado=params.pagado,
+            active=params.active,
+            monto_min=params.monto_min,
+            monto_max=params.monto_max,
+            comentarios=params.comentarios,
+            comentarios_modo=params.comentarios_modo,
+            desde_fecha=params.desde_fecha,
+            hasta_fecha=params.hasta_fecha,
+            page_size=params.page_size,
+            page_number=params.page_number,
+            sort_by=params.sort_by,
+            sort_direction=params.sort_direction,
+            total_mode=params.total_mode,
+            load_mode=params.load_mode,
+        )
+    except (InvalidCursorError, InvalidQueryParamError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return respuesta_modelo(vencimientos)
+
+def _catalogo_no_modificado(request: Request, response: Response, etag: str) -> bool:
+    """Set the catalog ETag on the response and tell whether the client's copy is still current."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL_PRIVADO
+    return etag_coincide(request.headers.get("if-none-match"), etag)
 
 @router.get("/api/categorias", response_model=list[models.CategoriaOut], tags=["Categoría"])
-def get_categorias(
+async def get_categorias(
+    request: Request,
+    response: Response,
     id: Optional[UUID] = Query(None), 
     nombre: Optional[str] = Query(None),
-    active: Optional[bool] = Query(None)
+    active: Optional[bool] = Query(None),
+    nombre_modo: Optional[str] = Query("contains", description='"contains" (substring) or "fts" (Spanish full-text, accent-insensitive)')
 ):
-    categorias = obtener_categorias(id=id, nombre=nombre, active=active)
-    return categorias
+    catalogo = await obtener_catalogo()
+    if _catalogo_no_modificado(request, response, catalogo.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(response.headers))
+    try:
+        if nombre is not None and nombre_modo == "fts":
+            # Stemmed matching needs Postgres, so this one skips the in-memory catalog
+            categorias = await db_async.obtener_categorias(id=id, nombre=nombre, active=active, nombre_modo=nombre_modo)
+            return [CategoriaOut.model_validate(c) for c in categorias]
+        return db.filtrar_categorias(catalogo, id=id, nombre=nombre, active=active, nombre_modo=nombre_modo)
+    except InvalidQueryParamError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 @router.get("/api/categoria/{id}", response_model=Union[CategoriaOut, CategoriaBasicOut], tags=["Categoría"])
-def get_categoria(id: UUID, con_hijos: Optional[bool] = Query(None)):
-    categoria = obtener_categoria_por_id(id, con_hijos)
+async def get_categoria(id: UUID, con_hijos: Optional[bool] = Query(None)):
+    categoria = await obtener_categoria_por_id(id, con_hijos)
     if not categoria:
         raise HTTPException(status_code=404, detail="Categoría no encontrada")
 
@@ -87,26 +226,26 @@ def get_categoria(id: UUID, con_hijos: Optional[bool] = Query(None)):
 
 
 @router.put("/api/categoria/{id}", response_model=CategoriaBasicOut, tags=["Categoría"])
-def actualizar_categoria(id: str, categoria: CategoriaBasicOut):
+async def actualizar_categoria(id: str, categoria: CategoriaBasicOut):
     if str(categoria.id).lower() != id.lower():
         raise HTTPException(
             status_code=400,
             detail=f"ID mismatch: path ID is {id}, but body ID is {categoria.id}"
         )
     
-    categoria = db.actualizar_categoria(id, categoria_update=categoria)
+    categoria = await db_async.actualizar_categoria(id, categoria_update=categoria)
     
     return CategoriaBasicOut.model_validate(categoria)
 
 @router.post("/api/categoria", response_model=CategoriaBasicOut, tags=["Categoría"])
-def crear_categoria(categoria: CategoriasCrear):
-    categoria = db.crear_categoria(nombre=categoria.nombre)
+async def crear_categoria(categoria: CategoriasCrear):
+    categoria = await db_async.crear_categoria(nombre=categoria.nombre)
     return CategoriaBasicOut.model_validate(categoria)
 
 @router.delete("/api/categoria/{id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Categoría"])
-def eliminar_categoria(id: UUID, eliminar_subcategorias: Optional[bool] = Query(None)):
+async def eliminar_categoria(id: UUID, eliminar_subcategorias: Optional[bool] = Query(None)):
     try:
-        db.eliminar_categoria(id, eliminar_subcategorias=eliminar_subcategorias)
+        await db_async.eliminar_categoria(id, eliminar_subcategorias=eliminar_subcategorias)
     except CategoriaDeletionError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -114,36 +253,48 @@ def eliminar_categoria(id: UUID, eliminar_subcategorias: Optional[bool] = Query(
 
 
 @router.post("/api/subcategoria", response_model=models.SubcategoriaBasicOut, tags=["Subcategoría"])
-def crear_subcategoria(subcategoria: models.SubcategoriaCrear):
-    subcategoria = db.crear_subcategoria(subcategoria=subcategoria)
+async def crear_subcategoria(subcategoria: models.SubcategoriaCrear):
+    subcategoria = await db_async.crear_subcategoria(subcategoria=subcategoria)
     return models.SubcategoriaBasicOut.model_validate(subcategoria)
 
 @router.put("/api/subcategoria", response_model=models.SubcategoriaBasicOut, tags=["Subcategoría"])
-def actualizar_subcategoria(subcategoria: models.SubcategoriaBasicOut):
-    subcategoria = db.actualizar_subcategoria(subcategoria=subcategoria)
+async def actualizar_subcategoria(subcategoria: models.SubcategoriaBasicOut):
+    subcategoria = await db_async.actualizar_subcategoria(subcategoria=subcategoria)
     return models.SubcategoriaBasicOut.model_validate(subcategoria)
 
 @router.get("/api/subcategoria/{id}", response_model=models.SubcategoriaOut, tags=["Subcategoría"])
-def get_subcategoria(id: UUID):
-    subcategoria = db.obtener_subcategoria_por_id(id)
+async def get_subcategoria(id: UUID):
+    subcategoria = await db_async.obtener_subcategoria_por_id(id)
     if not subcategoria:
         raise HTTPException(status_code=404, detail="Subcategoria no encontrada")
 
     return models.SubcategoriaOut.model_validate(subcategoria)
 
 @router.get("/api/subcategorias", response_model=list[SubcategoriaOut], tags=["Subcategoría"])
-def get_subcategorias(
+async def get_subcategorias(
+    request: Request,
+    response: Response,
     id: Optional[UUID] = Query(None), 
     nombre: Optional[str] = Query(None),
-    active: Optional[bool] = Query(None)
+    active: Optional[bool] = Query(None),
+    nombre_modo: Optional[str] = Query("contains", description='"contains" (substring) or "fts" (Spanish full-text, accent-insensitive)')
 ):
-    subcategorias = obtener_subcategorias(id=id, nombre=nombre, active=active)
-    return subcategorias
+    catalogo = await obtener_catalogo()
+    if _catalogo_no_modificado(request, response, catalogo.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(response.headers))
+    try:
+        if nombre is not None and nombre_modo == "fts":
+            # Stemmed matching needs Postgres, so this one skips the in-memory catalog
+            subcategorias = await db_async.obtener_subcategorias(id=id, nombre=nombre, active=active, nombre_modo=nombre_modo)
+            return [SubcategoriaOut.model_validate(c) for c in subcategorias]
+        return db.filtrar_subcategorias(catalogo, id=id, nombre=nombre, active=active, nombre_modo=nombre_modo)
+    except InvalidQueryParamError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 @router.delete("/api/subcategoria/{id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Subcategoría"])
-def eliminar_subcategoria(id: UUID):
+async def eliminar_subcategoria(id: UUID):
     try:
-        db.eliminar_subcategoria(id)
+        await db_async.eliminar_subcategoria(id)
     except SubcategoriaDeletionError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+bench_async_db.py
+- Compares the sync db.py helpers run on a threadpool (how plain `def` FastAPI
+  endpoints execute) against the db_async.py helpers awaited on one event loop
+- Fires N concurrent calls of obtener_movimientos_gasto (or obtener_categorias)
+  and reports calls/sec and latency percentiles for each model
+
+Usage: python benchmarks/bench_async_db.py [--concurrency 50] [--requests 500] [--threads 40] [--helper movimientos]
+Needs DATABASE_URL in .env pointing at a Postgres with data. The threadpool
+size defaults to 40, Starlette's default for sync endpoints.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import anyio
+import anyio.to_thread
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import db_async
+
+HELPERS = {
+    "movimientos": lambda modulo: modulo.obtener_movimientos_gasto(page_size=50, sort_by="fecha", sort_direction="desc", total_mode="none"),
+    "categorias": lambda modulo: modulo.obtener_categorias(active=True),
+}
+
+
+async def _medir(llamada, total: int, concurrencia: int) -> tuple[float, list[float]]:
+    latencias = []
+    limite = asyncio.Semaphore(concurrencia)
+
+    async def una():
+        async with limite:
+            inicio = time.perf_counter()
+            await llamada()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una() for _ in range(total)))
+    return time.perf_counter() - inicio, latencias
+
+
+def _reportar(nombre: str, duracion: float, latencias: list[float]):
+    latencias = sorted(latencias)
+    p95 = latencias[int(len(latencias) * 0.95) - 1]
+    print(
+        f"{nombre:<11} {len(latencias) / duracion:8.1f} req/s   "
+        f"p50 {statistics.median(latencias):7.1f} ms   p95 {p95:7.1f} ms   max {latencias[-1]:7.1f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=40)
+    parser.add_argument("--helper", choices=sorted(HELPERS), default="movimientos")
+    args = parser.parse_args()
+
+    helper = HELPERS[args.helper]
+    anyio.to_thread.current_default_thread_limiter().total_tokens = args.threads
+
+    # Warm both pools so connection setup is not part of the measurement
+    await anyio.to_thread.run_sync(helper, db)
+    await helper(db_async)
+
+    print(f"{args.requests} calls of '{args.helper}', {args.concurrency} in flight, "
+          f"pool: {db.database.engine.pool.status()}, threads={args.threads}")
+
+    duracion, latencias = await _medir(lambda: anyio.to_thread.run_sync(helper, db), args.requests, args.concurrency)
+    _reportar("threadpool", duracion, latencias)
+
+    duracion, latencias = await _medir(lambda: helper(db_async), args.requests, args.concurrency)
+    _reportar("asyncpg", duracion, latencias)
+
+    await db_async.database.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+bench_cafci_excel.py
+- Parses the CAFCI daily workbook (/api/cotizaciones/fondos) the way
+  services.cafci did before (pandas read_excel + DataFrame.iterrows with a
+  per-row isnull/try), the same read_excel with vectorized
+  dropna/to_numeric/astype + to_dict('records'), and the way it does now
+  (streaming openpyxl read_only rows, no DataFrame)
+- Reports the best time of several runs and the peak memory allocated
+  (tracemalloc), and checks that every variant returns the same funds
+
+Usage: python benchmarks/bench_cafci_excel.py [--repeticiones 5] [--generar]
+Needs no network: reads benchmarks/datos/cafci_planilla_muestra.xlsx, a
+synthetic workbook with the daily file's layout (header on row 12, the five
+columns the parser uses at A, B, F, S and U, section headings, blank rows and
+a few malformed rows). --generar rewrites it.
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import openpyxl
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.cafci import parse_cafci_workbook
+
+MUESTRA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos", "cafci_planilla_muestra.xlsx")
+SECCIONES = [
+    "Mercado de Dinero Pesos", "Renta Fija Pesos", "Renta Fija Dólar", "Renta Variable Pesos",
+    "Renta Mixta Pesos", "PyMEs", "Infraestructura", "Retorno Total Pesos",
+]
+
+
+def generar_muestra(path: str, fondos_por_seccion: int = 180):
+    rng = random.Random(20260420)
+    libro = openpyxl.Workbook()
+    hoja = libro.active
+    hoja.title = "Planilla Diaria"
+    hoja["A1"] = "Cámara Argentina de Fondos Comunes de Inversión"
+    hoja["A3"] = "Planilla diaria (muestra sintética para benchmarks)"
+    encabezado = [f"Col {i}" for i in range(22)]
+    encabezado[0], encabezado[1], encabezado[5], encabezado[18], encabezado[20] = (
+        "Fondo", "Moneda", "Valor (mil cuotapartes)", "Código CNV", "Código CAFCI",
+    )
+    for columna, titulo in enumerate(encabezado, start=1):
+        hoja.cell(row=12, column=columna, value=titulo)
+
+    codigo = 100
+    for seccion in SECCIONES:
+        hoja.append([])
+        hoja.append([seccion])
+        for i in range(fondos_por_seccion):
+            codigo += 1
+            fila = [None] * 22
+            fila[0] = f"{seccion.split()[0]} Ahorro {codigo} - Clase {'ABC'[i % 3]}"
+            fila[1] = "Dólar" if "Dólar" in seccion else "Peso Argentina"
+            fila[5] = round(rng.uniform(500, 90000000), 3)
+            fila[18] = 1000 + codigo
+            fila[20] = 5000 + codigo
+            for j in (2, 3, 4, 6, 7, 8, 9, 10):
+                fila[j] = round(rng.uniform(-5, 5), 4)
+            hoja.append(fila)
+        # What the parser has to reject: a fund without a price, one with text for a price and one without CAFCI code
+        hoja.append([f"{seccion.split()[0]} Sin Precio", "Peso Argentina", None] + [None] * 15 + [9000 + codigo, None, 9500 + codigo])
+        hoja.append([f"{seccion.split()[0]} Suspendido", "Peso Argentina", None, None, None, "s/d"] + [None] * 12 + [9100 + codigo, None, 9600 + codigo])
+        hoja.append([f"{seccion.split()[0]} Nuevo", "Peso Argentina", None, None, None, 1000.0] + [None] * 12 + [9200 + codigo])
+    libro.save(path)
+
+
+def parse_iterrows(file_buffer):
+    """services.cafci.get_cafci_data_list before the read_only rewrite."""
+    file_buffer.seek(0)
+    df = pd.read_excel(file_buffer, header=11, usecols=[0, 1, 5, 18, 20], engine='openpyxl')
+    df.columns = ['nombre', 'moneda', 'precio_actual', 'codigo_cnv', 'codigo_cafci']
+
+    result_list = []
+    for _, row in df.iterrows():
+        try:
+            if row.isnull().any(): continue
+            result_list.append({
+                "nombre": str(row['nombre']).strip(),
+                "moneda": str(row['moneda']).strip(),
+                "precio_actual": float(row['precio_actual']) / 1000,
+                "codigo_cnv": int(row['codigo_cnv']),
+                "codigo_cafci": int(row['codigo_cafci'])
+            })
+        except: continue
+    return result_list
+
+
+def parse_vectorizado(file_buffer):
+    """read_excel as before, then whole-column dropna/to_numeric/astype instead of iterrows."""
+    file_buffer.seek(0)
+    df = pd.read_excel(file_buffer, header=11, usecols=[0, 1, 5, 18, 20], engine='openpyxl')
+    df.columns = ['nombre', 'moneda', 'precio_actual', 'codigo_cnv', 'codigo_cafci']
+    df = df.dropna()
+    numeros = df[['precio_actual', 'codigo_cnv', 'codigo_cafci']].apply(pd.to_numeric, errors='coerce')
+    validas = numeros.notna().all(axis=1)
+    return pd.DataFrame({
+        'nombre': df['nombre'][validas].astype(str).str.strip(),
+        'moneda': df['moneda'][validas].astype(str).str.strip(),
+        'precio_actual': numeros['precio_actual'][validas].astype(float) / 1000,
+        'codigo_cnv': numeros['codigo_cnv'][validas].astype('int64'),
+        'codigo_cafci': numeros['codigo_cafci'][validas].astype('int64'),
+    }).to_dict('records')
+
+
+def _medir(funcion, contenido: bytes, repeticiones: int) -> tuple[float, float, object]:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(io.BytesIO(contenido))
+        mejor = min(mejor, time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcion(io.BytesIO(contenido))
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return mejor * 1000, pico / 1024 / 1024, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--generar", action="store_true", help="rewrite the sample workbook first")
+    args = parser.parse_args()
+
+    if args.generar or not os.path.exists(MUESTRA):
+        generar_muestra(MUESTRA)
+    with open(MUESTRA, "rb") as f:
+        contenido = f.read()
+
+    ms_iterrows, mib_iterrows, esperado = _medir(parse_iterrows, contenido, args.repeticiones)
+    ms_vectorizado, mib_vectorizado, vectorizado = _medir(parse_vectorizado, contenido, args.repeticiones)
+    ms_streaming, mib_streaming, (fondos, rechazadas) = _medir(parse_cafci_workbook, contenido, args.repeticiones)
+    assert vectorizado == esperado, "vectorized parse differs from iterrows"
+    assert fondos == esperado, "read_only parse differs from iterrows"
+
+    print(f"{os.path.basename(MUESTRA)}: {len(contenido) / 1024:.0f} KiB, {len(fondos)} funds, "
+          f"{len(rechazadas)} rejected, best of {args.repeticiones}")
+    print(f"{'parser':<36} {'ms':>8} {'peak MiB':>9}")
+    print(f"{'read_excel + iterrows (before)':<36} {ms_iterrows:8.1f} {mib_iterrows:9.1f}")
+    print(f"{'read_excel + vectorized':<36} {ms_vectorizado:8.1f} {mib_vectorizado:9.1f}")
+    print(f"{'openpyxl read_only (services.cafci)':<36} {ms_streaming:8.1f} {mib_streaming:9.1f}")
+    for rechazada in rechazadas[:3]:
+        print(f"  rejected row {rechazada['fila']}: {rechazada['nombre']!r} ({rechazada['motivo']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+bench_compresion.py
+- Bytes on the wire for typical responses: uncompressed, gzip and Brotli at the
+  levels CompresionMiddleware uses in main.py, plus the time each encoder takes
+- Payloads: /api/cotizaciones/fondos, /api/cotizaciones2/fci/search,
+  /api/inversiones/instrumentos (50 precios each) and a 500-row movimientos page
+
+Usage: python benchmarks/bench_compresion.py
+Needs no database: payloads are synthetic, built like bench_serializacion.py.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models
+from api.compresion import _Compresor, brotli
+from api.responses import OrjsonResponse, respuesta_modelo
+from bench_serializacion import _fondos, _instrumentos, _movimientos
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+
+def _fci_search(filas: int) -> dict:
+    return {"fcis": [
+        {"fondo_id": str(1000 + i // 3), "codigo_cnv": 500 + i // 3, "fondo_nombre": f"Fondo Renta Fija {i // 3} Pesos",
+         "fondo_moneda": "Peso Argentina", "clase_id": str(4000 + i), "clase_nombre": f"Fondo Renta Fija {i // 3} - Clase {'ABC'[i % 3]}"}
+        for i in range(filas)
+    ]}
+
+
+def _medir(codificacion: str, cuerpo: bytes) -> tuple[int, float]:
+    inicio = time.perf_counter()
+    comprimido = _Compresor(codificacion, GZIP_LEVEL, BROTLI_QUALITY).comprimir(cuerpo, final=True)
+    return len(comprimido), (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    payloads = [
+        ("fondos (3000)", OrjsonResponse(_fondos(3000)).body),
+        ("fci search (2000 clases)", OrjsonResponse(_fci_search(2000)).body),
+        ("instrumentos (40 x 50 precios)", respuesta_modelo(_instrumentos(2000), list[models.InstrumentoOut]).body),
+        ("movimientos (500)", respuesta_modelo(_movimientos(500)).body),
+    ]
+    codificaciones = ["gzip"] + (["br"] if brotli is not None else [])
+
+    print(f"gzip level {GZIP_LEVEL}, brotli quality {BROTLI_QUALITY}" + ("" if brotli else " (brotli not installed)"))
+    print(f"{'payload':<32} {'raw KiB':>8} " + " ".join(f"{c + ' KiB':>9} {'ratio':>6} {'ms':>6}" for c in codificaciones))
+    for nombre, cuerpo in payloads:
+        columnas = []
+        for codificacion in codificaciones:
+            tamano, ms = _medir(codificacion, cuerpo)
+            columnas.append(f"{tamano / 1024:9.1f} {tamano / len(cuerpo):6.1%} {ms:6.1f}")
+        print(f"{nombre:<32} {len(cuerpo) / 1024:8.1f} " + " ".join(columnas))
+
+
+if __name__ == "__main__":
+    main()
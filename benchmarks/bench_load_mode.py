@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+bench_load_mode.py
+- Runs the movimientos-gasto and vencimientos searches with load_mode "orm"
+  (entities plus selectinload/joinedload relationships) and "projection" (one
+  joined SELECT built straight into the response models)
+- Times the db.py call plus the model_dump_json the endpoint does
+  (api.responses.respuesta_modelo), and checks that both modes return the same
+  page
+
+Usage: python benchmarks/bench_load_mode.py [--repeticiones 20] [--page-size 200] [--sort-by fecha]
+Needs DATABASE_URL in .env pointing at a Postgres with data.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+BUSQUEDAS = {
+    "movimientos": db.obtener_movimientos_gasto,
+    "vencimientos": db.obtener_vencimientos,
+}
+
+
+def _medir(funcion, repeticiones: int, **kwargs) -> tuple[list[float], str]:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(**kwargs).model_dump_json()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--sort-by", default="fecha")
+    args = parser.parse_args()
+
+    print(f"page_size={args.page_size}, sort_by={args.sort_by}, {args.repeticiones} runs each")
+    print(f"{'search':<13} {'load_mode':<11} {'p50 ms':>8} {'min ms':>8}")
+    for nombre, funcion in BUSQUEDAS.items():
+        kwargs = dict(page_size=args.page_size, sort_by=args.sort_by, total_mode="none")
+        resultados = {}
+        for load_mode in db.LOAD_MODES:
+            # One warm-up call so connection setup is not part of the measurement
+            funcion(load_mode=load_mode, **kwargs)
+            tiempos, resultados[load_mode] = _medir(funcion, args.repeticiones, load_mode=load_mode, **kwargs)
+            print(f"{nombre:<13} {load_mode:<11} {statistics.median(tiempos):8.1f} {min(tiempos):8.1f}")
+        if resultados["orm"] != resultados["projection"]:
+            print(f"  {nombre}: the two load modes returned different pages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+bench_serializacion.py
+- Serializes 10k-row payloads the way FastAPI's default pipeline does
+  (jsonable_encoder + json.dumps in JSONResponse) and the way the routers do now
+  (respuesta_modelo -> pydantic model_dump_json, OrjsonResponse for plain dicts)
+- Reports the best time of several runs and the peak memory allocated (tracemalloc)
+
+Usage: python benchmarks/bench_serializacion.py [--filas 10000] [--repeticiones 5]
+Needs no database: payloads are synthetic.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models
+from api.responses import OrjsonResponse, respuesta_modelo
+
+
+def _movimientos(filas: int) -> models.MovimientoGastoSearchResults:
+    categoria = models.CategoriaBasicOut(id=uuid.uuid4(), nombre="Hogar", comentarios=None, active=True)
+    subcategorias = [
+        models.SubcategoriaOut(id=uuid.uuid4(), nombre=f"Sub {i}", comentarios=None, categoriaId=categoria.id, active=True, categoria=categoria)
+        for i in range(20)
+    ]
+    inicio = datetime(2020, 1, 1)
+    movimientos = [
+        models.MovimientoGastoOut(
+            id=uuid.uuid4(),
+            subcategoria=subcategorias[i % 20],
+            detalleSubcategoria=None,
+            tipoDePago="Tarjeta de crédito",
+            monto=1000 + i * 1.5,
+            comentarios=f"Compra número {i} en el supermercado",
+            fecha=inicio + timedelta(hours=i),
+            active=True,
+        )
+        for i in range(filas)
+    ]
+    return models.MovimientoGastoSearchResults(total=filas, page_number=1, page_size=filas, movimientos=movimientos)
+
+
+def _instrumentos(filas: int) -> list[models.InstrumentoOut]:
+    # filas precios in total, 50 per instrumento like /api/inversiones/instrumentos
+    inicio = datetime(2024, 1, 1)
+    return [
+        models.InstrumentoOut(
+            id=uuid.uuid4(), nombre=f"Instrumento {i}", codigo=f"COD{i}", tipo="CEDEAR", clase_renta="VARIABLE",
+            moneda="PESO", active=True,
+            precios=[models.PrecioSimple(id=uuid.uuid4(), fecha=inicio + timedelta(days=d), monto=100.0 + d) for d in range(50)],
+        )
+        for i in range(filas // 50)
+    ]
+
+
+def _fondos(filas: int) -> list[dict]:
+    return [
+        {"nombre": f"Fondo Común de Inversión {i} - Clase A", "moneda": "ARS", "precio_actual": 1234.5678 + i,
+         "codigo_cnv": 1000 + i, "codigo_cafci": 2000 + i}
+        for i in range(filas)
+    ]
+
+
+def _medir(funcion, repeticiones: int) -> tuple[float, float, int]:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cuerpo = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return mejor * 1000, pico / 1024 / 1024, len(cuerpo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    movimientos = _movimientos(args.filas)
+    instrumentos = _instrumentos(args.filas)
+    fondos = _fondos(args.filas)
+
+    casos = [
+        ("movimientos", "jsonable_encoder + json", lambda: JSONResponse(jsonable_encoder(movimientos)).body),
+        ("movimientos", "model_dump_json", lambda: respuesta_modelo(movimientos).body),
+        ("instrumentos", "jsonable_encoder + json", lambda: JSONResponse(jsonable_encoder(instrumentos)).body),
+        ("instrumentos", "model_dump_json", lambda: respuesta_modelo(instrumentos, list[models.InstrumentoOut]).body),
+        ("fondos", "jsonable_encoder + json", lambda: JSONResponse(jsonable_encoder(fondos)).body),
+        ("fondos", "orjson", lambda: OrjsonResponse(fondos).body),
+    ]
+
+    print(f"{args.filas} rows per payload, best of {args.repeticiones}")
+    print(f"{'payload':<13} {'serializer':<25} {'ms':>9} {'peak MiB':>9} {'KiB':>8}")
+    for payload, nombre, funcion in casos:
+        ms, pico, tamano = _medir(funcion, args.repeticiones)
+        print(f"{payload:<13} {nombre:<25} {ms:9.1f} {pico:9.1f} {tamano / 1024:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
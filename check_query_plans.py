@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+check_query_plans.py
+- Runs the hot read helpers of db.py and captures every SQL statement they send
+- EXPLAINs each statement with its real parameters and prints the plan nodes
+- Fails (exit 1) when a statement falls back to a Seq Scan on one of the large tables
+
+Usage: python check_query_plans.py [--sin-seqscan] [--analyze]
+  --sin-seqscan  SET enable_seqscan = off first. On a small database Postgres
+                 rightly prefers sequential scans; this checks the indexes are usable.
+  --analyze      EXPLAIN ANALYZE (the helpers are read-only) to also print timings
+Requires DATABASE_URL in .env, with the migrations applied (alembic upgrade head)
+"""
+
+import argparse
+import json
+import sys
+
+from sqlalchemy import event, select
+
+import db
+from structure import Instrumento, MovimientoGasto
+
+# Tables big enough that a sequential scan is a regression
+TABLAS_VIGILADAS = {"finanzas_movimientogasto", "finanzas_vencimiento", "precio"}
+
+
+def _consultas(subcategoria_id, instrumento_id):
+    # active=True like the endpoints default to, so the partial WHERE active indexes are the ones checked
+    return [
+        ("movimientos: default page", lambda: db.obtener_movimientos_gasto(active=True, total_mode="none")),
+        ("movimientos: cursor page", lambda: db.obtener_movimientos_gasto(active=True, pagination_mode="cursor", total_mode="none")),
+        ("movimientos: subcategoria + fechas", lambda: db.obtener_movimientos_gasto(
+            active=True, subcategoriaIds=[subcategoria_id], desde_fecha="2024-01-01", hasta_fecha="2024-12-31", total_mode="none")),
+        ("movimientos: comentarios contains", lambda: db.obtener_movimientos_gasto(active=True, comentarios="farmac", total_mode="none")),
+        ("movimientos: comentarios fts", lambda: db.obtener_movimientos_gasto(
+            active=True, comentarios="farmacia", comentarios_modo="fts", total_mode="none")),
+        ("vencimientos: default page", lambda: db.obtener_vencimientos(active=True, total_mode="none")),
+        ("resumen mensual", lambda: db.obtener_resumen_mensual(subcategoriaIds=[subcategoria_id])),
+        ("precios: by instrumento", lambda: db.obtener_precios(instrumento_id=instrumento_id, page_size=50, page_number=1)),
+        ("instrumentos con precios", lambda: db.obtener_instrumentos_con_precios(id=instrumento_id)),
+    ]
+
+
+def _capturar(funcion) -> list[tuple[str, object]]:
+    sentencias = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            sentencias.append((statement, parameters))
+
+    event.listen(db.database.engine, "before_cursor_execute", registrar)
+    try:
+        funcion()
+    finally:
+        event.remove(db.database.engine, "before_cursor_execute", registrar)
+    return sentencias
+
+
+def _nodos(plan: dict):
+    yield plan
+    for hijo in plan.get("Plans", []):
+        yield from _nodos(hijo)
+
+
+def _explicar(conexion, statement, parameters, analyze: bool) -> dict:
+    opciones = "ANALYZE, FORMAT JSON" if analyze else "FORMAT JSON"
+    fila = conexion.exec_driver_sql(f"EXPLAIN ({opciones}) {statement}", parameters).scalar_one()
+    return (json.loads(fila) if isinstance(fila, str) else fila)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sin-seqscan", action="store_true")
+    parser.add_argument("--analyze", action="store_true")
+    args = parser.parse_args()
+
+    with db._sesion() as session:
+        subcategoria_id = session.execute(select(MovimientoGasto.subcategoriaId).limit(1)).scalar()
+        instrumento_id = session.execute(select(Instrumento.id).limit(1)).scalar()
+
+    regresiones = []
+    with db.database.engine.connect() as conexion:
+        if args.sin_seqscan:
+            conexion.exec_driver_sql("SET enable_seqscan = off")
+
+        for nombre, funcion in _consultas(subcategoria_id, instrumento_id):
+            print(f"\n== {nombre}")
+            for statement, parameters in _capturar(funcion):
+                explain = _explicar(conexion, statement, parameters, args.analyze)
+                tiempo = f"  {explain['Execution Time']:.2f} ms" if args.analyze else ""
+                print(f"  -- {' '.join(statement.split())[:110]}...{tiempo}")
+                for nodo in _nodos(explain["Plan"]):
+                    relacion = nodo.get("Relation Name")
+                    indice = nodo.get("Index Name")
+                    detalle = " ".join(filter(None, [relacion, f"using {indice}" if indice else None]))
+                    print(f"     {nodo['Node Type']} {detalle}".rstrip())
+                    if nodo["Node Type"] == "Seq Scan" and relacion in TABLAS_VIGILADAS:
+                        regresiones.append((nombre, relacion))
+
+        conexion.rollback()
+
+    if regresiones:
+        print("\nSequential scans on large tables:")
+        for nombre, relacion in regresiones:
+            print(f"  {nombre}: {relacion}")
+        sys.exit(1)
+    print("\nNo sequential scans on", ", ".join(sorted(TABLAS_VIGILADAS)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Typed readers for the settings in .env / the environment. An unset or blank
+variable means the default; anything else that does not parse raises
+ValueError at the point the setting is read.
+"""
+
+import os
+from typing import Optional
+
+
+def _valor(nombre: str) -> Optional[str]:
+    valor = os.getenv(nombre)
+    if valor is None or valor.strip() == "":
+        return None
+    return valor.strip()
+
+
+def env_bool(nombre: str, default: bool) -> bool:
+    valor = _valor(nombre)
+    if valor is None:
+        return default
+    return valor.lower() in ("1", "true", "yes", "on")
+
+
+def env_int(nombre: str, default: Optional[int]) -> Optional[int]:
+    valor = _valor(nombre)
+    return default if valor is None else int(valor)
+
+
+def env_float(nombre: str, default: Optional[float]) -> Optional[float]:
+    valor = _valor(nombre)
+    return default if valor is None else float(valor)
@@ -1,16 +1,30 @@
+import base64
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
 from dotenv import load_dotenv
+import hashlib
+import json
+import logging
 import os
-from sqlalchemy import create_engine, func, select, asc, desc
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import Session, selectinload, with_loader_criteria
-from typing import Optional, Sequence
+import re
+import threading
+import time
+from sqlalchemy import Float, cast, create_engine, event, func, literal_column, select, insert, delete, text, asc, desc, and_, or_, tuple_
+from sqlalchemy.dialects.postgresql import UUID, insert as pg_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, attributes, selectinload, with_loader_criteria
+from sqlalchemy.pool import NullPool, QueuePool
+from typing import Iterable, Iterator, Optional, Sequence
 from structure import (
     Categoria,
     Subcategoria,
     CategoriaDeletionError,
     SubcategoriaDeletionError,
+    InvalidCursorError,
+    InvalidQueryParamError,
     MovimientoGasto,
+    MovimientoGastoResumenMensual,
     DetalleSubcategoria,
     Vencimiento,
     Instrumento,
@@ -19,23 +33,239 @@ from structure import (
 )
 import uuid
 import models
+from config import env_bool, env_int
 
 load_dotenv()
 
+logger = logging.getLogger("db")
+
+POOL_STATS = {"checkouts": 0, "espera_total_ms": 0.0, "espera_max_ms": 0.0, "esperas_lentas": 0}
+_pool_stats_lock = threading.Lock()
+
+def _registrar_espera(espera_ms: float, pool):
+    umbral_ms = env_int("DB_POOL_WAIT_WARN_MS", 100)
+    with _pool_stats_lock:
+        POOL_STATS["checkouts"] += 1
+        POOL_STATS["espera_total_ms"] += espera_ms
+        POOL_STATS["espera_max_ms"] = max(POOL_STATS["espera_max_ms"], espera_ms)
+        if espera_ms >= umbral_ms:
+            POOL_STATS["esperas_lentas"] += 1
+
+    if espera_ms >= umbral_ms:
+        logger.warning(f"DB pool checkout waited {espera_ms:.1f} ms ({pool.status()})")
+    else:
+        logger.debug(f"DB pool checkout waited {espera_ms:.1f} ms")
+
+class _CheckoutTimingMixin:
+    """Measure how long callers wait to get a connection out of the pool (including connect time)."""
+
+    def connect(self):
+        inicio = time.perf_counter()
+        conexion = super().connect()
+        _registrar_espera((time.perf_counter() - inicio) * 1000, self)
+        return conexion
+
+class TimedQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+class TimedNullPool(_CheckoutTimingMixin, NullPool):
+    pass
+
+def _engine_kwargs(database_url: str, queue_pool=TimedQueuePool) -> dict:
+    """
+    Engine/pool options from the environment:
+      DB_NULLPOOL             open a connection per checkout (serverless / external pgbouncer), default off
+      DB_POOL_SIZE            persistent connections per instance, default 5
+      DB_MAX_OVERFLOW         extra connections under load, default 5
+      DB_POOL_TIMEOUT         seconds to wait for a free connection, default 30
+      DB_POOL_RECYCLE         seconds before a connection is replaced, default 300
+      DB_POOL_PRE_PING        test connections on checkout, default on
+      DB_STATEMENT_TIMEOUT_MS server-side statement_timeout, default unset
+      DB_PREPARE_THRESHOLD    psycopg (v3) server-side prepared statements: executions before
+                              preparing, or "off" (required behind pgbouncer transaction pooling);
+                              asyncpg (db_async) only honours "off", psycopg2 ignores it
+    """
+    kwargs = {"pool_pre_ping": env_bool("DB_POOL_PRE_PING", True)}
+    if env_bool("DB_NULLPOOL", False):
+        kwargs["poolclass"] = TimedNullPool
+    else:
+        kwargs.update(
+            poolclass=queue_pool,
+            pool_size=env_int("DB_POOL_SIZE", 5),
+            max_overflow=env_int("DB_MAX_OVERFLOW", 5),
+            pool_timeout=env_int("DB_POOL_TIMEOUT", 30),
+            pool_recycle=env_int("DB_POOL_RECYCLE", 300),
+        )
+
+    connect_args = {}
+    statement_timeout = env_int("DB_STATEMENT_TIMEOUT_MS", None)
+    if statement_timeout is not None:
+        connect_args["options"] = f"-c statement_timeout={statement_timeout}"
+
+    driver = make_url(database_url).get_driver_name()
+    prepare_threshold = os.getenv("DB_PREPARE_THRESHOLD")
+    if driver == "asyncpg":
+        # asyncpg takes server settings directly and always prepares; a cache size of 0 turns that off
+        if "options" in connect_args:
+            connect_args = {"server_settings": {"statement_timeout": str(statement_timeout)}}
+        if prepare_threshold and prepare_threshold.lower() == "off":
+            # Behind pgbouncer transaction pooling: no cached statements in asyncpg or in
+            # SQLAlchemy's own cache, and unique names for the ones asyncpg still prepares
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+    elif prepare_threshold and driver == "psycopg":
+        connect_args["prepare_threshold"] = None if prepare_threshold.lower() == "off" else int(prepare_threshold)
+
+    if connect_args:
+        kwargs["connect_args"] = connect_args
+    return kwargs
+
 class Database():
 
     def __init__(self):
         DATABASE_URL = os.getenv("DATABASE_URL")
-        self.engine = create_engine(DATABASE_URL)
+        self.engine = create_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
 
 database = Database()
 
+@contextmanager
+def _sesion(session: Optional[Session] = None):
+    """
+    Use the caller's session when given (e.g. the sync side of an AsyncSession
+    in db_async.py) or open a short-lived one on the module engine.
+    """
+    if session is not None:
+        yield session
+    else:
+        with Session(database.engine) as nueva:
+            yield nueva
+
+def _codificar_cursor(sort_by: str, sort_direction: str, valor, id) -> str:
+    """Encode the last (sort value, id) pair of a page as an opaque cursor."""
+    if isinstance(valor, datetime):
+        valor = valor.isoformat()
+    elif isinstance(valor, uuid.UUID):
+        valor = str(valor)
+    payload = {"s": sort_by, "d": sort_direction, "v": valor, "id": str(id)}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+def _decodificar_cursor(cursor: str, sort_by: str, sort_direction: str, sort_column):
+    """Decode a cursor built by _codificar_cursor back into (sort value, id)."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        ultimo_id = uuid.UUID(payload["id"])
+        valor = payload["v"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+
+    if payload.get("s") != sort_by or payload.get("d") != sort_direction:
+        raise InvalidCursorError("Cursor does not match the requested sort_by/sort_direction")
+
+    if valor is not None:
+        try:
+            python_type = sort_column.type.python_type
+        except NotImplementedError:
+            python_type = None
+        try:
+            if python_type is datetime:
+                valor = datetime.fromisoformat(valor)
+            elif python_type is uuid.UUID:
+                valor = uuid.UUID(valor)
+        except (ValueError, TypeError):
+            raise InvalidCursorError("Invalid cursor")
+
+    return valor, ultimo_id
+
+PAGINATION_MODES = ("offset", "cursor")
+
+def _validar_pagination_mode(pagination_mode: Optional[str]):
+    if pagination_mode is not None and pagination_mode not in PAGINATION_MODES:
+        raise InvalidQueryParamError(f"Invalid pagination_mode '{pagination_mode}', expected one of {', '.join(PAGINATION_MODES)}")
+
+TOTAL_MODES = ("exact", "estimate", "window", "none")
+TOTAL_ESTIMATE_CAP = 10000
+
+def _validar_total_mode(total_mode: str):
+    if total_mode not in TOTAL_MODES:
+        raise InvalidQueryParamError(f"Invalid total_mode '{total_mode}', expected one of {', '.join(TOTAL_MODES)}")
+
+def _contar_total(session: Session, query, total_mode: str) -> tuple[Optional[int], bool]:
+    """
+    Count the rows matched by `query` and return (total, total_is_estimate).
+    "estimate" stops counting after TOTAL_ESTIMATE_CAP rows and reports the cap
+    as an estimate ("10000+"); "none" skips the count entirely.
+    """
+    if total_mode == "none":
+        return None, False
+
+    query = query.order_by(None)
+    if total_mode == "estimate":
+        query = query.limit(TOTAL_ESTIMATE_CAP + 1)
+
+    total = session.execute(
+        select(func.count()).select_from(query.subquery())
+    ).scalar_one()
+
+    if total_mode == "estimate" and total > TOTAL_ESTIMATE_CAP:
+        return TOTAL_ESTIMATE_CAP, True
+    return total, False
+
+def _predicado_cursor(sort_column, id_column, valor, ultimo_id, descendente: bool):
+    """
+    Build the WHERE clause that seeks past the last row of the previous page.
+    Postgres puts NULLs first on DESC and last on ASC, so the NULL block is
+    handled explicitly; the non-NULL case uses a row comparison so the
+    (sort_column, id) index can be used.
+    """
+    if descendente:
+        if valor is None:
+            return or_(and_(sort_column.is_(None), id_column < ultimo_id), sort_column.is_not(None))
+        return tuple_(sort_column, id_column) < tuple_(valor, ultimo_id)
+    if valor is None:
+        return and_(sort_column.is_(None), id_column > ultimo_id)
+    return or_(tuple_(sort_column, id_column) > tuple_(valor, ultimo_id), sort_column.is_(None))
+
+TEXTO_MODOS = ("contains", "fts")
+# Inlined as a constant (not a bind parameter) so the expression matches the GIN index in docs/busqueda_texto.md
+_TEXTO_CONFIG = literal_column("'spanish'::regconfig")
+
+def _tsvector(columna):
+    return func.to_tsvector(_TEXTO_CONFIG, func.misgestiones.f_unaccent(columna))
+
+def _tsquery(termino: str):
+    return func.websearch_to_tsquery(_TEXTO_CONFIG, func.misgestiones.f_unaccent(termino))
+
+def _validar_texto_modo(modo: Optional[str], parametro: str):
+    if modo not in (None, *TEXTO_MODOS):
+        raise InvalidQueryParamError(f"Invalid {parametro} '{modo}', expected one of {', '.join(TEXTO_MODOS)}")
+
+def _filtro_texto(columna, termino: str, modo: Optional[str], parametro: str = "comentarios_modo"):
+    """
+    "contains" is the substring ILIKE, served by the pg_trgm index; "fts" is
+    accent-insensitive Spanish full-text search (stemmed words, websearch
+    syntax: "quoted phrases", or, -excluded).
+    """
+    _validar_texto_modo(modo, parametro)
+    if modo == "fts":
+        return _tsvector(columna).bool_op("@@")(_tsquery(termino))
+    return columna.ilike(f"%{termino}%")
+
+def _relevancia_texto(columna, termino: Optional[str], modo: Optional[str]):
+    """ts_rank of a full-text match, for sort_by="relevancia"."""
+    if modo != "fts" or termino is None:
+        raise InvalidQueryParamError("sort_by 'relevancia' requires comentarios with comentarios_modo 'fts'")
+    # As double precision so the value survives a round trip through a cursor unchanged
+    return cast(func.ts_rank(_tsvector(columna), _tsquery(termino)), Float)
+
 def obtener_categorias(
         id: Optional[UUID] = None,
         nombre: Optional[str] = None,
-        active: Optional[bool] = None
+        active: Optional[bool] = None,
+        nombre_modo: Optional[str] = "contains",
+        session: Optional[Session] = None
 ) -> Sequence[Categoria]:
-    with Session(database.engine) as session:
+    with _sesion(session) as session:
         query = select(Categoria)
 
         if active is not None:
@@ -47,7 +277,7 @@ def obtener_categorias(
             query = query.options(selectinload(Categoria.subcategorias))
 
         if id is not None: query = query.where(Categoria.id == id)
-        if nombre is not None: query = query.where(Categoria.nombre.ilike(f"%{nombre}%"))
+        if nombre is not None: query = query.where(_filtro_texto(Categoria.nombre, nombre, nombre_modo, "nombre_modo"))
         if active is not None: query = query.where(Categoria.active == active)
 
         result = session.execute(query)
@@ -55,6 +285,122 @@ def obtener_categorias(
 
     return categorias
 
+LOAD_MODES = ("orm", "projection")
+
+def _validar_load_mode(load_mode: Optional[str]):
+    if load_mode is not None and load_mode not in LOAD_MODES:
+        raise InvalidQueryParamError(f"Invalid load_mode '{load_mode}', expected one of {', '.join(LOAD_MODES)}")
+
+def _columnas_subcategoria_proyectada() -> list:
+    return [
+        Subcategoria.id.label("sub_id"),
+        Subcategoria.nombre.label("sub_nombre"),
+        Subcategoria.comentarios.label("sub_comentarios"),
+        Subcategoria.categoriaId.label("sub_categoriaId"),
+        Subcategoria.active.label("sub_active"),
+        Categoria.id.label("cat_id"),
+        Categoria.nombre.label("cat_nombre"),
+        Categoria.comentarios.label("cat_comentarios"),
+        Categoria.active.label("cat_active"),
+    ]
+
+def _subcategoria_proyectada(fila, subcategorias: dict) -> models.SubcategoriaOut:
+    """SubcategoriaOut from a projected row, shared by every row of the page with the same subcategoria."""
+    subcategoria = subcategorias.get(fila.sub_id)
+    if subcategoria is None:
+        subcategoria = subcategorias[fila.sub_id] = models.SubcategoriaOut.model_construct(
+            id=fila.sub_id,
+            nombre=fila.sub_nombre,
+            comentarios=fila.sub_comentarios,
+            categoriaId=fila.sub_categoriaId,
+            active=fila.sub_active,
+            categoria=models.CategoriaBasicOut.model_construct(
+                id=fila.cat_id,
+                nombre=fila.cat_nombre,
+                comentarios=fila.cat_comentarios,
+                active=fila.cat_active
+            )
+        )
+    return subcategoria
+
+def _query_movimientos_proyectados():
+    """
+    Exactly the columns of MovimientoGastoOut in one joined SELECT, instead of
+    the entity plus a selectinload round trip per relationship.
+    """
+    return (
+        select(
+            MovimientoGasto.id,
+            MovimientoGasto.tipoDePago,
+            MovimientoGasto.monto,
+            MovimientoGasto.comentarios,
+            MovimientoGasto.fecha,
+            MovimientoGasto.active,
+            *_columnas_subcategoria_proyectada(),
+            DetalleSubcategoria.id.label("det_id"),
+            DetalleSubcategoria.nombre.label("det_nombre"),
+            DetalleSubcategoria.subcategoriaId.label("det_subcategoriaId"),
+            DetalleSubcategoria.comentarios.label("det_comentarios"),
+            DetalleSubcategoria.active.label("det_active"),
+        )
+        .select_from(MovimientoGasto)
+        .join(Subcategoria, MovimientoGasto.subcategoriaId == Subcategoria.id)
+        .join(Categoria, Subcategoria.categoriaId == Categoria.id)
+        .outerjoin(DetalleSubcategoria, MovimientoGasto.detalleSubcategoriaId == DetalleSubcategoria.id)
+    )
+
+def _movimiento_proyectado(fila, subcategorias: dict) -> models.MovimientoGastoOut:
+    # model_construct skips validation: the values come straight from typed columns
+    detalle = None
+    if fila.det_id is not None:
+        detalle = models.DetalleSubcategoriaBasicOut.model_construct(
+            id=fila.det_id,
+            nombre=fila.det_nombre,
+            subcategoriaId=fila.det_subcategoriaId,
+            comentarios=fila.det_comentarios,
+            active=fila.det_active
+        )
+    return models.MovimientoGastoOut.model_construct(
+        id=fila.id,
+        subcategoria=_subcategoria_proyectada(fila, subcategorias),
+        detalleSubcategoria=detalle,
+        tipoDePago=fila.tipoDePago,
+        monto=fila.monto,
+        comentarios=fila.comentarios,
+        fecha=fila.fecha,
+        active=fila.active
+    )
+
+def _filtrar_movimientos_gasto(
+        query,
+        id: Optional[UUID] = None,
+        categoriaIds: Optional[Sequence[UUID]] = None,
+        subcategoriaIds: Optional[Sequence[UUID]] = None,
+        detalleSubcategoriaIds: Optional[Sequence[UUID]] = None,
+        tiposDePago: Optional[Sequence[str]] = None,
+        active: Optional[bool] = None,
+        monto_min: Optional[float] = None,
+        monto_max: Optional[float] = None,
+        comentarios: Optional[str] = None,
+        comentarios_modo: Optional[str] = "contains",
+        desde_fecha: Optional[datetime] = None,
+        hasta_fecha: Optional[datetime] = None
+):
+    """Apply the MovimientoGastoQueryParams filters shared by search, summaries and exports."""
+    if id is not None: query = query.where(MovimientoGasto.id == id)
+    if categoriaIds is not None and (len(categoriaIds) > 0): query = query.where(MovimientoGasto.subcategoria.has(Subcategoria.categoriaId.in_(categoriaIds)))
+    if subcategoriaIds is not None and (len(subcategoriaIds) > 0): query = query.where(MovimientoGasto.subcategoriaId.in_(subcategoriaIds))
+    if detalleSubcategoriaIds is not None and (len(detalleSubcategoriaIds) > 0): query = query.where(MovimientoGasto.detalleSubcategoriaId.in_(detalleSubcategoriaIds))
+    if tiposDePago is not None and (len(tiposDePago) > 0): query = query.where(MovimientoGasto.tipoDePago.in_(tiposDePago))
+    if active is not None: query = query.where(MovimientoGasto.active == active)
+    if monto_min is not None: query = query.where(MovimientoGasto.monto >= monto_min)
+    if monto_max is not None: query = query.where(MovimientoGasto.monto <= monto_max)
+    if comentarios is not None: query = query.where(_filtro_texto(MovimientoGasto.comentarios, comentarios, comentarios_modo))
+    if desde_fecha is not None: query = query.where(MovimientoGasto.fecha >= desde_fecha)
+    if hasta_fecha is not None: query = query.where(MovimientoGasto.fecha <= hasta_fecha)
+
+    return query
+
 def obtener_movimientos_gasto(
         id: Optional[UUID] = None,
         categoriaIds: Optional[Sequence[UUID]] = None,
@@ -65,75 +411,596 @@ def obtener_movimientos_gasto(
         monto_min: Optional[float] = None,
         monto_max: Optional[float] = None,
         comentarios: Optional[str] = None,
+        comentarios_modo: Optional[str] = "contains",
         desde_fecha: Optional[datetime] = None,
         hasta_fecha: Optional[datetime] = None,
         page_size: Optional[int] = 50,
         page_number: Optional[int] = 1,
         sort_by: Optional[str] = "fecha",
-        sort_direction: Optional[str] = "desc"
+        sort_direction: Optional[str] = "desc",
+        pagination_mode: Optional[str] = "offset",
+        cursor: Optional[str] = None,
+        total_mode: Optional[str] = "exact",
+        load_mode: Optional[str] = "orm",
+        session: Optional[Session] = None
 ) -> models.MovimientoGastoSearchResults:
-    with Session(database.engine) as session:
-        query = (
-            select(MovimientoGasto)
-            .options(
-                selectinload(MovimientoGasto.subcategoria).options(
-                    selectinload(Subcategoria.categoria)
-                ),
-                selectinload(MovimientoGasto.detalleSubcategoria).options(
-                    selectinload(DetalleSubcategoria.subcategoria)
+    """
+    load_mode "orm" returns MovimientoGasto entities with their relationships
+    eager-loaded; "projection" builds MovimientoGastoOut directly from the rows
+    of a single joined SELECT.
+    """
+    _validar_pagination_mode(pagination_mode)
+    _validar_total_mode(total_mode)
+    _validar_load_mode(load_mode)
+    proyectar = load_mode == "projection"
+    with _sesion(session) as session:
+        if proyectar:
+            query = _query_movimientos_proyectados()
+        else:
+            query = (
+                select(MovimientoGasto)
+                .options(
+                    selectinload(MovimientoGasto.subcategoria).options(
+                        selectinload(Subcategoria.categoria)
+                    ),
+                    selectinload(MovimientoGasto.detalleSubcategoria).options(
+                        selectinload(DetalleSubcategoria.subcategoria)
+                    )
                 )
             )
-        )
 
-        if id is not None: query = query.where(MovimientoGasto.id == id)
-        if categoriaIds is not None and (len(categoriaIds) > 0): query = query.where(MovimientoGasto.subcategoria.has(Subcategoria.categoriaId.in_(categoriaIds)))
-        if subcategoriaIds is not None and (len(subcategoriaIds) > 0): query = query.where(MovimientoGasto.subcategoriaId.in_(subcategoriaIds))
-        if detalleSubcategoriaIds is not None and (len(detalleSubcategoriaIds) > 0): query = query.where(MovimientoGasto.detalleSubcategoriaId.in_(detalleSubcategoriaIds))
-        if tiposDePago is not None and (len(tiposDePago) > 0): query = query.where(MovimientoGasto.tipoDePago.in_(tiposDePago))
-        if active is not None: query = query.where(MovimientoGasto.active == active)
-        if monto_min is not None: query = query.where(MovimientoGasto.monto >= monto_min)
-        if monto_max is not None: query = query.where(MovimientoGasto.monto <= monto_max)
-        if comentarios is not None: query = query.where(MovimientoGasto.comentarios.ilike(f"%{comentarios}%"))
-        if desde_fecha is not None: query = query.where(MovimientoGasto.fecha >= desde_fecha)
-        if hasta_fecha is not None: query = query.where(MovimientoGasto.fecha <= hasta_fecha)
+        query = _filtrar_movimientos_gasto(
+            query,
+            id=id,
+            categoriaIds=categoriaIds,
+            subcategoriaIds=subcategoriaIds,
+            detalleSubcategoriaIds=detalleSubcategoriaIds,
+            tiposDePago=tiposDePago,
+            active=active,
+            monto_min=monto_min,
+            monto_max=monto_max,
+            comentarios=comentarios,
+            comentarios_modo=comentarios_modo,
+            desde_fecha=desde_fecha,
+            hasta_fecha=hasta_fecha
+        )
 
         # Apply sorting with support for nested properties (e.g., "subcategoria.nombre")
         try:
-            if "." in sort_by:
+            if sort_by == "relevancia":
+                sort_column = _relevancia_texto(MovimientoGasto.comentarios, comentarios, comentarios_modo)
+            elif "." in sort_by:
                 parts = sort_by.split(".")
-                # Join the relationship table if sorting by nested property
+                # Join the relationship table if sorting by nested property (the projection already joins them).
+                # Outer, like the projection, so rows with no detalleSubcategoria are sorted rather than dropped
                 related_obj = getattr(MovimientoGasto, parts[0])
-                query = query.join(related_obj)
+                if not proyectar:
+                    query = query.outerjoin(related_obj)
                 # Navigate to the final property
                 sort_column = getattr(related_obj.property.mapper.class_, parts[1])
             else:
                 sort_column = getattr(MovimientoGasto, sort_by, MovimientoGasto.fecha)
         except (AttributeError, TypeError):
             sort_column = MovimientoGasto.fecha
-        
-        if sort_direction and sort_direction.lower() == "asc":
-            query = query.order_by(asc(sort_column))
-        else:
-            query = query.order_by(desc(sort_column))
 
-        # Get total count before pagination
-        total = session.execute(
-            select(func.count()).select_from(query.subquery())
-        ).scalar_one()
+        descendente = not (sort_direction and sort_direction.lower() == "asc")
+        orden = desc if descendente else asc
+        usar_cursor = pagination_mode == "cursor"
 
-        if page_size is not None and page_number is not None:
+        if usar_cursor:
+            # The id tie-breaker makes the order total, which keyset pagination requires
+            query = query.order_by(orden(sort_column), orden(MovimientoGasto.id))
+        else:
+            query = query.order_by(orden(sort_column))
+
+        # A window count rides along with the page itself, but cannot see the rows before a cursor
+        primera_pagina = not cursor if usar_cursor else page_number in (None, 1)
+        contar_en_ventana = total_mode == "window" and (primera_pagina or not usar_cursor)
+        if contar_en_ventana:
+            total, total_is_estimate = None, False
+        else:
+            total, total_is_estimate = _contar_total(session, query, "exact" if total_mode == "window" else total_mode)
+
+        query_filtrada = query
+        next_cursor = None
+        if usar_cursor:
+            # Seek past the last row of the previous page instead of OFFSET, so every page costs the same
+            if cursor:
+                valor, ultimo_id = _decodificar_cursor(cursor, sort_by, sort_direction, sort_column)
+                query = query.where(_predicado_cursor(sort_column, MovimientoGasto.id, valor, ultimo_id, descendente))
+
+            # Labelled so it is not merged with the same column already in the projection
+            query = query.add_columns(sort_column.label("cursor_valor"))
+            if page_size is not None:
+                query = query.limit(page_size + 1)
+        elif page_size is not None and page_number is not None:
             query = query.limit(page_size).offset(page_size * (page_number - 1))
 
-        result = session.execute(query)
-        movimientos = result.scalars().all()
+        if contar_en_ventana:
+            query = query.add_columns(func.count().over().label("total_count"))
+
+        rows = session.execute(query).all()
+
+        if contar_en_ventana:
+            if rows:
+                total = rows[0].total_count
+            else:
+                # Past the last page there is no row to carry the count
+                total, total_is_estimate = (0, False) if primera_pagina else _contar_total(session, query_filtrada, "exact")
+
+        hay_mas = usar_cursor and page_size is not None and len(rows) > page_size
+        if hay_mas:
+            rows = rows[:page_size]
+        if proyectar:
+            subcategorias = {}
+            movimientos = [_movimiento_proyectado(row, subcategorias) for row in rows]
+        else:
+            movimientos = [row[0] for row in rows]
+
+        if hay_mas:
+            ultimo_id = rows[-1][0] if proyectar else rows[-1][0].id
+            next_cursor = _codificar_cursor(sort_by, sort_direction, rows[-1].cursor_valor, ultimo_id)
 
     return models.MovimientoGastoSearchResults(
         total=total,
+        total_is_estimate=total_is_estimate,
         page_number=page_number,
         page_size=page_size,
+        next_cursor=next_cursor,
         movimientos=movimientos
     )
 
+RESUMEN_GROUP_BY = ("categoria", "subcategoria", "tipoDePago", "periodo")
+RESUMEN_PERIODOS = ("day", "week", "month", "quarter", "year")
+
+def obtener_resumen_movimientos_gasto(
+        group_by: Sequence[str],
+        periodo: Optional[str] = "month",
+        id: Optional[UUID] = None,
+        categoriaIds: Optional[Sequence[UUID]] = None,
+        subcategoriaIds: Optional[Sequence[UUID]] = None,
+        detalleSubcategoriaIds: Optional[Sequence[UUID]] = None,
+        tiposDePago: Optional[Sequence[str]] = None,
+        active: Optional[bool] = None,
+        monto_min: Optional[float] = None,
+        monto_max: Optional[float] = None,
+        comentarios: Optional[str] = None,
+        comentarios_modo: Optional[str] = "contains",
+        desde_fecha: Optional[datetime] = None,
+        hasta_fecha: Optional[datetime] = None,
+        session: Optional[Session] = None
+) -> list[dict]:
+    """
+    Sum monto and count movimientos grouped by any combination of categoria,
+    subcategoria, tipoDePago and a date_trunc `periodo`, entirely in Postgres.
+    Accepts the same filters as obtener_movimientos_gasto.
+    """
+    invalidos = [g for g in group_by if g not in RESUMEN_GROUP_BY]
+    if not group_by or invalidos:
+        raise InvalidQueryParamError(f"Invalid group_by {invalidos or list(group_by)}, expected any of {', '.join(RESUMEN_GROUP_BY)}")
+    if "periodo" in group_by and periodo not in RESUMEN_PERIODOS:
+        raise InvalidQueryParamError(f"Invalid periodo '{periodo}', expected one of {', '.join(RESUMEN_PERIODOS)}")
+
+    columnas = []
+    if "categoria" in group_by:
+        columnas += [Categoria.id.label("categoriaId"), Categoria.nombre.label("categoriaNombre")]
+    if "subcategoria" in group_by:
+        columnas += [Subcategoria.id.label("subcategoriaId"), Subcategoria.nombre.label("subcategoriaNombre")]
+    if "tipoDePago" in group_by:
+        columnas.append(MovimientoGasto.tipoDePago.label("tipoDePago"))
+    if "periodo" in group_by:
+        columnas.append(func.date_trunc(periodo, MovimientoGasto.fecha).label("periodo"))
+
+    with _sesion(session) as session:
+        query = select(
+            *columnas,
+            func.sum(MovimientoGasto.monto).label("total"),
+            func.count(MovimientoGasto.id).label("cantidad")
+        ).select_from(MovimientoGasto)
+
+        if "categoria" in group_by or "subcategoria" in group_by:
+            query = query.join(MovimientoGasto.subcategoria)
+        if "categoria" in group_by:
+            query = query.join(Subcategoria.categoria)
+
+        query = _filtrar_movimientos_gasto(
+            query,
+            id=id,
+            categoriaIds=categoriaIds,
+            subcategoriaIds=subcategoriaIds,
+            detalleSubcategoriaIds=detalleSubcategoriaIds,
+            tiposDePago=tiposDePago,
+            active=active,
+            monto_min=monto_min,
+            monto_max=monto_max,
+            comentarios=comentarios,
+            comentarios_modo=comentarios_modo,
+            desde_fecha=desde_fecha,
+            hasta_fecha=hasta_fecha
+        )
+
+        query = query.group_by(*columnas).order_by(*columnas)
+        result = session.execute(query)
+        grupos = [dict(row._mapping) for row in result]
+
+    return grupos
+
+# ---------------------- RESUMEN MENSUAL (ROLLUP) ------------------------------
+
+def _mes(fecha: Optional[datetime]) -> Optional[datetime]:
+    return datetime(fecha.year, fecha.month, 1) if fecha is not None else None
+
+def _valor_previo(obj, attr: str):
+    """Value of `attr` as it was before the current flush."""
+    hist = attributes.get_history(obj, attr)
+    if hist.added or hist.deleted:
+        return hist.deleted[0] if hist.deleted else None
+    return hist.unchanged[0] if hist.unchanged else None
+
+def _sumar_delta(deltas: dict, mes, subcategoriaId, tipoDePago, monto, signo: int):
+    if mes is None or subcategoriaId is None:
+        return
+    key = (mes, subcategoriaId, tipoDePago)
+    total, cantidad = deltas.get(key, (0.0, 0))
+    deltas[key] = (total + signo * (monto or 0), cantidad + signo)
+
+def _aplicar_deltas_resumen(connection, deltas: dict):
+    """Upsert (mes, subcategoria, tipoDePago) -> (total, cantidad) increments into the rollup."""
+    filas = [
+        {"mes": mes, "subcategoria": subcategoriaId, "tipodepago": tipoDePago, "total": total, "cantidad": cantidad}
+        for (mes, subcategoriaId, tipoDePago), (total, cantidad) in deltas.items()
+        if cantidad != 0 or total != 0
+    ]
+    if not filas:
+        return
+
+    tabla = MovimientoGastoResumenMensual.__table__
+    stmt = pg_insert(tabla)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[tabla.c.mes, tabla.c.subcategoria, tabla.c.tipodepago],
+        set_={
+            "total": tabla.c.total + stmt.excluded.total,
+            "cantidad": tabla.c.cantidad + stmt.excluded.cantidad,
+        }
+    )
+    connection.execute(stmt, filas)
+
+@event.listens_for(Session, "after_flush")
+def _actualizar_resumen_mensual(session, flush_context):
+    """Keep MovimientoGastoResumenMensual in step with every MovimientoGasto insert, update, soft-delete and delete."""
+    deltas: dict = {}
+
+    for obj in session.new:
+        if isinstance(obj, MovimientoGasto) and obj.active is not False:
+            _sumar_delta(deltas, _mes(obj.fecha), obj.subcategoriaId, obj.tipoDePago, obj.monto, 1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, MovimientoGasto) or not session.is_modified(obj):
+            continue
+        if _valor_previo(obj, "active") is not False:
+            _sumar_delta(
+                deltas,
+                _mes(_valor_previo(obj, "fecha")),
+                _valor_previo(obj, "subcategoriaId"),
+                _valor_previo(obj, "tipoDePago"),
+                _valor_previo(obj, "monto"),
+                -1
+            )
+        if obj.active is not False:
+            _sumar_delta(deltas, _mes(obj.fecha), obj.subcategoriaId, obj.tipoDePago, obj.monto, 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, MovimientoGasto) and _valor_previo(obj, "active") is not False:
+            _sumar_delta(
+                deltas,
+                _mes(_valor_previo(obj, "fecha")),
+                _valor_previo(obj, "subcategoriaId"),
+                _valor_previo(obj, "tipoDePago"),
+                _valor_previo(obj, "monto"),
+                -1
+            )
+
+    if deltas:
+        _aplicar_deltas_resumen(session.connection(), deltas)
+
+def reconstruir_resumen_mensual() -> int:
+    """
+    Recompute MovimientoGastoResumenMensual from finanzas_movimientogasto.
+    The rollup is locked for the duration so concurrent incremental updates
+    wait and apply on top of the rebuilt rows. Returns the number of rows.
+    """
+    tabla = MovimientoGastoResumenMensual.__table__
+    with Session(database.engine) as session:
+        session.execute(text(f"LOCK TABLE {tabla.schema}.{tabla.name} IN EXCLUSIVE MODE"))
+        session.execute(delete(MovimientoGastoResumenMensual))
+
+        mes = func.date_trunc("month", MovimientoGasto.fecha)
+        origen = (
+            select(
+                mes,
+                MovimientoGasto.subcategoriaId,
+                MovimientoGasto.tipoDePago,
+                func.sum(MovimientoGasto.monto),
+                func.count(MovimientoGasto.id)
+            )
+            .where(MovimientoGasto.active == True)
+            .where(MovimientoGasto.fecha.is_not(None))
+            .group_by(mes, MovimientoGasto.subcategoriaId, MovimientoGasto.tipoDePago)
+        )
+        session.execute(
+            insert(tabla).from_select(["mes", "subcategoria", "tipodepago", "total", "cantidad"], origen)
+        )
+        filas = session.execute(select(func.count()).select_from(tabla)).scalar_one()
+        session.commit()
+
+    return filas
+
+def obtener_resumen_mensual(
+        categoriaIds: Optional[Sequence[UUID]] = None,
+        subcategoriaIds: Optional[Sequence[UUID]] = None,
+        tiposDePago: Optional[Sequence[str]] = None,
+        desde_mes: Optional[datetime] = None,
+        hasta_mes: Optional[datetime] = None,
+        session: Optional[Session] = None
+) -> list[dict]:
+    """Monthly totals per subcategoria and tipoDePago read from the rollup table."""
+    with _sesion(session) as session:
+        query = (
+            select(
+                Categoria.id.label("categoriaId"),
+                Categoria.nombre.label("categoriaNombre"),
+                Subcategoria.id.label("subcategoriaId"),
+                Subcategoria.nombre.label("subcategoriaNombre"),
+                MovimientoGastoResumenMensual.tipoDePago.label("tipoDePago"),
+                MovimientoGastoResumenMensual.mes.label("periodo"),
+                MovimientoGastoResumenMensual.total.label("total"),
+                MovimientoGastoResumenMensual.cantidad.label("cantidad")
+            )
+            .join(Subcategoria, Subcategoria.id == MovimientoGastoResumenMensual.subcategoriaId)
+            .join(Subcategoria.categoria)
+            .where(MovimientoGastoResumenMensual.cantidad > 0)
+        )
+
+        if categoriaIds is not None and (len(categoriaIds) > 0): query = query.where(Subcategoria.categoriaId.in_(categoriaIds))
+        if subcategoriaIds is not None and (len(subcategoriaIds) > 0): query = query.where(MovimientoGastoResumenMensual.subcategoriaId.in_(subcategoriaIds))
+        if tiposDePago is not None and (len(tiposDePago) > 0): query = query.where(MovimientoGastoResumenMensual.tipoDePago.in_(tiposDePago))
+        if desde_mes is not None: query = query.where(MovimientoGastoResumenMensual.mes >= _mes(desde_mes))
+        if hasta_mes is not None: query = query.where(MovimientoGastoResumenMensual.mes <= _mes(hasta_mes))
+
+        query = query.order_by(MovimientoGastoResumenMensual.mes, Categoria.nombre, Subcategoria.nombre, MovimientoGastoResumenMensual.tipoDePago)
+        result = session.execute(query)
+        grupos = [dict(row._mapping) for row in result]
+
+    return grupos
+
+# ---------------------- IMPORTACION MASIVA ------------------------------
+
+IMPORT_BATCH_SIZE = 1000
+
+def _parsear_fecha_importada(valor) -> datetime:
+    if isinstance(valor, datetime):
+        return valor
+    texto = str(valor).strip()
+    for formato in ("%d/%m/%Y", "%d/%m/%Y %H:%M", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            pass
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        raise ValueError(f"Invalid fecha '{texto}'")
+
+_MILES_AR = re.compile(r"[-+]?\d{1,3}(\.\d{3})+")
+
+def _parsear_monto_importado(valor) -> float:
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = str(valor).strip().replace("$", "").replace(" ", "")
+    if "," in texto:
+        # AR format: '1.234,56'
+        texto = texto.replace(".", "").replace(",", ".")
+    elif _MILES_AR.fullmatch(texto):
+        # Only thousands separators, as this app's exports write whole amounts: '1.234' is 1234
+        texto = texto.replace(".", "")
+    try:
+        return float(texto)
+    except ValueError:
+        raise ValueError(f"Invalid monto '{valor}'")
+
+def _normalizar_fila_importada(fila: dict, subcategorias: set, detalles: dict, tipos_de_pago: dict) -> dict:
+    """
+    Validate a raw import row against the preloaded ids and build the insert
+    values. tipos_de_pago maps the lowercased tipoDePago values already in use
+    to their spelling; when it is empty (no movimientos yet) any value is taken.
+    """
+    def texto(columna):
+        valor = fila.get(columna)
+        return str(valor).strip() if valor is not None and str(valor).strip() != "" else None
+
+    if texto("fecha") is None: raise ValueError("fecha is required")
+    if texto("subcategoriaId") is None: raise ValueError("subcategoriaId is required")
+    if texto("tipoDePago") is None: raise ValueError("tipoDePago is required")
+    if texto("monto") is None: raise ValueError("monto is required")
+
+    try:
+        subcategoriaId = uuid.UUID(texto("subcategoriaId"))
+    except ValueError:
+        raise ValueError(f"Invalid subcategoriaId '{texto('subcategoriaId')}'")
+    if subcategoriaId not in subcategorias:
+        raise ValueError(f"Subcategoria {subcategoriaId} not found")
+
+    tipoDePago = texto("tipoDePago")
+    if tipos_de_pago:
+        if tipoDePago.lower() not in tipos_de_pago:
+            raise ValueError(f"Unknown tipoDePago '{tipoDePago}', expected one of {', '.join(sorted(tipos_de_pago.values()))}")
+        tipoDePago = tipos_de_pago[tipoDePago.lower()]
+
+    detalleSubcategoriaId = None
+    if texto("detalleSubcategoriaId") is not None:
+        try:
+            detalleSubcategoriaId = uuid.UUID(texto("detalleSubcategoriaId"))
+        except ValueError:
+            raise ValueError(f"Invalid detalleSubcategoriaId '{texto('detalleSubcategoriaId')}'")
+        if detalleSubcategoriaId not in detalles:
+            raise ValueError(f"DetalleSubcategoria {detalleSubcategoriaId} not found")
+        if detalles[detalleSubcategoriaId] != subcategoriaId:
+            raise ValueError(f"DetalleSubcategoria {detalleSubcategoriaId} does not belong to subcategoria {subcategoriaId}")
+
+    return {
+        "id": uuid.uuid4(),
+        "subcategoria": subcategoriaId,
+        "detallesubcategoria": detalleSubcategoriaId,
+        "tipodepago": tipoDePago,
+        "monto": _parsear_monto_importado(fila.get("monto")),
+        "comentarios": texto("comentarios"),
+        "fecha": _parsear_fecha_importada(fila.get("fecha")),
+        "active": True,
+    }
+
+def importar_movimientos_gasto(filas: Iterable[tuple[int, dict]], batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """
+    Insert movimientos from (row number, raw values) pairs in batches of
+    `batch_size` using a single executemany per batch, all in one transaction.
+    Subcategoria/DetalleSubcategoria ids and tipoDePago values are validated
+    against lookups loaded once up front. Invalid rows are skipped and
+    reported as {fila, error}.
+    """
+    tabla = MovimientoGasto.__table__
+    insertados = 0
+    errores = []
+
+    with Session(database.engine) as session:
+        subcategorias = set(session.execute(
+            select(Subcategoria.id).where(Subcategoria.active == True)
+        ).scalars())
+        detalles = dict(session.execute(
+            select(DetalleSubcategoria.id, DetalleSubcategoria.subcategoriaId).where(DetalleSubcategoria.active == True)
+        ).all())
+        # From the small monthly rollup rather than a DISTINCT over every movimiento
+        tipos_de_pago = {
+            tipo.lower(): tipo
+            for tipo in session.execute(select(MovimientoGastoResumenMensual.tipoDePago).distinct()).scalars()
+        }
+
+        def insertar(lote: list):
+            # Core inserts bypass the ORM flush, so the rollup deltas are applied here
+            session.execute(insert(tabla), lote)
+            deltas: dict = {}
+            for v in lote:
+                _sumar_delta(deltas, _mes(v["fecha"]), v["subcategoria"], v["tipodepago"], v["monto"], 1)
+            _aplicar_deltas_resumen(session.connection(), deltas)
+
+        lote = []
+        for numero, fila in filas:
+            try:
+                lote.append(_normalizar_fila_importada(fila, subcategorias, detalles, tipos_de_pago))
+            except ValueError as e:
+                errores.append({"fila": numero, "error": str(e)})
+                continue
+
+            if len(lote) >= batch_size:
+                insertar(lote)
+                insertados += len(lote)
+                lote = []
+
+        if lote:
+            insertar(lote)
+            insertados += len(lote)
+
+        session.commit()
+
+    return {"insertados": insertados, "errores": errores}
+
+def _query_vencimientos_proyectados():
+    """Exactly the columns of VencimientoOut, pago included, in one joined SELECT."""
+    return (
+        select(
+            Vencimiento.id,
+            Vencimiento.fecha,
+            Vencimiento.monto,
+            Vencimiento.esAnual,
+            Vencimiento.comentarios,
+            Vencimiento.active,
+            Vencimiento.fechaConfirmada,
+            Vencimiento.pagoId,
+            *_columnas_subcategoria_proyectada(),
+            MovimientoGasto.subcategoriaId.label("pago_subcategoriaId"),
+            MovimientoGasto.detalleSubcategoriaId.label("pago_detalleSubcategoriaId"),
+            MovimientoGasto.tipoDePago.label("pago_tipoDePago"),
+            MovimientoGasto.monto.label("pago_monto"),
+            MovimientoGasto.comentarios.label("pago_comentarios"),
+            MovimientoGasto.fecha.label("pago_fecha"),
+            MovimientoGasto.active.label("pago_active"),
+        )
+        .select_from(Vencimiento)
+        .join(Subcategoria, Vencimiento.subcategoriaId == Subcategoria.id)
+        .join(Categoria, Subcategoria.categoriaId == Categoria.id)
+        .outerjoin(MovimientoGasto, Vencimiento.pagoId == MovimientoGasto.id)
+    )
+
+def _vencimiento_proyectado(fila, subcategorias: dict) -> models.VencimientoOut:
+    pago = None
+    if fila.pagoId is not None and fila.pago_subcategoriaId is not None:
+        pago = models.MovimientoGastoBasicOut.model_construct(
+            id=fila.pagoId,
+            subcategoriaId=fila.pago_subcategoriaId,
+            detalleSubcategoriaId=fila.pago_detalleSubcategoriaId,
+            tipoDePago=fila.pago_tipoDePago,
+            monto=fila.pago_monto,
+            comentarios=fila.pago_comentarios,
+            fecha=fila.pago_fecha,
+            active=fila.pago_active
+        )
+    return models.VencimientoOut.model_construct(
+        id=fila.id,
+        subcategoria=_subcategoria_proyectada(fila, subcategorias),
+        fecha=fila.fecha,
+        monto=fila.monto,
+        esAnual=fila.esAnual,
+        comentarios=fila.comentarios,
+        active=fila.active,
+        fechaConfirmada=fila.fechaConfirmada,
+        pagoId=fila.pagoId,
+        pago=pago
+    )
+
+def _filtrar_vencimientos(
+        query,
+        id: Optional[UUID] = None,
+        categoriaIds: Optional[Sequence[UUID]] = None,
+        subcategoriaIds: Optional[Sequence[UUID]] = None,
+        esAnual: Optional[bool] = None,
+        fechaConfirmada: Optional[bool] = None,
+        pagado: Optional[bool] = None,
+        active: Optional[bool] = None,
+        monto_min: Optional[float] = None,
+        monto_max: Optional[float] = None,
+        comentarios: Optional[str] = None,
+        comentarios_modo: Optional[str] = "contains",
+        desde_fecha: Optional[datetime] = None,
+        hasta_fecha: Optional[datetime] = None
+):
+    """Apply the VencimientoQueryParams filters shared by search and exports."""
+    if id is not None: query = query.where(Vencimiento.id == id)
+    if categoriaIds is not None and (len(categoriaIds) > 0): query = query.where(Vencimiento.subcategoria.has(Subcategoria.categoriaId.in_(categoriaIds)))
+    if subcategoriaIds is not None and (len(subcategoriaIds) > 0): query = query.where(Vencimiento.subcategoriaId.in_(subcategoriaIds))
+    if esAnual is not None: query = query.where(Vencimiento.esAnual == esAnual)
+    if fechaConfirmada is not None: query = query.where(Vencimiento.fechaConfirmada == fechaConfirmada)
+    if pagado is not None:
+        if pagado:
+            query = query.where(Vencimiento.pagoId.is_not(None))
+        else:
+            query = query.where(Vencimiento.pagoId.is_(None))
+    if active is not None: query = query.where(Vencimiento.active == active)
+    if monto_min is not None: query = query.where(Vencimiento.monto >= monto_min)
+    if monto_max is not None: query = query.where(Vencimiento.monto <= monto_max)
+    if comentarios is not None: query = query.where(_filtro_texto(Vencimiento.comentarios, comentarios, comentarios_modo))
+    if desde_fecha is not None: query = query.where(Vencimiento.fecha >= desde_fecha)
+    if hasta_fecha is not None: query = query.where(Vencimiento.fecha <= hasta_fecha)
+
+    return query
+
 def obtener_vencimientos(
         id: Optional[UUID] = None,
         categoriaIds: Optional[Sequence[UUID]] = None,
@@ -145,47 +1012,62 @@ def obtener_vencimientos(
         monto_min: Optional[float] = None,
         monto_max: Optional[float] = None,
         comentarios: Optional[str] = None,
+        comentarios_modo: Optional[str] = "contains",
         desde_fecha: Optional[datetime] = None,
         hasta_fecha: Optional[datetime] = None,
         page_size: Optional[int] = 50,
         page_number: Optional[int] = 1,
         sort_by: Optional[str] = "fecha",
-        sort_direction: Optional[str] = "asc"
+        sort_direction: Optional[str] = "asc",
+        total_mode: Optional[str] = "exact",
+        load_mode: Optional[str] = "orm",
+        session: Optional[Session] = None
 ) -> models.VencimientoSearchResults:
-    with Session(database.engine) as session:
-        query = (
-            select(Vencimiento)
-            .options(
-                selectinload(Vencimiento.subcategoria).options(
-                    selectinload(Subcategoria.categoria)
-                ),
-                selectinload(Vencimiento.pago)
+    """load_mode as in obtener_movimientos_gasto."""
+    _validar_total_mode(total_mode)
+    _validar_load_mode(load_mode)
+    proyectar = load_mode == "projection"
+    with _sesion(session) as session:
+        if proyectar:
+            query = _query_vencimientos_proyectados()
+        else:
+            query = (
+                select(Vencimiento)
+                .options(
+                    selectinload(Vencimiento.subcategoria).options(
+                        selectinload(Subcategoria.categoria)
+                    ),
+                    selectinload(Vencimiento.pago)
+                )
             )
-        )
 
-        if id is not None: query = query.where(Vencimiento.id == id)
-        if categoriaIds is not None and (len(categoriaIds) > 0): query = query.where(Vencimiento.subcategoria.has(Subcategoria.categoriaId.in_(categoriaIds)))
-        if subcategoriaIds is not None and (len(subcategoriaIds) > 0): query = query.where(Vencimiento.subcategoriaId.in_(subcategoriaIds))
-        if esAnual is not None: query = query.where(Vencimiento.esAnual == esAnual)
-        if fechaConfirmada is not None: query = query.where(Vencimiento.fechaConfirmada == fechaConfirmada)
-        if pagado is not None:
-            if pagado:
-                query = query.where(Vencimiento.pagoId.is_not(None))
-            else:
-                query = query.where(Vencimiento.pagoId.is_(None))
-        if active is not None: query = query.where(Vencimiento.active == active)
-        if monto_min is not None: query = query.where(Vencimiento.monto >= monto_min)
-        if monto_max is not None: query = query.where(Vencimiento.monto <= monto_max)
-        if comentarios is not None: query = query.where(Vencimiento.comentarios.ilike(f"%{comentarios}%"))
-        if desde_fecha is not None: query = query.where(Vencimiento.fecha >= desde_fecha)
-        if hasta_fecha is not None: query = query.where(Vencimiento.fecha <= hasta_fecha)
+        query = _filtrar_vencimientos(
+            query,
+            id=id,
+            categoriaIds=categoriaIds,
+            subcategoriaIds=subcategoriaIds,
+            esAnual=esAnual,
+            fechaConfirmada=fechaConfirmada,
+            pagado=pagado,
+            active=active,
+            monto_min=monto_min,
+            monto_max=monto_max,
+            comentarios=comentarios,
+            comentarios_modo=comentarios_modo,
+            desde_fecha=desde_fecha,
+            hasta_fecha=hasta_fecha
+        )
 
         # Apply sorting with support for nested properties (e.g., "subcategoria.nombre")
         try:
-            if "." in sort_by:
+            if sort_by == "relevancia":
+                sort_column = _relevancia_texto(Vencimiento.comentarios, comentarios, comentarios_modo)
+            elif "." in sort_by:
                 parts = sort_by.split(".")
                 related_obj = getattr(Vencimiento, parts[0])
-                query = query.join(related_obj)
+                if not proyectar:
+                    # Outer, like the projection, so unpaid vencimientos are not dropped when sorting by pago
+                    query = query.outerjoin(related_obj)
                 sort_column = getattr(related_obj.property.mapper.class_, parts[1])
             else:
                 sort_column = getattr(Vencimiento, sort_by, Vencimiento.fecha)
@@ -197,26 +1079,313 @@ def obtener_vencimientos(
         else:
             query = query.order_by(asc(sort_column))
 
-        # Get total count before pagination
-        total = session.execute(
-            select(func.count()).select_from(query.subquery())
-        ).scalar_one()
+        contar_en_ventana = total_mode == "window"
+        if contar_en_ventana:
+            total, total_is_estimate = None, False
+        else:
+            total, total_is_estimate = _contar_total(session, query, total_mode)
 
+        query_filtrada = query
         if page_size is not None and page_number is not None:
             query = query.limit(page_size).offset(page_size * (page_number - 1))
 
-        result = session.execute(query)
-        vencimientos = result.scalars().all()
+        if contar_en_ventana:
+            query = query.add_columns(func.count().over().label("total_count"))
+            rows = session.execute(query).all()
+            if rows:
+                total = rows[0].total_count
+            elif page_number in (None, 1):
+                total = 0
+            else:
+                # Past the last page there is no row to carry the count
+                total, total_is_estimate = _contar_total(session, query_filtrada, "exact")
+        else:
+            rows = session.execute(query).all()
+
+        if proyectar:
+            subcategorias = {}
+            vencimientos = [_vencimiento_proyectado(row, subcategorias) for row in rows]
+        else:
+            vencimientos = [row[0] for row in rows]
 
     return models.VencimientoSearchResults(
         total=total,
+        total_is_estimate=total_is_estimate,
         page_number=page_number,
         page_size=page_size,
         vencimientos=vencimientos
     )
 
-def obtener_categoria_por_id(id: UUID, incluir_subcategorias: bool = False):
+# ---------------------- EXPORTACION ------------------------------
+
+EXPORT_BATCH_SIZE = 1000
+
+# (column, type) in the order the export iterators yield them; types are the ones exportar.py understands
+COLUMNAS_EXPORT_MOVIMIENTOS = (
+    ("id", "str"),
+    ("fecha", "datetime"),
+    ("categoria", "str"),
+    ("subcategoria", "str"),
+    ("detalleSubcategoria", "str"),
+    ("tipoDePago", "str"),
+    ("monto", "float"),
+    ("comentarios", "str"),
+    ("active", "bool"),
+)
+
+COLUMNAS_EXPORT_VENCIMIENTOS = (
+    ("id", "str"),
+    ("fecha", "datetime"),
+    ("categoria", "str"),
+    ("subcategoria", "str"),
+    ("monto", "float"),
+    ("esAnual", "bool"),
+    ("fechaConfirmada", "bool"),
+    ("pagoId", "str"),
+    ("comentarios", "str"),
+    ("active", "bool"),
+)
+
+def _iterar_en_lotes(query) -> Iterator[Sequence]:
+    """
+    Stream the rows of `query` from a server-side cursor, EXPORT_BATCH_SIZE
+    at a time, keeping the session open only while the caller consumes them.
+    """
     with Session(database.engine) as session:
+        result = session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for lote in result.partitions():
+            yield lote
+
+def iterar_movimientos_gasto(
+        id: Optional[UUID] = None,
+        categoriaIds: Optional[Sequence[UUID]] = None,
+        subcategoriaIds: Optional[Sequence[UUID]] = None,
+        detalleSubcategoriaIds: Optional[Sequence[UUID]] = None,
+        tiposDePago: Optional[Sequence[str]] = None,
+        active: Optional[bool] = None,
+        monto_min: Optional[float] = None,
+        monto_max: Optional[float] = None,
+        comentarios: Optional[str] = None,
+        comentarios_modo: Optional[str] = "contains",
+        desde_fecha: Optional[datetime] = None,
+        hasta_fecha: Optional[datetime] = None
+) -> Iterator[Sequence]:
+    """Batches of flat movimiento rows (COLUMNAS_EXPORT_MOVIMIENTOS) for exports, newest first."""
+    query = (
+        select(
+            MovimientoGasto.id,
+            MovimientoGasto.fecha,
+            Categoria.nombre,
+            Subcategoria.nombre,
+            DetalleSubcategoria.nombre,
+            MovimientoGasto.tipoDePago,
+            MovimientoGasto.monto,
+            MovimientoGasto.comentarios,
+            MovimientoGasto.active
+        )
+        .join(MovimientoGasto.subcategoria)
+        .join(Subcategoria.categoria)
+        .outerjoin(MovimientoGasto.detalleSubcategoria)
+    )
+    query = _filtrar_movimientos_gasto(
+        query,
+        id=id,
+        categoriaIds=categoriaIds,
+        subcategoriaIds=subcategoriaIds,
+        detalleSubcategoriaIds=detalleSubcategoriaIds,
+        tiposDePago=tiposDePago,
+        active=active,
+        monto_min=monto_min,
+        monto_max=monto_max,
+        comentarios=comentarios,
+        comentarios_modo=comentarios_modo,
+        desde_fecha=desde_fecha,
+        hasta_fecha=hasta_fecha
+    )
+    query = query.order_by(desc(MovimientoGasto.fecha), desc(MovimientoGasto.id))
+    return _iterar_en_lotes(query)
+
+def iterar_vencimientos(
+        id: Optional[UUID] = None,
+        categoriaIds: Optional[Sequence[UUID]] = None,
+        subcategoriaIds: Optional[Sequence[UUID]] = None,
+        esAnual: Optional[bool] = None,
+        fechaConfirmada: Optional[bool] = None,
+        pagado: Optional[bool] = None,
+        active: Optional[bool] = None,
+        monto_min: Optional[float] = None,
+        monto_max: Optional[float] = None,
+        comentarios: Optional[str] = None,
+        comentarios_modo: Optional[str] = "contains",
+        desde_fecha: Optional[datetime] = None,
+        hasta_fecha: Optional[datetime] = None
+) -> Iterator[Sequence]:
+    """Batches of flat vencimiento rows (COLUMNAS_EXPORT_VENCIMIENTOS) for exports, oldest first."""
+    query = (
+        select(
+            Vencimiento.id,
+            Vencimiento.fecha,
+            Categoria.nombre,
+            Subcategoria.nombre,
+            Vencimiento.monto,
+            Vencimiento.esAnual,
+            Vencimiento.fechaConfirmada,
+            Vencimiento.pagoId,
+            Vencimiento.comentarios,
+            Vencimiento.active
+        )
+        .join(Vencimiento.subcategoria)
+        .join(Subcategoria.categoria)
+    )
+    query = _filtrar_vencimientos(
+        query,
+        id=id,
+        categoriaIds=categoriaIds,
+        subcategoriaIds=subcategoriaIds,
+        esAnual=esAnual,
+        fechaConfirmada=fechaConfirmada,
+        pagado=pagado,
+        active=active,
+        monto_min=monto_min,
+        monto_max=monto_max,
+        comentarios=comentarios,
+        comentarios_modo=comentarios_modo,
+        desde_fecha=desde_fecha,
+        hasta_fecha=hasta_fecha
+    )
+    query = query.order_by(asc(Vencimiento.fecha), asc(Vencimiento.id))
+    return _iterar_en_lotes(query)
+
+# ---------------------- CATALOGO CACHE ------------------------------
+
+@dataclass(frozen=True)
+class CatalogoSnapshot:
+    """Full categoria -> subcategoria tree as loaded at one catalog version."""
+    categorias: list[models.CategoriaOut]
+    subcategorias: list[models.SubcategoriaOut]
+    etag: str
+
+def _cargar_catalogo(session: Session) -> CatalogoSnapshot:
+    query = (
+        select(Categoria)
+        .options(selectinload(Categoria.subcategorias))
+        .order_by(Categoria.nombre, Categoria.id)
+    )
+    categorias = []
+    subcategorias = []
+    for categoria in session.execute(query).scalars().all():
+        basica = models.CategoriaBasicOut.model_validate(categoria)
+        hijas = [
+            models.SubcategoriaBasicOut.model_validate(sub)
+            for sub in sorted(categoria.subcategorias, key=lambda sub: (sub.nombre, str(sub.id)))
+        ]
+        categorias.append(models.CategoriaOut(**basica.model_dump(), subcategorias=hijas))
+        subcategorias.extend(models.SubcategoriaOut(**sub.model_dump(), categoria=basica) for sub in hijas)
+
+    # Content hash rather than the version counter, so every worker process agrees on the ETag
+    contenido = json.dumps([c.model_dump(mode="json") for c in categorias], sort_keys=True)
+    etag = '"catalogo-' + hashlib.sha256(contenido.encode("utf-8")).hexdigest()[:32] + '"'
+    return CatalogoSnapshot(categorias=categorias, subcategorias=subcategorias, etag=etag)
+
+class _CatalogoCache:
+    """
+    In-process copy of the catalog tree. Writers bump the version after
+    committing; a load that raced with a write is returned to its caller but
+    not kept, so the next read goes back to the database.
+
+    Writes made by another instance (Vercel, several workers) are not seen
+    here, so the copy is also reloaded once it is older than
+    CATALOGO_CACHE_TTL seconds (default 30, 0 disables the cache). The ETag
+    is a content hash, so an unchanged reload still answers 304.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot: Optional[CatalogoSnapshot] = None
+        self._cargado = 0.0
+
+    def obtener(self, session: Session) -> CatalogoSnapshot:
+        ttl = env_int("CATALOGO_CACHE_TTL", 30)
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._cargado < ttl:
+                return self._snapshot
+            version = self._version
+
+        cargado = time.monotonic()
+        snapshot = _cargar_catalogo(session)
+        with self._lock:
+            if self._version == version:
+                self._snapshot = snapshot
+                self._cargado = cargado
+        return snapshot
+
+    def invalidar(self):
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+_catalogo_cache = _CatalogoCache()
+
+def obtener_catalogo(session: Optional[Session] = None) -> CatalogoSnapshot:
+    with _sesion(session) as session:
+        return _catalogo_cache.obtener(session)
+
+def invalidar_catalogo():
+    """Drop the cached catalog, e.g. after editing categorias/subcategorias outside these helpers."""
+    _catalogo_cache.invalidar()
+
+def _validar_nombre_modo_catalogo(nombre: Optional[str], nombre_modo: Optional[str]):
+    _validar_texto_modo(nombre_modo, "nombre_modo")
+    if nombre is not None and nombre_modo == "fts":
+        raise InvalidQueryParamError("nombre_modo 'fts' is not available on the cached catalog")
+
+def _nombre_coincide(nombre: str, buscado: Optional[str]) -> bool:
+    return buscado is None or buscado.casefold() in nombre.casefold()
+
+def filtrar_categorias(
+        catalogo: CatalogoSnapshot,
+        id: Optional[UUID] = None,
+        nombre: Optional[str] = None,
+        active: Optional[bool] = None,
+        nombre_modo: Optional[str] = "contains"
+) -> list[models.CategoriaOut]:
+    """
+    Same filters as obtener_categorias, including `active` applying to the
+    nested subcategorias. Only nombre_modo "contains" can be matched in memory;
+    "fts" needs Postgres, so callers send it to obtener_categorias instead.
+    """
+    _validar_nombre_modo_catalogo(nombre, nombre_modo)
+    categorias = []
+    for categoria in catalogo.categorias:
+        if id is not None and categoria.id != id: continue
+        if not _nombre_coincide(categoria.nombre, nombre): continue
+        if active is not None and categoria.active != active: continue
+        if active is not None:
+            categoria = categoria.model_copy(update={
+                "subcategorias": [sub for sub in categoria.subcategorias if sub.active == active]
+            })
+        categorias.append(categoria)
+    return categorias
+
+def filtrar_subcategorias(
+        catalogo: CatalogoSnapshot,
+        id: Optional[UUID] = None,
+        nombre: Optional[str] = None,
+        active: Optional[bool] = None,
+        nombre_modo: Optional[str] = "contains"
+) -> list[models.SubcategoriaOut]:
+    """Same filters as obtener_subcategorias, with the same nombre_modo caveat as filtrar_categorias."""
+    _validar_nombre_modo_catalogo(nombre, nombre_modo)
+    return [
+        sub for sub in catalogo.subcategorias
+        if (id is None or sub.id == id)
+        and _nombre_coincide(sub.nombre, nombre)
+        and (active is None or sub.active == active)
+    ]
+
+def obtener_categoria_por_id(id: UUID, incluir_subcategorias: bool = False, session: Optional[Session] = None):
+    with _sesion(session) as session:
         query = (
             select(Categoria)
             .where(Categoria.id == id)
@@ -229,27 +1398,29 @@ def obtener_categoria_por_id(id: UUID, incluir_subcategorias: bool = False):
 
     return categoria
 
-def actualizar_categoria(id: UUID, categoria_update: models.CategoriaBasicOut) -> Categoria:
-    with Session(database.engine) as session:
+def actualizar_categoria(id: UUID, categoria_update: models.CategoriaBasicOut, session: Optional[Session] = None) -> Categoria:
+    with _sesion(session) as session:
         categoria = session.get(Categoria, id)
         if categoria:
             categoria.nombre = categoria_update.nombre
             categoria.comentarios = categoria_update.comentarios
             categoria.active = categoria_update.active
             session.commit()
+            _catalogo_cache.invalidar()
             session.refresh(categoria)
         return categoria
 
-def crear_categoria(nombre: str) -> Categoria:
-    with Session(database.engine) as session:
+def crear_categoria(nombre: str, session: Optional[Session] = None) -> Categoria:
+    with _sesion(session) as session:
         categoria = Categoria(nombre=nombre)
         session.add(categoria)
         session.commit()
+        _catalogo_cache.invalidar()
         session.refresh(categoria)
         return categoria
 
-def eliminar_categoria(id: uuid.UUID, eliminar_subcategorias: bool = False ):
-    with Session(database.engine) as session:
+def eliminar_categoria(id: uuid.UUID, eliminar_subcategorias: bool = False, session: Optional[Session] = None):
+    with _sesion(session) as session:
         categoria = session.execute(
             select(Categoria)
             .options(
@@ -272,20 +1443,22 @@ def eliminar_categoria(id: uuid.UUID, eliminar_subcategorias: bool = False ):
 
         categoria.active = False
         session.commit()
+        _catalogo_cache.invalidar()
 
-def crear_subcategoria(subcategoria: models.SubcategoriaCrear) -> Subcategoria:
-    with Session(database.engine) as session:
+def crear_subcategoria(subcategoria: models.SubcategoriaCrear, session: Optional[Session] = None) -> Subcategoria:
+    with _sesion(session) as session:
         subcategoria = Subcategoria(
             nombre=subcategoria.nombre, 
             comentarios=subcategoria.comentarios,
             categoriaId=subcategoria.categoriaId)
         session.add(subcategoria)
         session.commit()
+        _catalogo_cache.invalidar()
         session.refresh(subcategoria)
         return subcategoria
 
-def actualizar_subcategoria(subcategoria: models.SubcategoriaOut) -> Subcategoria:
-    with Session(database.engine) as session:
+def actualizar_subcategoria(subcategoria: models.SubcategoriaOut, session: Optional[Session] = None) -> Subcategoria:
+    with _sesion(session) as session:
         subcategoriaDB = session.get(Subcategoria, subcategoria.id)
         if subcategoriaDB:
             subcategoriaDB.nombre = subcategoria.nombre
@@ -293,11 +1466,12 @@ def actualizar_subcategoria(subcategoria: models.SubcategoriaOut) -> Subcategori
             subcategoriaDB.categoriaId = subcategoria.categoriaId
             subcategoriaDB.active = subcategoria.active
             session.commit()
+            _catalogo_cache.invalidar()
             session.refresh(subcategoriaDB)
         return subcategoriaDB
 
-def obtener_subcategoria_por_id(id: UUID) -> Subcategoria:
-    with Session(database.engine) as session:
+def obtener_subcategoria_por_id(id: UUID, session: Optional[Session] = None) -> Subcategoria:
+    with _sesion(session) as session:
         query = (
             select(Subcategoria)
             .options(selectinload(Subcategoria.categoria))
@@ -312,16 +1486,18 @@ def obtener_subcategoria_por_id(id: UUID) -> Subcategoria:
 def obtener_subcategorias(
         id: Optional[UUID] = None,
         nombre: Optional[str] = None,
-        active: Optional[bool] = None
+        active: Optional[bool] = None,
+        nombre_modo: Optional[str] = "contains",
+        session: Optional[Session] = None
 ) -> Sequence[Subcategoria]:
-    with Session(database.engine) as session:
+    with _sesion(session) as session:
         query = (
           select(Subcategoria)
           .options(selectinload(Subcategoria.categoria))
         )
 
         if id is not None: query = query.where(Subcategoria.id == id)
-        if nombre is not None: query = query.where(Subcategoria.nombre.ilike(f"%{nombre}%"))
+        if nombre is not None: query = query.where(_filtro_texto(Subcategoria.nombre, nombre, nombre_modo, "nombre_modo"))
         if active is not None: query = query.where(Subcategoria.active == active)
 
         result = session.execute(query)
@@ -329,8 +1505,8 @@ def obtener_subcategorias(
 
     return subcategorias
 
-def eliminar_subcategoria(id: uuid.UUID):
-    with Session(database.engine) as session:
+def eliminar_subcategoria(id: uuid.UUID, session: Optional[Session] = None):
+    with _sesion(session) as session:
         subcategoria = session.get(Subcategoria, id)
 
         if subcategoria is None:
@@ -338,6 +1514,7 @@ def eliminar_subcategoria(id: uuid.UUID):
 
         subcategoria.active = False
         session.commit()
+        _catalogo_cache.invalidar()
 
 
 # ---------------------- INVERSIONES DB HELPERS ------------------------------
@@ -345,8 +1522,8 @@ def eliminar_subcategoria(id: uuid.UUID):
 from enums import InstrumentoTipo, ClaseRenta, Moneda
 
 
-def crear_instrumento(instr: models.InstrumentoCrear) -> Instrumento:
-    with Session(database.engine) as session:
+def crear_instrumento(instr: models.InstrumentoCrear, session: Optional[Session] = None) -> Instrumento:
+    with _sesion(session) as session:
         # Ensure enum values are stored as strings in DB
         tipo_val = instr.tipo.value if hasattr(instr.tipo, 'value') else instr.tipo
         clase_val = instr.clase_renta.value if hasattr(instr.clase_renta, 'value') else instr.clase_renta
@@ -370,12 +1547,14 @@ def obtener_instrumentos(
         nombre: Optional[str] = None,
         codigo: Optional[str] = None,
         tipo: Optional[str] = None,
-        active: Optional[bool] = None
+        active: Optional[bool] = None,
+        nombre_modo: Optional[str] = "contains",
+        session: Optional[Session] = None
 ) -> Sequence[Instrumento]:
-    with Session(database.engine) as session:
+    with _sesion(session) as session:
         query = select(Instrumento)
         if id is not None: query = query.where(Instrumento.id == id)
-        if nombre is not None: query = query.where(Instrumento.nombre.ilike(f"%{nombre}%"))
+        if nombre is not None: query = query.where(_filtro_texto(Instrumento.nombre, nombre, nombre_modo, "nombre_modo"))
         if codigo is not None: query = query.where(Instrumento.codigo.ilike(f"%{codigo}%"))
         if tipo is not None: query = query.where(Instrumento.tipo == tipo)
         if active is not None: query = query.where(Instrumento.active == active)
@@ -386,16 +1565,16 @@ def obtener_instrumentos(
     return instrumentos
 
 
-def obtener_instrumento_por_id(id: UUID) -> Instrumento:
-    with Session(database.engine) as session:
+def obtener_instrumento_por_id(id: UUID, session: Optional[Session] = None) -> Instrumento:
+    with _sesion(session) as session:
         query = select(Instrumento).where(Instrumento.id == id).options(selectinload(Instrumento.precios))
         result = session.execute(query)
         instrumento = result.scalars().first()
         return instrumento
 
 
-def actualizar_instrumento(id: UUID, instrumento_update: models.InstrumentoOut) -> Instrumento:
-    with Session(database.engine) as session:
+def actualizar_instrumento(id: UUID, instrumento_update: models.InstrumentoOut, session: Optional[Session] = None) -> Instrumento:
+    with _sesion(session) as session:
         ins = session.get(Instrumento, id)
         if ins:
             ins.nombre = instrumento_update.nombre
@@ -410,8 +1589,8 @@ def actualizar_instrumento(id: UUID, instrumento_update: models.InstrumentoOut)
         return ins
 
 
-def crear_precio(precio: models.PrecioCrear) -> Precio:
-    with Session(database.engine) as session:
+def crear_precio(precio: models.PrecioCrear, session: Optional[Session] = None) -> Precio:
+    with _sesion(session) as session:
         existing = session.execute(
             select(Precio).where(
                 Precio.instrumentoId == precio.instrumento_id,
@@ -432,8 +1611,8 @@ def crear_precio(precio: models.PrecioCrear) -> Precio:
         return p
 
 
-def actualizar_precio(id: UUID, precio_update: models.PrecioOut) -> Precio:
-    with Session(database.engine) as session:
+def actualizar_precio(id: UUID, precio_update: models.PrecioOut, session: Optional[Session] = None) -> Precio:
+    with _sesion(session) as session:
         p = session.get(Precio, id)
         if p:
             p.monto = precio_update.monto
@@ -452,9 +1631,10 @@ def obtener_precios(
         hasta_fecha: Optional[datetime] = None,
         active: Optional[bool] = None,
         page_size: Optional[int] = None,
-        page_number: Optional[int] = None
+        page_number: Optional[int] = None,
+        session: Optional[Session] = None
 ) -> Sequence[Precio]:
-    with Session(database.engine) as session:
+    with _sesion(session) as session:
         query = select(Precio).options(selectinload(Precio.instrumento))
         if id is not None: query = query.where(Precio.id == id)
         if instrumento_id is not None: query = query.where(Precio.instrumentoId == instrumento_id)
@@ -471,8 +1651,8 @@ def obtener_precios(
         return precios
 
 
-def crear_inversion(inv: models.InversionCrear) -> Inversion:
-    with Session(database.engine) as session:
+def crear_inversion(inv: models.InversionCrear, session: Optional[Session] = None) -> Inversion:
+    with _sesion(session) as session:
         inversion = Inversion(cantidad=inv.cantidad, instrumentoId=inv.instrumento_id, broker=inv.broker, fecha=inv.fecha)
         session.add(inversion)
         session.commit()
@@ -485,9 +1665,10 @@ def obtener_inversiones(
         instrumento_id: Optional[UUID] = None,
         active: Optional[bool] = None,
         page_size: Optional[int] = None,
-        page_number: Optional[int] = None
+        page_number: Optional[int] = None,
+        session: Optional[Session] = None
 ) -> Sequence[Inversion]:
-    with Session(database.engine) as session:
+    with _sesion(session) as session:
         query = select(Inversion).options(selectinload(Inversion.instrumento))
         if id is not None: query = query.where(Inversion.id == id)
         if instrumento_id is not None: query = query.where(Inversion.instrumentoId == instrumento_id)
@@ -507,17 +1688,19 @@ def obtener_instrumentos_con_precios(
         codigo: Optional[str] = None,
         tipo: Optional[str] = None,
         active: Optional[bool] = None,
-        limit_precios: int = 50
+        limit_precios: int = 50,
+        nombre_modo: Optional[str] = "contains",
+        session: Optional[Session] = None
 ) -> Sequence[Instrumento]:
     """
     Fetch instrumentos with their latest N prices (default 50).
     Uses a ROW_NUMBER() window function so the DB returns at most
     `limit_precios` per instrumento, ordered by fecha DESC.
     """
-    with Session(database.engine) as session:
+    with _sesion(session) as session:
         query = select(Instrumento)
         if id is not None: query = query.where(Instrumento.id == id)
-        if nombre is not None: query = query.where(Instrumento.nombre.ilike(f"%{nombre}%"))
+        if nombre is not None: query = query.where(_filtro_texto(Instrumento.nombre, nombre, nombre_modo, "nombre_modo"))
         if codigo is not None: query = query.where(Instrumento.codigo.ilike(f"%{codigo}%"))
         if tipo is not None: query = query.where(Instrumento.tipo == tipo)
         if active is not None: query = query.where(Instrumento.active == active)
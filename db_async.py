@@ -0,0 +1,85 @@
+import functools
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+import db
+
+load_dotenv()
+
+
+class TimedAsyncAdaptedQueuePool(db._CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _url_asyncpg(database_url: str):
+    """
+    Point DATABASE_URL at the asyncpg driver. asyncpg does not understand the
+    libpq-only query parameters, so sslmode becomes its `ssl` argument and
+    channel_binding is dropped.
+    """
+    url = make_url(database_url).set(drivername="postgresql+asyncpg")
+    query = dict(url.query)
+    sslmode = query.pop("sslmode", None)
+    query.pop("channel_binding", None)
+    if sslmode and "ssl" not in query:
+        query["ssl"] = sslmode
+    return url.set(query=query)
+
+
+class AsyncDatabase():
+
+    def __init__(self):
+        DATABASE_URL = _url_asyncpg(os.getenv("DATABASE_URL"))
+        self.engine = create_async_engine(
+            DATABASE_URL,
+            **db._engine_kwargs(DATABASE_URL, queue_pool=TimedAsyncAdaptedQueuePool)
+        )
+
+database = AsyncDatabase()
+
+
+def _asincronico(helper):
+    """
+    Async version of a db.py helper: the query logic is reused as-is by running
+    it through AsyncSession.run_sync, so the connection I/O goes through asyncpg
+    and the event loop is free while Postgres answers.
+    """
+    @functools.wraps(helper)
+    async def wrapper(*args, **kwargs):
+        async with AsyncSession(database.engine) as session:
+            return await session.run_sync(lambda sync_session: helper(*args, session=sync_session, **kwargs))
+    return wrapper
+
+
+obtener_categorias = _asincronico(db.obtener_categorias)
+obtener_categoria_por_id = _asincronico(db.obtener_categoria_por_id)
+actualizar_categoria = _asincronico(db.actualizar_categoria)
+crear_categoria = _asincronico(db.crear_categoria)
+eliminar_categoria = _asincronico(db.eliminar_categoria)
+
+crear_subcategoria = _asincronico(db.crear_subcategoria)
+actualizar_subcategoria = _asincronico(db.actualizar_subcategoria)
+obtener_subcategoria_por_id = _asincronico(db.obtener_subcategoria_por_id)
+obtener_subcategorias = _asincronico(db.obtener_subcategorias)
+eliminar_subcategoria = _asincronico(db.eliminar_subcategoria)
+obtener_catalogo = _asincronico(db.obtener_catalogo)
+
+obtener_movimientos_gasto = _asincronico(db.obtener_movimientos_gasto)
+obtener_resumen_movimientos_gasto = _asincronico(db.obtener_resumen_movimientos_gasto)
+obtener_resumen_mensual = _asincronico(db.obtener_resumen_mensual)
+obtener_vencimientos = _asincronico(db.obtener_vencimientos)
+
+crear_instrumento = _asincronico(db.crear_instrumento)
+obtener_instrumentos = _asincronico(db.obtener_instrumentos)
+obtener_instrumento_por_id = _asincronico(db.obtener_instrumento_por_id)
+actualizar_instrumento = _asincronico(db.actualizar_instrumento)
+crear_precio = _asincronico(db.crear_precio)
+actualizar_precio = _asincronico(db.actualizar_precio)
+obtener_precios = _asincronico(db.obtener_precios)
+crear_inversion = _asincronico(db.crear_inversion)
+obtener_inversiones = _asincronico(db.obtener_inversiones)
+obtener_instrumentos_con_precios = _asincronico(db.obtener_instrumentos_con_precios)
@@ -0,0 +1,135 @@
+import csv
+import io
+import tempfile
+import uuid
+from datetime import datetime
+from typing import Iterable, Iterator, Sequence
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class ExportacionNoDisponibleError(RuntimeError):
+    """The requested export format needs an optional library that is not installed."""
+
+
+def _valor_plano(valor):
+    if isinstance(valor, uuid.UUID):
+        return str(valor)
+    return valor
+
+
+def stream_csv(columnas: Sequence[tuple[str, str]], lotes: Iterable[Sequence]) -> Iterator[bytes]:
+    """Write each batch of rows as CSV and yield it right away."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([nombre for nombre, _ in columnas])
+
+    for lote in lotes:
+        for fila in lote:
+            writer.writerow([
+                valor.isoformat() if isinstance(valor, datetime) else _valor_plano(valor)
+                for valor in fila
+            ])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    resto = buffer.getvalue()
+    if resto:
+        yield resto.encode("utf-8")
+
+
+def stream_xlsx(columnas: Sequence[tuple[str, str]], lotes: Iterable[Sequence]) -> Iterator[bytes]:
+    """
+    Build the workbook with openpyxl's write_only mode (rows go to a temp file,
+    not memory) and stream the result. An XLSX is a zip whose index is written
+    last, so bytes can only start flowing once every row has been written.
+    """
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("datos")
+    hoja.append([nombre for nombre, _ in columnas])
+    for lote in lotes:
+        for fila in lote:
+            hoja.append([_valor_plano(valor) for valor in fila])
+
+    with tempfile.TemporaryFile() as archivo:
+        libro.save(archivo)
+        archivo.seek(0)
+        while True:
+            chunk = archivo.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+class _SinkParquet(io.RawIOBase):
+    """Write-only file object whose bytes are drained after every row group."""
+
+    def __init__(self):
+        self._partes: list[bytes] = []
+        self._posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._partes.append(bytes(data))
+        self._posicion += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._posicion
+
+    def drenar(self) -> bytes:
+        data = b"".join(self._partes)
+        self._partes = []
+        return data
+
+
+def stream_parquet(columnas: Sequence[tuple[str, str]], lotes: Iterable[Sequence]) -> Iterator[bytes]:
+    """Write one Parquet row group per batch and yield its bytes as soon as it is flushed."""
+    # Imported eagerly so a missing pyarrow fails before the response starts streaming
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportacionNoDisponibleError("parquet export requires the pyarrow package")
+
+    tipos = {"str": pa.string(), "datetime": pa.timestamp("us"), "float": pa.float64(), "bool": pa.bool_()}
+    schema = pa.schema([(nombre, tipos[tipo]) for nombre, tipo in columnas])
+
+    def generar():
+        sink = _SinkParquet()
+        with pq.ParquetWriter(sink, schema) as writer:
+            for lote in lotes:
+                columnas_lote = zip(*[[_valor_plano(v) for v in fila] for fila in lote])
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(list(valores), type=campo.type) for campo, valores in zip(schema, columnas_lote)],
+                    schema=schema
+                ))
+                chunk = sink.drenar()
+                if chunk:
+                    yield chunk
+        resto = sink.drenar()
+        if resto:
+            yield resto
+
+    return generar()
+
+
+def stream_exportacion(formato: str, columnas: Sequence[tuple[str, str]], lotes: Iterable[Sequence]) -> Iterator[bytes]:
+    if formato == "csv":
+        return stream_csv(columnas, lotes)
+    if formato == "xlsx":
+        return stream_xlsx(columnas, lotes)
+    if formato == "parquet":
+        return stream_parquet(columnas, lotes)
+    raise ValueError(f"Invalid formato '{formato}', expected one of {', '.join(FORMATOS)}")
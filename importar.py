@@ -0,0 +1,111 @@
+import codecs
+import csv
+import io
+import zipfile
+from typing import BinaryIO, Iterator
+
+# Columns accepted in import files, matched case-insensitively against the header row
+COLUMNAS_MOVIMIENTO = ("fecha", "subcategoriaId", "detalleSubcategoriaId", "tipoDePago", "monto", "comentarios")
+_COLUMNAS_POR_NOMBRE = {c.lower(): c for c in COLUMNAS_MOVIMIENTO}
+
+
+class FormatoImportacionError(ValueError):
+    """The uploaded file cannot be read as a CSV/XLSX with a valid header."""
+
+
+def _mapear_header(header) -> list:
+    columnas = [_COLUMNAS_POR_NOMBRE.get(str(h).strip().lower()) if h is not None else None for h in header]
+    faltantes = [c for c in ("fecha", "subcategoriaId", "tipoDePago", "monto") if c not in columnas]
+    if faltantes:
+        raise FormatoImportacionError(f"Missing required columns: {', '.join(faltantes)}")
+    return columnas
+
+
+def _abrir_csv(archivo: BinaryIO) -> io.TextIOWrapper:
+    """
+    UTF-8 (with or without BOM) when the start of the file decodes as such,
+    otherwise latin-1, which is what Excel and most Argentine bank exports
+    write on Windows.
+    """
+    muestra = archivo.read(64 * 1024)
+    archivo.seek(0)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(muestra, final=False)
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        encoding = "latin-1"
+    return io.TextIOWrapper(archivo, encoding=encoding, newline="")
+
+
+def _filas_csv(archivo: BinaryIO) -> Iterator[tuple[int, dict]]:
+    texto = _abrir_csv(archivo)
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+    except csv.Error:
+        dialecto = csv.excel
+
+    reader = csv.reader(texto, dialecto)
+    header = next(reader, None)
+    if header is None:
+        raise FormatoImportacionError("Empty file")
+    columnas = _mapear_header(header)
+
+    def datos():
+        try:
+            for numero, valores in enumerate(reader, start=2):
+                if not any(v.strip() for v in valores):
+                    continue
+                yield numero, {c: v for c, v in zip(columnas, valores) if c is not None}
+        except UnicodeDecodeError:
+            raise FormatoImportacionError(f"File is not valid UTF-8 after row {reader.line_num}")
+
+    return datos()
+
+
+def _filas_xlsx(archivo: BinaryIO) -> Iterator[tuple[int, dict]]:
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        # read_only streams rows from the zipped sheet XML instead of building the whole workbook
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        raise FormatoImportacionError(f"Not a valid XLSX file: {e}")
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        header = next(filas, None)
+        if header is None:
+            raise FormatoImportacionError("Empty file")
+        columnas = _mapear_header(header)
+    except BaseException:
+        libro.close()
+        raise
+
+    def datos():
+        try:
+            for numero, valores in enumerate(filas, start=2):
+                if all(v is None or str(v).strip() == "" for v in valores):
+                    continue
+                yield numero, {c: v for c, v in zip(columnas, valores) if c is not None}
+        finally:
+            libro.close()
+
+    return datos()
+
+
+def leer_filas(nombre_archivo: str, archivo: BinaryIO) -> Iterator[tuple[int, dict]]:
+    """
+    Lazily yield (row number, {column: raw value}) from a CSV or XLSX upload.
+    Row numbers are 1-based and count the header, so they match what the user
+    sees in a spreadsheet. The file is opened and its header validated right
+    away, so an unreadable file raises FormatoImportacionError here rather
+    than halfway through the import.
+    """
+    nombre = (nombre_archivo or "").lower()
+    if nombre.endswith(".csv"):
+        return _filas_csv(archivo)
+    if nombre.endswith(".xlsx"):
+        return _filas_xlsx(archivo)
+    raise FormatoImportacionError("Unsupported file type, expected .csv or .xlsx")
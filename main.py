@@ -1,19 +1,50 @@
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.datastructures import Default
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
 import logging
 from dotenv import load_dotenv
-from api.routers import base, cotizaciones, inversiones, drive, finanzas
+from api.cache_http import CacheHTTPMiddleware
+from api.compresion import CompresionMiddleware
+from api.responses import OrjsonResponse
+from api.routers import base, cotizaciones, inversiones, drive, finanzas, debug
+from config import env_float
+from services.cache import QuoteRefresher
+from services.cache_backends import get_cache_backend
+from services.http_client import close_http_clients
 
 load_dotenv()
 logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Upstream HTTP clients are opened lazily on first use and pooled for the app's lifetime
+    # Resolve CACHE_BACKEND now, so a misconfiguration is logged at startup rather than on the first quote
+    get_cache_backend()
+    # QUOTE_REFRESH_INTERVAL (seconds) turns on refresh-ahead of hot quote cache keys
+    intervalo = env_float("QUOTE_REFRESH_INTERVAL", 0)
+    refresher = QuoteRefresher(intervalo) if intervalo > 0 else None
+    if refresher is not None:
+        refresher.start()
+    yield
+    if refresher is not None:
+        await refresher.stop()
+    await close_http_clients()
+
+
 app = FastAPI(
     title="Vercel + FastAPI",
     description="Vercel + FastAPI",
-    version="1.0.0"
+    version="1.0.0",
+    # Wrapped in Default() so routes with a response_model keep FastAPI's pydantic
+    # dump_json fast path; responses without one are rendered with orjson
+    default_response_class=Default(OrjsonResponse),
+    lifespan=lifespan
 )
 
 origins = [
@@ -23,6 +54,9 @@ origins = [
     "https://mis-gestiones-opal-kappa.vercel.app"
 ]
 
+app.add_middleware(CacheHTTPMiddleware)
+# Outside CacheHTTPMiddleware, so ETags are computed on the uncompressed body
+app.add_middleware(CompresionMiddleware, minimum_size=1024, gzip_level=6, brotli_quality=4)
 app.add_middleware( CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
@@ -36,4 +70,5 @@ app.include_router(base.router)
 app.include_router(finanzas.router)
 app.include_router(inversiones.router)
 app.include_router(cotizaciones.router)
-app.include_router(drive.router)
\ No newline at end of file
+app.include_router(drive.router)
+app.include_router(debug.router)
\ No newline at end of file
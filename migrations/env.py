@@ -0,0 +1,63 @@
+import os
+from logging.config import fileConfig
+
+from alembic import context
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, pool
+
+from structure import Base
+
+load_dotenv()
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+SCHEMAS = ("misgestiones", "inversiones")
+
+
+def include_name(name, type_, parent_names):
+    if type_ == "schema":
+        return name in SCHEMAS
+    return True
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # Objects that exist only in the database (e.g. the full-text expression
+    # indexes, which structure.py cannot declare portably) are never dropped
+    if reflected and compare_to is None:
+        return False
+    return True
+
+
+def _configurar(**kwargs):
+    context.configure(
+        target_metadata=target_metadata,
+        include_schemas=True,
+        include_name=include_name,
+        include_object=include_object,
+        **kwargs
+    )
+
+
+def run_migrations_offline() -> None:
+    """Emit the SQL instead of running it: alembic upgrade head --sql"""
+    _configurar(url=os.getenv("DATABASE_URL"), literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # A dedicated engine without the app's pool or statement_timeout: index builds can take a while
+    engine = create_engine(os.getenv("DATABASE_URL"), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        _configurar(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,45 @@
+"""Baseline: tables from docs/*.md plus the monthly rollup
+
+The finanzas and inversiones tables were created by hand with the SQL scripts
+in docs/ before migrations existed, so this revision only adds what is missing
+from such a database. Every statement is idempotent: `alembic upgrade head`
+works on both existing and fresh (already scripted) databases.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS misgestiones.finanzas_movimientogasto_resumenmensual (
+            mes TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            subcategoria UUID NOT NULL REFERENCES misgestiones.finanzas_subcategoria (id),
+            tipodepago VARCHAR(255) NOT NULL,
+            total DOUBLE PRECISION NOT NULL DEFAULT 0,
+            cantidad INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (mes, subcategoria, tipodepago)
+        )
+    """)
+    # Already in docs/inversiones.md; declared here so every database has them
+    op.create_index("idx_instrumento_codigo", "instrumento", ["codigo"], schema="inversiones", if_not_exists=True)
+    op.create_index("idx_precio_instrumento_fecha", "precio", ["instrumento_id", sa.text("fecha DESC")], schema="inversiones", if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("finanzas_movimientogasto_resumenmensual", schema="misgestiones")
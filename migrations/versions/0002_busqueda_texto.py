@@ -0,0 +1,61 @@
+"""pg_trgm and Spanish full-text indexes (docs/busqueda_texto.md)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRGM = [
+    ("idx_movimientogasto_comentarios_trgm", "misgestiones", "finanzas_movimientogasto", "comentarios"),
+    ("idx_vencimiento_comentarios_trgm", "misgestiones", "finanzas_vencimiento", "comentarios"),
+    ("idx_categoria_nombre_trgm", "misgestiones", "finanzas_categoria", "nombre"),
+    ("idx_subcategoria_nombre_trgm", "misgestiones", "finanzas_subcategoria", "nombre"),
+    ("idx_instrumento_nombre_trgm", "inversiones", "instrumento", "nombre"),
+]
+
+# Must match db._tsvector exactly or the planner will not use it
+FTS = [
+    ("idx_movimientogasto_comentarios_fts", "misgestiones", "finanzas_movimientogasto"),
+    ("idx_vencimiento_comentarios_fts", "misgestiones", "finanzas_vencimiento"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION misgestiones.f_unaccent(text)
+          RETURNS text
+          LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """)
+
+    # CONCURRENTLY so the tables stay writable while the indexes build; it cannot run in a transaction
+    with op.get_context().autocommit_block():
+        for nombre, schema, tabla, columna in TRGM:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {schema}.{tabla} USING gin ({columna} gin_trgm_ops)")
+        for nombre, schema, tabla in FTS:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {schema}.{tabla} "
+                f"USING gin (to_tsvector('spanish'::regconfig, misgestiones.f_unaccent(comentarios)))"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for nombre, schema, *_ in TRGM + FTS:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {schema}.{nombre}")
+    op.execute("DROP FUNCTION IF EXISTS misgestiones.f_unaccent(text)")
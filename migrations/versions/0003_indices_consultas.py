@@ -0,0 +1,49 @@
+"""Composite/partial indexes for the hot db.py queries
+
+- movimientos and vencimientos lists: WHERE active [AND fecha range] ORDER BY fecha, id
+- movimientos by subcategoria: WHERE active AND subcategoria IN (...) AND fecha range
+
+Check the plans with `python check_query_plans.py`.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDICES = [
+    ("idx_movimientogasto_activo_fecha", "finanzas_movimientogasto", ["fecha", "id"]),
+    ("idx_movimientogasto_activo_subcategoria_fecha", "finanzas_movimientogasto", ["subcategoria", "fecha"]),
+    ("idx_vencimiento_activo_fecha", "finanzas_vencimiento", ["fecha", "id"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for nombre, tabla, columnas in INDICES:
+            op.create_index(
+                nombre, tabla, columnas,
+                schema="misgestiones",
+                postgresql_where=sa.text("active"),
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for nombre, tabla, _ in INDICES:
+            op.drop_index(nombre, table_name=tabla, schema="misgestiones", postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,41 @@
+"""Spanish full-text indexes for the nombre filters (nombre_modo "fts")
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match db._tsvector exactly or the planner will not use it
+FTS = [
+    ("idx_categoria_nombre_fts", "misgestiones", "finanzas_categoria"),
+    ("idx_subcategoria_nombre_fts", "misgestiones", "finanzas_subcategoria"),
+    ("idx_instrumento_nombre_fts", "inversiones", "instrumento"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for nombre, schema, tabla in FTS:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {schema}.{tabla} "
+                f"USING gin (to_tsvector('spanish'::regconfig, misgestiones.f_unaccent(nombre)))"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for nombre, schema, _ in FTS:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {schema}.{nombre}")
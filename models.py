@@ -3,7 +3,7 @@ from pydantic import BaseModel
 from typing import Optional, Sequence
 import uuid
 
-class MovimientoGastoQueryParams(BaseModel):
+class MovimientoGastoFiltros(BaseModel):
     id: Optional[uuid.UUID] = None
     categoriaIds: Optional[Sequence[uuid.UUID]] = None
     subcategoriaIds: Optional[Sequence[uuid.UUID]] = None
@@ -12,13 +12,28 @@ class MovimientoGastoQueryParams(BaseModel):
     monto_min: Optional[float] = None
     monto_max: Optional[float] = None
     comentarios: Optional[str] = None
+    # "contains" (substring) or "fts" (accent-insensitive Spanish full-text search)
+    comentarios_modo: Optional[str] = "contains"
     desde_fecha: Optional[str] = None
     hasta_fecha: Optional[str] = None
     active: Optional[bool] = True
+
+    class Config:
+        from_attributes = True
+
+class MovimientoGastoQueryParams(MovimientoGastoFiltros):
     page_size: Optional[int] = 50
     page_number: Optional[int] = 1
+    # A column, a nested one like "subcategoria.nombre", or "relevancia" with comentarios_modo "fts"
     sort_by: Optional[str] = "fecha"
     sort_direction: Optional[str] = "desc"
+    # "offset" pages with page_number; "cursor" seeks from the next_cursor of the previous page
+    pagination_mode: Optional[str] = "offset"
+    cursor: Optional[str] = None
+    # "exact", "estimate" (capped count), "window" (count in the page query) or "none"
+    total_mode: Optional[str] = "exact"
+    # "orm" loads the entities; "projection" builds the results from one joined SELECT
+    load_mode: Optional[str] = "orm"
 
     class Config:
         from_attributes = True
@@ -93,15 +108,63 @@ class MovimientoGastoOut(BaseModel):
         from_attributes = True
 
 class MovimientoGastoSearchResults(BaseModel):
-    total: int
+    total: Optional[int] = None
+    total_is_estimate: bool = False
     page_number: int
     page_size: int
+    next_cursor: Optional[str] = None
     movimientos: list[MovimientoGastoOut]
 
     class Config:
       from_attributes = True
 
-class VencimientoQueryParams(BaseModel):
+class MovimientoGastoResumenParams(MovimientoGastoFiltros):
+    # Any combination of "categoria", "subcategoria", "tipoDePago" and "periodo"
+    group_by: list[str] = ["categoria"]
+    # date_trunc unit used when grouping by "periodo": day, week, month, quarter or year
+    periodo: Optional[str] = "month"
+
+class MovimientoGastoResumenGrupo(BaseModel):
+    categoriaId: Optional[uuid.UUID] = None
+    categoriaNombre: Optional[str] = None
+    subcategoriaId: Optional[uuid.UUID] = None
+    subcategoriaNombre: Optional[str] = None
+    tipoDePago: Optional[str] = None
+    periodo: Optional[datetime.datetime] = None
+    total: float
+    cantidad: int
+
+    class Config:
+        from_attributes = True
+
+class MovimientoGastoResumenOut(BaseModel):
+    grupos: list[MovimientoGastoResumenGrupo]
+
+    class Config:
+        from_attributes = True
+
+class ResumenMensualParams(BaseModel):
+    categoriaIds: Optional[Sequence[uuid.UUID]] = None
+    subcategoriaIds: Optional[Sequence[uuid.UUID]] = None
+    tiposDePago: Optional[Sequence[str]] = None
+    desde_mes: Optional[datetime.datetime] = None
+    hasta_mes: Optional[datetime.datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ImportacionErrorOut(BaseModel):
+    fila: int
+    error: str
+
+class MovimientoGastoImportOut(BaseModel):
+    insertados: int
+    errores: list[ImportacionErrorOut]
+
+    class Config:
+        from_attributes = True
+
+class VencimientoFiltros(BaseModel):
     id: Optional[uuid.UUID] = None
     categoriaIds: Optional[Sequence[uuid.UUID]] = None
     subcategoriaIds: Optional[Sequence[uuid.UUID]] = None
@@ -111,13 +174,25 @@ class VencimientoQueryParams(BaseModel):
     monto_min: Optional[float] = None
     monto_max: Optional[float] = None
     comentarios: Optional[str] = None
+    # "contains" (substring) or "fts" (accent-insensitive Spanish full-text search)
+    comentarios_modo: Optional[str] = "contains"
     desde_fecha: Optional[datetime.datetime] = None
     hasta_fecha: Optional[datetime.datetime] = None
     active: Optional[bool] = True
+
+    class Config:
+        from_attributes = True
+
+class VencimientoQueryParams(VencimientoFiltros):
     page_size: Optional[int] = 50
     page_number: Optional[int] = 1
+    # A column, a nested one like "subcategoria.nombre", or "relevancia" with comentarios_modo "fts"
     sort_by: Optional[str] = "fecha"
     sort_direction: Optional[str] = "asc"
+    # "exact", "estimate" (capped count), "window" (count in the page query) or "none"
+    total_mode: Optional[str] = "exact"
+    # "orm" loads the entities; "projection" builds the results from one joined SELECT
+    load_mode: Optional[str] = "orm"
 
     class Config:
         from_attributes = True
@@ -138,7 +213,8 @@ class VencimientoOut(BaseModel):
         from_attributes = True
 
 class VencimientoSearchResults(BaseModel):
-    total: int
+    total: Optional[int] = None
+    total_is_estimate: bool = False
     page_number: int
     page_size: int
     vencimientos: list[VencimientoOut]
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+reconstruir_resumen_mensual.py
+- Creates misgestiones.finanzas_movimientogasto_resumenmensual if it does not exist
+- Recomputes the monthly rollup of movimientos (mes x subcategoria x tipoDePago) from scratch
+
+db.py keeps the rollup current on every insert/update/soft-delete of MovimientoGasto;
+run this after the first deploy, after bulk edits made outside db.py, or if totals drift.
+
+Usage: python reconstruir_resumen_mensual.py
+Requires DATABASE_URL in .env
+"""
+
+import sys
+
+import db
+from structure import MovimientoGastoResumenMensual
+
+
+def main():
+    MovimientoGastoResumenMensual.__table__.create(db.database.engine, checkfirst=True)
+    try:
+        filas = db.reconstruir_resumen_mensual()
+    except Exception as e:
+        print("Error rebuilding resumen mensual:", e)
+        sys.exit(1)
+    print(f"Resumen mensual rebuilt: {filas} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,10 @@ from .exchange_service import get_exchange_service, ExchangeService
 from .crypto_service import get_crypto_service, CryptoService
 from .instrumento_service import get_instrumento_service, InstrumentoService
 from .fci_service import get_fci_service, FCIService
+from .catalogo_cafci import get_catalogo_cafci, CatalogoCAFCI
+from .http_client import get_http_client, close_http_clients
+from .cache import SingleFlight, single_flight, QuoteCache, QuoteRefresher, cache_stats
+from .cache_backends import CacheBackend, SQLiteBackend, RedisBackend, InMemoryRedis, get_cache_backend, set_cache_backend
 
 __all__ = [
     "get_exchange_service",
@@ -12,4 +16,19 @@ __all__ = [
     "InstrumentoService",
     "get_fci_service",
     "FCIService",
+    "get_catalogo_cafci",
+    "CatalogoCAFCI",
+    "get_http_client",
+    "close_http_clients",
+    "SingleFlight",
+    "single_flight",
+    "QuoteCache",
+    "QuoteRefresher",
+    "cache_stats",
+    "CacheBackend",
+    "SQLiteBackend",
+    "RedisBackend",
+    "InMemoryRedis",
+    "get_cache_backend",
+    "set_cache_backend",
 ]
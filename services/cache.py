@@ -0,0 +1,416 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import orjson
+
+from config import env_bool
+
+from .cache_backends import get_cache_backend
+
+logger = logging.getLogger("services.cache")
+
+
+class SingleFlight:
+    """
+    Request coalescing for upstream fetches: concurrent cache misses on the
+    same (namespace, key) await one in-flight fetch instead of each calling
+    the upstream. The fetch runs as its own task, so a caller that goes away
+    (client disconnect) does not cancel it for the others, and it should store
+    its result in the service cache itself.
+
+    Stats per namespace:
+      calls      misses that went through do()
+      fetches    upstream fetches actually started
+      coalesced  calls that joined a fetch already in flight
+      errors     fetches that raised (every waiter gets the exception)
+      in_flight  fetches running right now
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, namespace: str, campo: str):
+        with self._lock:
+            stats = self._stats.setdefault(namespace, {"calls": 0, "fetches": 0, "coalesced": 0, "errors": 0})
+            stats[campo] += 1
+
+    async def do(self, namespace: str, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        clave = (namespace, key)
+        self._count(namespace, "calls")
+
+        tarea = self._in_flight.get(clave)
+        # Tasks are bound to their event loop; one from another loop cannot be awaited here
+        if tarea is not None and not tarea.done() and tarea.get_loop() is loop:
+            self._count(namespace, "coalesced")
+            logger.debug(f"Coalesced {namespace}:{key} into the fetch in flight")
+            return await asyncio.shield(tarea)
+
+        self._count(namespace, "fetches")
+        tarea = loop.create_task(fetch())
+        self._in_flight[clave] = tarea
+
+        def terminar(t: asyncio.Task):
+            if self._in_flight.get(clave) is t:
+                del self._in_flight[clave]
+            # Reading the exception marks it retrieved even if every waiter was cancelled
+            if not t.cancelled() and t.exception() is not None:
+                self._count(namespace, "errors")
+
+        tarea.add_done_callback(terminar)
+        return await asyncio.shield(tarea)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            resultado = {namespace: {**stats, "in_flight": 0} for namespace, stats in self._stats.items()}
+        for namespace, _ in list(self._in_flight):
+            resultado[namespace]["in_flight"] += 1
+        return resultado
+
+
+# Shared by every service in services/
+single_flight = SingleFlight()
+
+
+
+def _tamano(valor: Any) -> int:
+    """Approximate size of a cached value: its serialized JSON length."""
+    try:
+        return len(orjson.dumps(valor, option=orjson.OPT_NON_STR_KEYS))
+    except TypeError:
+        return sys.getsizeof(valor)
+
+
+Fetch = Callable[[], Awaitable[Any]]
+
+
+class _Entrada:
+    __slots__ = ("valor", "guardado", "fetch", "hits", "tamano")
+
+    def __init__(self, valor: Any, fetch: Optional[Fetch], edad: float = 0.0):
+        self.valor = valor
+        self.guardado = time.monotonic() - edad
+        self.fetch = fetch
+        self.hits = 0
+        self.tamano = _tamano(valor)
+
+
+# namespace -> cache, for the refresher and cache_stats()
+_caches: Dict[str, "QuoteCache"] = {}
+# Background refreshes are only referenced from here until they finish
+_refrescos: Set[asyncio.Task] = set()
+
+
+class QuoteCache:
+    """
+    Bounded TTL cache for upstream quotes. Past `ttl` an entry is still served
+    for `stale` more (stale-while-revalidate) while one background fetch
+    replaces it, so only a request after ttl + stale waits for the upstream.
+    Misses go through single_flight. QUOTE_CACHE_SWR=off makes every expired
+    entry a plain miss.
+
+    At most `max_entries` entries and `max_bytes` (serialized size; None for
+    no cap) are kept, evicting the least recently used. Entries past
+    ttl + stale are swept on writes at most once per `ttl`.
+
+    `hot_keys` are always refreshed ahead of expiry by the QuoteRefresher once
+    cached; other keys only when they were read since their last fetch.
+
+    With a shared backend configured (see cache_backends.get_cache_backend)
+    fetched values are also written there, and a local miss or background
+    refresh first looks for another instance's copy before calling the
+    upstream. shared=False keeps a cache in-process only.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: timedelta,
+        stale: timedelta = timedelta(0),
+        hot_keys: Iterable[str] = (),
+        max_entries: int = 1000,
+        max_bytes: Optional[int] = 16 * 1024 * 1024,
+        shared: bool = True,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl.total_seconds()
+        self.stale = stale.total_seconds() if env_bool("QUOTE_CACHE_SWR", True) else 0.0
+        self.hot_keys = frozenset(hot_keys)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self._entradas: "OrderedDict[str, _Entrada]" = OrderedDict()
+        self._bytes = 0
+        self._ultimo_barrido = time.monotonic()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "shared_hits": 0, "evictions": 0, "expirations": 0}
+        _caches[namespace] = self
+
+    def _leer(self, key: str, limite: float) -> Optional[_Entrada]:
+        """Entry for `key` if younger than `limite` seconds, marked as recently used."""
+        entrada = self._entradas.get(key)
+        if entrada is None or time.monotonic() - entrada.guardado >= limite:
+            return None
+        self._entradas.move_to_end(key)
+        entrada.hits += 1
+        return entrada
+
+    def get(self, key: str) -> Any:
+        """Fresh value for `key`, or None."""
+        entrada = self._leer(key, self.ttl)
+        if entrada is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return entrada.valor
+
+    def peek(self, key: str) -> Any:
+        """Value for `key` however old it is, or None; does not count as a read."""
+        entrada = self._entradas.get(key)
+        return entrada.valor if entrada is not None else None
+
+    def set(self, key: str, valor: Any, fetch: Optional[Fetch] = None, edad: float = 0.0):
+        """Store in this instance only; `edad` is how many seconds ago the value was fetched."""
+        self._quitar(key)
+        entrada = _Entrada(valor, fetch, edad)
+        self._entradas[key] = entrada
+        self._bytes += entrada.tamano
+
+        if time.monotonic() - self._ultimo_barrido >= self.ttl:
+            self.sweep()
+        # The entry just written is never evicted, even if it alone is over max_bytes
+        while len(self._entradas) > 1 and (
+            len(self._entradas) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            self._quitar(next(iter(self._entradas)))
+            self._stats["evictions"] += 1
+
+    def _quitar(self, key: str) -> bool:
+        entrada = self._entradas.pop(key, None)
+        if entrada is None:
+            return False
+        self._bytes -= entrada.tamano
+        return True
+
+    def sweep(self) -> int:
+        """Drop entries past ttl + stale; returns how many."""
+        ahora = time.monotonic()
+        self._ultimo_barrido = ahora
+        vencidas = [key for key, entrada in self._entradas.items() if ahora - entrada.guardado >= self.ttl + self.stale]
+        for key in vencidas:
+            self._quitar(key)
+        self._stats["expirations"] += len(vencidas)
+        return len(vencidas)
+
+    def clear(self):
+        self._entradas.clear()
+        self._bytes = 0
+
+    async def get_or_fetch(self, key: str, fetch: Fetch, refresh: bool = False) -> Any:
+        """
+        Cached value for `key`, fetching it on a miss. A stale value is
+        returned right away and refreshed in the background. refresh=True
+        always waits for a fetch (joining one already in flight).
+        """
+        valor, _ = await self.get_or_fetch_with_source(key, fetch, refresh=refresh)
+        return valor
+
+    async def get_or_fetch_with_source(self, key: str, fetch: Fetch, refresh: bool = False) -> Tuple[Any, str]:
+        """
+        get_or_fetch plus where the value came from: "cache" (fresh in this
+        instance), "stale" (past ttl, refreshing in the background), "shared"
+        (another instance's copy in the backend) or "upstream" (fetched by this
+        call or by the one it was coalesced with).
+        """
+        entrada = None if refresh else self._leer(key, self.ttl + self.stale)
+        if entrada is not None:
+            if time.monotonic() - entrada.guardado < self.ttl:
+                self._stats["hits"] += 1
+                return entrada.valor, "cache"
+            self._stats["stale_hits"] += 1
+            self.refresh_in_background(key, fetch)
+            return entrada.valor, "stale"
+        self._stats["misses"] += 1
+        valor, vencido, origen = await single_flight.do(
+            self.namespace, key, lambda: self._cargar(key, fetch, leer_compartido=not refresh, aceptar_vencido=True)
+        )
+        if vencido:
+            # Only once the load above has left single_flight, or the refresh would just join it
+            self.refresh_in_background(key, fetch)
+        return valor, origen
+
+    async def _cargar(self, key: str, fetch: Fetch, leer_compartido: bool, aceptar_vencido: bool) -> Tuple[Any, bool, str]:
+        """
+        (value, stale, source) for `key`: the shared backend's copy when it is
+        fresh (or merely within the stale window, if `aceptar_vencido`),
+        otherwise a new fetch from the upstream that is written back to the
+        backend.
+        """
+        if leer_compartido:
+            compartido = await self._leer_compartido(key)
+            if compartido is not None:
+                valor, edad = compartido
+                if edad < self.ttl or aceptar_vencido:
+                    self._stats["shared_hits"] += 1
+                    self.set(key, valor, fetch, edad=edad)
+                    return valor, edad >= self.ttl, "shared"
+
+        valor = await fetch()
+        self.set(key, valor, fetch)
+        await self._escribir_compartido(key, valor)
+        return valor, False, "upstream"
+
+    async def _leer_compartido(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(value, age in seconds) from the shared backend if it holds one younger than ttl + stale."""
+        backend = get_cache_backend() if self.shared else None
+        if backend is None:
+            return None
+        try:
+            compartido = await asyncio.to_thread(backend.get, f"{self.namespace}:{key}")
+        except Exception as e:
+            # A backend outage degrades to per-instance caching
+            logger.warning(f"Cache backend read of {self.namespace}:{key} failed: {e}")
+            return None
+        if compartido is None:
+            return None
+        valor, guardado = compartido
+        edad = max(0.0, time.time() - guardado)
+        return (valor, edad) if edad < self.ttl + self.stale else None
+
+    async def _escribir_compartido(self, key: str, valor: Any):
+        backend = get_cache_backend() if self.shared else None
+        if backend is None:
+            return
+        try:
+            await asyncio.to_thread(backend.set, f"{self.namespace}:{key}", valor, self.ttl + self.stale)
+        except Exception as e:
+            logger.warning(f"Cache backend write of {self.namespace}:{key} failed: {e}")
+
+    def refresh_in_background(self, key: str, fetch: Optional[Fetch] = None, read_shared: bool = True) -> bool:
+        """
+        Start a background fetch of `key` (coalesced with any in flight); False
+        if there is nothing to fetch it with. read_shared=False skips the shared
+        backend's copy, for callers that know it is out of date too.
+        """
+        if fetch is None:
+            entrada = self._entradas.get(key)
+            fetch = entrada.fetch if entrada is not None else None
+        if fetch is None:
+            return False
+
+        tarea = asyncio.get_running_loop().create_task(single_flight.do(
+            self.namespace, key, lambda: self._cargar(key, fetch, leer_compartido=read_shared, aceptar_vencido=False)
+        ))
+        _refrescos.add(tarea)
+
+        def terminar(t: asyncio.Task):
+            _refrescos.discard(t)
+            if not t.cancelled() and t.exception() is not None:
+                # The stale value stays in place until the stale window closes
+                logger.warning(f"Background refresh of {self.namespace}:{key} failed: {t.exception()}")
+
+        tarea.add_done_callback(terminar)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "entries": len(self._entradas),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "stale_seconds": self.stale,
+            "backend": type(get_cache_backend()).__name__ if self.shared and get_cache_backend() is not None else None,
+        }
+
+    def keys(self) -> List[Dict[str, Any]]:
+        """Cached keys from least to most recently used, with their age, size and reads."""
+        ahora = time.monotonic()
+        return [
+            {"key": key, "age_seconds": round(ahora - entrada.guardado, 1), "bytes": entrada.tamano, "hits": entrada.hits}
+            for key, entrada in list(self._entradas.items())
+        ]
+
+    def _por_vencer(self, dentro_de: float):
+        """Entries worth refreshing now: hot or read since their last fetch, and expiring within `dentro_de` seconds."""
+        ahora = time.monotonic()
+        for key, entrada in list(self._entradas.items()):
+            if entrada.fetch is None or not (entrada.hits or key in self.hot_keys):
+                continue
+            restante = self.ttl - (ahora - entrada.guardado)
+            if restante < dentro_de and restante > -self.stale:
+                yield key, entrada
+
+
+class QuoteRefresher:
+    """
+    Optional refresh-ahead loop: every `interval` seconds it refreshes, in the
+    background, up to `max_keys` cached entries that would expire before the
+    next round (hot keys first, then the most read). Off by default since a
+    serverless instance may be frozen between requests; main.py starts it when
+    QUOTE_REFRESH_INTERVAL is set.
+    """
+
+    def __init__(self, interval: float, max_keys: int = 20):
+        self.interval = interval
+        self.max_keys = max_keys
+        self._tarea: Optional[asyncio.Task] = None
+
+    def ronda(self) -> int:
+        for cache in list(_caches.values()):
+            cache.sweep()
+        candidatos = [
+            (key in cache.hot_keys, entrada.hits, cache, key)
+            for cache in list(_caches.values())
+            for key, entrada in cache._por_vencer(self.interval)
+        ]
+        candidatos.sort(key=lambda c: (c[0], c[1]), reverse=True)
+        refrescados = 0
+        for _, _, cache, key in candidatos[:self.max_keys]:
+            refrescados += cache.refresh_in_background(key)
+        if refrescados:
+            logger.debug(f"Quote refresher started {refrescados} refreshes")
+        return refrescados
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.ronda()
+            except Exception:
+                logger.exception("Quote refresher round failed")
+
+    def start(self):
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+
+def get_cache(namespace: str) -> Optional[QuoteCache]:
+    return _caches.get(namespace)
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-namespace QuoteCache stats, with the single_flight counters for the same namespace."""
+    vuelos = single_flight.stats()
+    return {
+        namespace: {**cache.stats(), "single_flight": vuelos.get(namespace)}
+        for namespace, cache in sorted(_caches.items())
+    }
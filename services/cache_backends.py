@@ -0,0 +1,204 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger("services.cache_backends")
+
+_SIN_CONFIGURAR = object()
+
+
+class CacheBackend:
+    """
+    Store shared between app instances underneath the in-process QuoteCaches,
+    so a cold instance starts from the warm copy another one fetched. Values
+    travel as orjson bytes together with the wall-clock time they were
+    fetched, which lets every instance apply its own TTL / stale window.
+    Subclasses implement _leer/_escribir/_borrar on raw bytes.
+    """
+
+    def __init__(self, prefijo: str = "misgestiones:cache:"):
+        self.prefijo = prefijo
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(value, fetched-at epoch seconds) or None."""
+        datos = self._leer(self.prefijo + key)
+        if datos is None:
+            return None
+        sobre = orjson.loads(datos)
+        return sobre["v"], sobre["t"]
+
+    def set(self, key: str, valor: Any, ttl: float, guardado: Optional[float] = None):
+        """Store `valor` for `ttl` seconds; `guardado` defaults to now."""
+        sobre = {"t": time.time() if guardado is None else guardado, "v": valor}
+        self._escribir(self.prefijo + key, orjson.dumps(sobre, option=orjson.OPT_NON_STR_KEYS), ttl)
+
+    def delete(self, key: str):
+        self._borrar(self.prefijo + key)
+
+    def _leer(self, clave: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def _escribir(self, clave: str, datos: bytes, ttl: float):
+        raise NotImplementedError
+
+    def _borrar(self, clave: str):
+        raise NotImplementedError
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    On-disk cache in a SQLite file, by default in /tmp: the one writable
+    directory on Vercel, kept while the instance's sandbox is reused and shared
+    by every worker process on a regular host.
+    """
+
+    def __init__(self, path: str = "/tmp/misgestiones-cache.sqlite", **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._local = threading.local()
+        self._ultima_purga = 0.0
+        with self._conexion() as conexion:
+            conexion.execute("CREATE TABLE IF NOT EXISTS cache (clave TEXT PRIMARY KEY, datos BLOB NOT NULL, expira REAL NOT NULL)")
+
+    def _conexion(self) -> sqlite3.Connection:
+        # sqlite3 connections stay in the thread that opened them
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.path, timeout=5)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def _leer(self, clave: str) -> Optional[bytes]:
+        fila = self._conexion().execute(
+            "SELECT datos FROM cache WHERE clave = ? AND expira > ?", (clave, time.time())
+        ).fetchone()
+        return fila[0] if fila else None
+
+    def _escribir(self, clave: str, datos: bytes, ttl: float):
+        ahora = time.time()
+        with self._conexion() as conexion:
+            conexion.execute("INSERT OR REPLACE INTO cache (clave, datos, expira) VALUES (?, ?, ?)", (clave, datos, ahora + ttl))
+            if ahora - self._ultima_purga > 3600:
+                conexion.execute("DELETE FROM cache WHERE expira <= ?", (ahora,))
+                self._ultima_purga = ahora
+
+    def _borrar(self, clave: str):
+        with self._conexion() as conexion:
+            conexion.execute("DELETE FROM cache WHERE clave = ?", (clave,))
+
+
+class RedisBackend(CacheBackend):
+    """
+    Redis (or any server speaking its protocol: Valkey, Upstash, ...). Takes a
+    synchronous redis-py style client, so it can run locally on
+    InMemoryRedis (or fakeredis.FakeRedis()); from_url() needs the redis
+    package (requirements-redis.txt).
+    """
+
+    def __init__(self, client, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisBackend":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis needs the redis package (pip install -r requirements-redis.txt)")
+        return cls(redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2), **kwargs)
+
+    def _leer(self, clave: str) -> Optional[bytes]:
+        return self.client.get(clave)
+
+    def _escribir(self, clave: str, datos: bytes, ttl: float):
+        self.client.set(clave, datos, px=max(1, int(ttl * 1000)))
+
+    def _borrar(self, clave: str):
+        self.client.delete(clave)
+
+
+class InMemoryRedis:
+    """
+    The part of redis-py's client RedisBackend uses (get, set with px, delete),
+    kept in a dict, to run the Redis code path without a server:
+    set_cache_backend(RedisBackend(InMemoryRedis())) or CACHE_BACKEND=redis
+    with CACHE_REDIS_URL=memory://. Shared by the caches of one process only.
+    """
+
+    def __init__(self):
+        self._datos = {}
+        self._lock = threading.Lock()
+
+    def get(self, clave: str) -> Optional[bytes]:
+        with self._lock:
+            datos, expira = self._datos.get(clave, (None, None))
+            if expira is not None and expira <= time.monotonic():
+                del self._datos[clave]
+                return None
+            return datos
+
+    def set(self, clave: str, datos: bytes, px: Optional[int] = None):
+        with self._lock:
+            self._datos[clave] = (datos, None if px is None else time.monotonic() + px / 1000)
+        return True
+
+    def delete(self, *claves: str) -> int:
+        with self._lock:
+            return sum(self._datos.pop(clave, None) is not None for clave in claves)
+
+
+_backend = _SIN_CONFIGURAR
+
+
+def _crear_backend() -> Optional[CacheBackend]:
+    """
+    Backend from the environment:
+      CACHE_BACKEND      memory (default: in-process caches only), sqlite or redis
+      CACHE_SQLITE_PATH  SQLite file, default /tmp/misgestiones-cache.sqlite
+      CACHE_REDIS_URL    Redis URL, default REDIS_URL; memory:// uses InMemoryRedis
+      CACHE_PREFIX       key prefix, default misgestiones:cache:
+    """
+    tipo = (os.getenv("CACHE_BACKEND") or "memory").strip().lower()
+    kwargs = {"prefijo": os.getenv("CACHE_PREFIX") or "misgestiones:cache:"}
+    if tipo == "memory":
+        return None
+    if tipo == "sqlite":
+        return SQLiteBackend(os.getenv("CACHE_SQLITE_PATH") or "/tmp/misgestiones-cache.sqlite", **kwargs)
+    if tipo == "redis":
+        url = os.getenv("CACHE_REDIS_URL") or os.getenv("REDIS_URL")
+        if not url:
+            raise RuntimeError("CACHE_BACKEND=redis needs CACHE_REDIS_URL or REDIS_URL")
+        if url == "memory://":
+            return RedisBackend(InMemoryRedis(), **kwargs)
+        return RedisBackend.from_url(url, **kwargs)
+    raise ValueError(f"Unknown CACHE_BACKEND '{tipo}' (expected memory, sqlite or redis)")
+
+
+def get_cache_backend() -> Optional[CacheBackend]:
+    """
+    Shared backend configured from the environment on first use; None means
+    in-process only. The environment is read once: a misconfigured backend is
+    logged and the caches stay in-process, instead of failing every lookup.
+    """
+    global _backend
+    if _backend is _SIN_CONFIGURAR:
+        try:
+            _backend = _crear_backend()
+        except Exception as e:
+            logger.error(f"Cache backend not configured, quote caches stay in-process: {e}")
+            _backend = None
+        if _backend is not None:
+            logger.info(f"Quote caches shared through {type(_backend).__name__}")
+    return _backend
+
+
+def set_cache_backend(backend: Optional[CacheBackend]):
+    """Replace the shared backend (e.g. RedisBackend(InMemoryRedis()) locally); None for in-process only."""
+    global _backend
+    _backend = backend
@@ -1,10 +1,14 @@
+import logging
 import unicodedata
+from typing import List, Tuple
 
-import requests
-import pandas as pd
 import json
 import io
 
+from .http_client import get_http_client
+
+logger = logging.getLogger("services.cafci")
+
 def normalize_string(text: str) -> str:
     """Removes accents and converts to lowercase."""
     if not text:
@@ -15,49 +19,108 @@ def normalize_string(text: str) -> str:
     text = "".join(c for c in text if unicodedata.category(c) != 'Mn')
     return text.lower()
 
-def get_cafci_data_list(file_buffer):
-    """Parses Excel and returns a list of dictionaries (no file saving)."""
+# Workbook layout: header on row 12, funds from row 13; the columns used are A, B, F, S and U
+_PRIMERA_FILA = 13
+_COLUMNAS = {'nombre': 0, 'moneda': 1, 'precio_actual': 5, 'codigo_cnv': 18, 'codigo_cafci': 20}
+
+
+def _vacia(valor) -> bool:
+    return valor is None or (isinstance(valor, str) and valor.strip() == "")
+
+
+def parse_cafci_workbook(file_buffer) -> Tuple[List[dict], List[dict]]:
+    """
+    Parses the CAFCI daily workbook into (funds, rejected rows). Blank rows and
+    section headings (a name and nothing else) are skipped; any other row
+    missing one of the five columns or with a non-numeric price or code is
+    returned in rejected as {"fila": sheet row, "nombre", "motivo"}.
+    """
+    from openpyxl import load_workbook
+
     file_buffer.seek(0)
-    df = pd.read_excel(file_buffer, header=11, usecols=[0, 1, 5, 18, 20], engine='openpyxl')
-    df.columns = ['nombre', 'moneda', 'precio_actual', 'codigo_cnv', 'codigo_cafci']
-    
-    result_list = []
-    for _, row in df.iterrows():
-        try:
-            if row.isnull().any(): continue
-            result_list.append({
-                "nombre": str(row['nombre']).strip(),
-                "moneda": str(row['moneda']).strip(),
-                "precio_actual": float(row['precio_actual']) / 1000,  # Convert from thousands
-                "codigo_cnv": int(row['codigo_cnv']),
-                "codigo_cafci": int(row['codigo_cafci'])
+    # read_only streams rows from the zipped sheet XML, with no DataFrame in between
+    libro = load_workbook(file_buffer, read_only=True, data_only=True)
+    try:
+        hoja = libro.worksheets[0]
+        # The sheet's stored dimension can be wrong; read up to the last row actually present
+        hoja.reset_dimensions()
+        filas = hoja.iter_rows(min_row=_PRIMERA_FILA, max_col=max(_COLUMNAS.values()) + 1, values_only=True)
+
+        fondos, rechazadas = [], []
+        for numero, fila in enumerate(filas, start=_PRIMERA_FILA):
+            valores = {c: fila[i] if i < len(fila) else None for c, i in _COLUMNAS.items()}
+            faltantes = [c for c, v in valores.items() if _vacia(v)]
+            if len(faltantes) == len(_COLUMNAS) or faltantes == list(_COLUMNAS)[1:]:
+                continue
+
+            numeros = {}
+            for columna, convertir in (('precio_actual', float), ('codigo_cnv', int), ('codigo_cafci', int)):
+                if columna not in faltantes:
+                    try:
+                        numeros[columna] = convertir(valores[columna])
+                    except (TypeError, ValueError):
+                        pass
+            invalidos = [c for c in ('precio_actual', 'codigo_cnv', 'codigo_cafci') if c not in faltantes and c not in numeros]
+
+            if not faltantes and not invalidos:
+                fondos.append({
+                    "nombre": str(valores['nombre']).strip(),
+                    "moneda": str(valores['moneda']).strip(),
+                    "precio_actual": numeros['precio_actual'] / 1000,  # Convert from thousands
+                    "codigo_cnv": numeros['codigo_cnv'],
+                    "codigo_cafci": numeros['codigo_cafci'],
+                })
+                continue
+
+            motivos = []
+            if faltantes:
+                motivos.append("missing " + ", ".join(faltantes))
+            if invalidos:
+                motivos.append("not a number: " + ", ".join(invalidos))
+            rechazadas.append({
+                "fila": numero,
+                "nombre": None if _vacia(valores['nombre']) else str(valores['nombre']).strip(),
+                "motivo": "; ".join(motivos),
             })
-        except: continue
-    return result_list
+        return fondos, rechazadas
+    finally:
+        libro.close()
+
 
-def download_cafci_to_memory():
+def get_cafci_data_list(file_buffer):
+    """Parses Excel and returns a list of dictionaries (no file saving); rejected rows are logged."""
+    fondos, rechazadas = parse_cafci_workbook(file_buffer)
+    if rechazadas:
+        detalle = ", ".join(f"row {r['fila']} {r['nombre']!r} ({r['motivo']})" for r in rechazadas[:10])
+        mas = f" and {len(rechazadas) - 10} more" if len(rechazadas) > 10 else ""
+        logger.warning(f"CAFCI workbook: {len(rechazadas)} rows rejected: {detalle}{mas}")
+    return fondos
+
+async def download_cafci_to_memory():
     """
     Downloads the CAFCI file and returns it as a BytesIO object (in-memory).
+    The body is streamed into the buffer on the pooled client, so the event
+    loop keeps serving other requests while it arrives.
     """
     url = "https://api.pub.cafci.org.ar/pb_get?d=1778263751866"
-    
+
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        # 1. Wrap the binary content in a BytesIO object
-        file_in_memory = io.BytesIO(response.content)
-        
-        # 2. Calculate size from the buffer
-        file_size_kb = len(response.content) / 1024
-        
+        client = get_http_client("cafci_planilla")
+        file_in_memory = io.BytesIO()
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                file_in_memory.write(chunk)
+
+        file_size_kb = file_in_memory.tell() / 1024
+        file_in_memory.seek(0)
+
         return {
             "success": True,
             "message": "File downloaded to memory successfully.",
             "size_kb": round(file_size_kb, 2),
             "file": file_in_memory  # This is your 'virtual' file
         }
-        
+
     except Exception as e:
         return {"success": False, "message": str(e)}
-    
\ No newline at end of file
@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import QuoteCache
+from .cafci import download_cafci_to_memory, get_cafci_data_list
+from .fci_index import FCICatalogIndex, NameIndex
+from .fci_service import FCIService, get_fci_service
+from .http_client import get_http_client
+
+logger = logging.getLogger("services.catalogo_cafci")
+
+ESTADISTICAS_URL = "https://estadisticas.cafci.org.ar/consulta-de-fondos.json"
+
+# Tables in a snapshot and the source each one is loaded from
+TABLAS = {
+    "fondos": "api.pub.cafci.org.ar fondo list",
+    "clases": "estadisticas.cafci.org.ar consulta-de-fondos.json",
+    "precios": "CAFCI daily workbook",
+}
+
+
+async def cargar_fondos(log: bool = False) -> List[Dict[str, Any]]:
+    """Fondos with their clase_fondos from the api.pub catalog, projected to the fields the searches return."""
+    catalogo = await get_fci_service().fetch_catalog(log=log)
+    return [FCIService._project_fondo(fondo) for fondo in catalogo]
+
+
+async def cargar_clases(log: bool = False) -> List[Dict[str, Any]]:
+    """One row per clase from the estadisticas JSON, with its fondo's id, CNV code, name and currency."""
+    client = get_http_client("cafci_estadisticas")
+    resp = await client.get(ESTADISTICAS_URL)
+    if log:
+        logger.info(f"GET {ESTADISTICAS_URL} -> status={resp.status_code}, bytes={len(resp.content) if resp.content is not None else 0}")
+    if resp.status_code >= 400:
+        raise ConnectionError(f"Error fetching CAFCI estadisticas: status {resp.status_code}")
+
+    resp_json = resp.json()
+    data = resp_json.get("Response", {}).get("json", resp_json)
+
+    filas = []
+    for fondo in data.get("fondos", []) or []:
+        fondo_id = fondo.get("id")
+        codigo = fondo.get("codigo_cnv") or fondo.get("codigoCNV") or fondo.get("codigoCnv")
+        moneda_obj = fondo.get("moneda")
+        if isinstance(moneda_obj, dict):
+            moneda = moneda_obj.get("nombre") or str(moneda_obj.get("id", ""))
+        elif moneda_obj is None:
+            moneda = None
+        else:
+            moneda = str(moneda_obj)
+
+        for clase in fondo.get("clases") or []:
+            clase_id = clase.get("id")
+            filas.append({
+                "fondo_id": str(fondo_id) if fondo_id is not None else "",
+                "codigo_cnv": codigo,
+                "fondo_nombre": fondo.get("nombre"),
+                "fondo_moneda": moneda,
+                "clase_id": str(clase_id) if clase_id is not None else "",
+                "clase_nombre": clase.get("nombre"),
+            })
+    return filas
+
+
+async def cargar_precios(log: bool = False) -> List[Dict[str, Any]]:
+    """Latest price per fund from the daily CAFCI workbook."""
+    download = await download_cafci_to_memory()
+    if not download["success"]:
+        raise ConnectionError(f"Error fetching CAFCI workbook: {download['message']}")
+    # Parsing takes a few hundred ms of CPU: keep it off the event loop
+    precios = await asyncio.to_thread(get_cafci_data_list, download["file"])
+    if log:
+        logger.info(f"CAFCI workbook: {download['size_kb']} KiB, {len(precios)} funds")
+    return precios
+
+
+_CARGADORES = {"fondos": cargar_fondos, "clases": cargar_clases, "precios": cargar_precios}
+
+
+class _Indices:
+    """
+    Lookup structures over one snapshot, built once when it is first searched:
+    the names folded and tokenized (NameIndex) and hash indexes on the exact codes.
+    """
+
+    def __init__(self, snapshot: Dict[str, Any]):
+        identidad = lambda fila: fila
+        self.fondos = FCICatalogIndex(snapshot["fondos"] or [], identidad, identidad)
+
+        self.clases = snapshot["clases"] or []
+        self._clases_por_cnv: Dict[str, List[int]] = defaultdict(list)
+        for posicion, fila in enumerate(self.clases):
+            if fila["codigo_cnv"] is not None:
+                self._clases_por_cnv[str(fila["codigo_cnv"]).strip()].append(posicion)
+        self._nombres_fondo = NameIndex(fila["fondo_nombre"] for fila in self.clases)
+        self._nombres_clase = NameIndex(fila["clase_nombre"] for fila in self.clases)
+
+        self.precios = snapshot["precios"] or []
+        self._precios_por_cnv: Dict[int, List[int]] = defaultdict(list)
+        self._precios_por_cafci: Dict[int, List[int]] = defaultdict(list)
+        for posicion, fila in enumerate(self.precios):
+            self._precios_por_cnv[fila["codigo_cnv"]].append(posicion)
+            self._precios_por_cafci[fila["codigo_cafci"]].append(posicion)
+        self._nombres_precio = NameIndex(fila["nombre"] for fila in self.precios)
+
+    def search_clases(self, codigo_cnv: str = "", keywords: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        posiciones = None
+        if codigo_cnv:
+            posiciones = set(self._clases_por_cnv.get(codigo_cnv, []))
+        if keywords:
+            # A clase matches when every keyword is in its fondo's name or every keyword is in its own
+            por_nombre = set(self._nombres_fondo.search(keywords)) | set(self._nombres_clase.search(keywords))
+            posiciones = por_nombre if posiciones is None else posiciones & por_nombre
+        if posiciones is None:
+            return list(self.clases)
+        return [self.clases[p] for p in sorted(posiciones)]
+
+    def search_precios(self, keywords: Optional[List[str]] = None, codigo_cnv: Optional[int] = None,
+                       codigo_cafci: Optional[int] = None) -> List[Dict[str, Any]]:
+        posiciones = FCICatalogIndex._intersect(
+            self._nombres_precio.search(keywords) if keywords else None,
+            self._precios_por_cnv.get(codigo_cnv, []) if codigo_cnv is not None else None,
+            self._precios_por_cafci.get(codigo_cafci, []) if codigo_cafci is not None else None,
+        )
+        return self.precios if posiciones is None else [self.precios[p] for p in posiciones]
+
+
+class CatalogoCAFCI:
+    """
+    The one CAFCI catalog every fund endpoint reads: a snapshot with three
+    normalized tables loaded together from their sources (see TABLAS) and
+    cached as a single entry, so there is one copy and one refresh schedule.
+
+    A snapshot is fresh for the day it was loaded: the first request of a new
+    day (or past CACHE_DURATION) still gets it while the next one loads in the
+    background. A table whose source fails keeps the previous snapshot's rows,
+    and the load is retried after RETRY_DURATION; only a load where every
+    source fails with nothing to fall back on raises. The raw payloads are
+    dropped once normalized. Loads go through single_flight, so requests
+    that find the snapshot missing or out of date at the same time share one.
+    """
+
+    CACHE_DURATION = timedelta(hours=24)
+    STALE_DURATION = timedelta(hours=24)
+    RETRY_DURATION = timedelta(minutes=5)
+    CLAVE = "catalogo"
+
+    def __init__(self):
+        self._cache = QuoteCache(
+            "cafci_catalogo", self.CACHE_DURATION, self.STALE_DURATION, hot_keys=(self.CLAVE,),
+            max_entries=1, max_bytes=None,
+        )
+        # (snapshot they were built from, indices)
+        self._indices: Optional[Tuple[Dict[str, Any], _Indices]] = None
+        # time.monotonic() before which no other reload is started
+        self._proxima_recarga = 0.0
+
+    async def snapshot(self, refresh: bool = False, log: bool = False) -> Dict[str, Any]:
+        """Current snapshot; refresh=True waits for a new load of every source."""
+        snapshot = await self._cache.get_or_fetch(self.CLAVE, lambda: self._cargar(log), refresh=refresh)
+        desactualizado = snapshot["fecha"] != date.today().isoformat()
+        reintentar = snapshot["errores"] and time.time() - snapshot["cargado"] > self.RETRY_DURATION.total_seconds()
+        if (desactualizado or reintentar) and time.monotonic() >= self._proxima_recarga:
+            # The shared backend's copy is the same out-of-date snapshot, still within its TTL: go to the sources.
+            # A reload that fails altogether is not retried before RETRY_DURATION either.
+            self._proxima_recarga = time.monotonic() + self.RETRY_DURATION.total_seconds()
+            self._cache.refresh_in_background(self.CLAVE, lambda: self._cargar(log), read_shared=False)
+        return snapshot
+
+    async def _cargar(self, log: bool) -> Dict[str, Any]:
+        previo = self._cache.peek(self.CLAVE) or {}
+        resultados = await asyncio.gather(*(cargar(log=log) for cargar in _CARGADORES.values()), return_exceptions=True)
+
+        snapshot = {"fecha": date.today().isoformat(), "cargado": time.time(), "errores": {}}
+        for tabla, resultado in zip(_CARGADORES, resultados):
+            if isinstance(resultado, BaseException):
+                logger.warning(f"CAFCI catalog: loading {tabla} from the {TABLAS[tabla]} failed: {resultado}")
+                snapshot["errores"][tabla] = str(resultado)
+                snapshot[tabla] = previo.get(tabla)
+            else:
+                snapshot[tabla] = resultado
+
+        if all(snapshot[tabla] is None for tabla in TABLAS):
+            # Nothing to serve: not cached, the next request tries again
+            raise ConnectionError("; ".join(f"{tabla}: {error}" for tabla, error in snapshot["errores"].items()))
+        if log:
+            logger.info("CAFCI catalog loaded: " + ", ".join(f"{len(snapshot[t] or [])} {t}" for t in TABLAS))
+        return snapshot
+
+    async def _tabla(self, tabla: str, refresh: bool, log: bool) -> Tuple[Dict[str, Any], _Indices]:
+        snapshot = await self.snapshot(refresh=refresh, log=log)
+        if snapshot[tabla] is None:
+            raise ConnectionError(snapshot["errores"].get(tabla, f"CAFCI {tabla} not loaded"))
+        if self._indices is None or self._indices[0] is not snapshot:
+            self._indices = (snapshot, _Indices(snapshot))
+        return snapshot, self._indices[1]
+
+    async def search_fondos(self, codigo_cnv: str = "", keywords: Optional[List[str]] = None,
+                            refresh: bool = False, log: bool = False) -> List[Dict[str, Any]]:
+        """Fondos (api.pub catalog) by exact codigoCNV and/or name keywords."""
+        _, indices = await self._tabla("fondos", refresh, log)
+        return indices.fondos.search_fondos(codigo_cnv=codigo_cnv, keywords=keywords)
+
+    async def search_clase_fondos(self, id: str = "", fondo_id: str = "", keywords: Optional[List[str]] = None,
+                                  refresh: bool = False, log: bool = False) -> List[Dict[str, Any]]:
+        """clase_fondos (api.pub catalog) by exact id, parent fondoId and/or name keywords."""
+        _, indices = await self._tabla("fondos", refresh, log)
+        return indices.fondos.search_clases(id=id, fondo_id=fondo_id, keywords=keywords)
+
+    async def search_clases(self, codigo_cnv: str = "", keywords: Optional[List[str]] = None,
+                            refresh: bool = False, log: bool = False) -> List[Dict[str, Any]]:
+        """Clase rows (estadisticas) by exact codigo_cnv and/or keywords in the fondo's or clase's name."""
+        _, indices = await self._tabla("clases", refresh, log)
+        return indices.search_clases(codigo_cnv=codigo_cnv, keywords=keywords)
+
+    async def precios(self, refresh: bool = False, log: bool = False) -> List[Dict[str, Any]]:
+        """Every fund in the daily workbook with its latest price."""
+        snapshot, _ = await self._tabla("precios", refresh, log)
+        return snapshot["precios"]
+
+    async def search_precios(self, keywords: Optional[List[str]] = None, codigo_cnv: Optional[int] = None,
+                             codigo_cafci: Optional[int] = None, refresh: bool = False,
+                             log: bool = False) -> List[Dict[str, Any]]:
+        """Funds in the daily workbook by name keywords (all must match) and/or exact CNV / CAFCI code."""
+        _, indices = await self._tabla("precios", refresh, log)
+        return indices.search_precios(keywords=keywords, codigo_cnv=codigo_cnv, codigo_cafci=codigo_cafci)
+
+
+_catalogo_cafci_instance = None
+
+
+def get_catalogo_cafci() -> CatalogoCAFCI:
+    """Get singleton CAFCI catalog instance"""
+    global _catalogo_cafci_instance
+    if _catalogo_cafci_instance is None:
+        _catalogo_cafci_instance = CatalogoCAFCI()
+    return _catalogo_cafci_instance
@@ -1,7 +1,9 @@
-import httpx
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 
+from .cache import QuoteCache
+from .http_client import get_http_client
+
 class CryptoService:
     """
     Service for fetching cryptocurrency prices using CoinGecko API
@@ -10,21 +12,11 @@ class CryptoService:
     
     BASE_URL = "https://api.coingecko.com/api/v3"
     CACHE_DURATION = timedelta(minutes=2)  # Cache for 2 minutes (crypto changes fast)
+    # Served while a background refresh runs; no longer than the TTL, so a price is at most 4 minutes old
+    STALE_DURATION = timedelta(minutes=2)
     
     def __init__(self):
-        self._cache: Dict[str, tuple[datetime, Any]] = {}
-    
-    def _get_cached(self, key: str) -> Any:
-        """Get cached data if still valid"""
-        if key in self._cache:
-            timestamp, data = self._cache[key]
-            if datetime.now() - timestamp < self.CACHE_DURATION:
-                return data
-        return None
-    
-    def _set_cache(self, key: str, data: Any):
-        """Set cache data"""
-        self._cache[key] = (datetime.now(), data)
+        self._cache = QuoteCache("crypto", self.CACHE_DURATION, self.STALE_DURATION)
     
     async def get_precio_simple(
         self,
@@ -46,29 +38,23 @@ class CryptoService:
             Dict with prices and additional data
         """
         cache_key = f"price_{'_'.join(ids)}_{'_'.join(vs_currencies)}"
-        cached = self._get_cached(cache_key)
-        if cached:
-            return cached
-        
+        params = {
+            "ids": ",".join(ids),
+            "vs_currencies": ",".join(vs_currencies),
+            "include_24hr_change": str(include_24hr_change).lower(),
+            "include_market_cap": str(include_market_cap).lower()
+        }
+        return await self._cache.get_or_fetch(cache_key, lambda: self._fetch_precio_simple(params))
+    
+    async def _fetch_precio_simple(self, params: Dict[str, str]) -> Dict[str, Any]:
         try:
-            params = {
-                "ids": ",".join(ids),
-                "vs_currencies": ",".join(vs_currencies),
-                "include_24hr_change": str(include_24hr_change).lower(),
-                "include_market_cap": str(include_market_cap).lower()
-            }
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.BASE_URL}/simple/price",
-                    params=params,
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                self._set_cache(cache_key, data)
-                return data
+            client = get_http_client("coingecko")
+            response = await client.get(
+                f"{self.BASE_URL}/simple/price",
+                params=params
+            )
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
             raise ValueError(f"Error fetching crypto prices: {str(e)}")
     
@@ -117,45 +103,40 @@ class CryptoService:
             List of top cryptocurrencies with detailed data
         """
         cache_key = f"top_{limit}_{vs_currency}_{order}"
-        cached = self._get_cached(cache_key)
-        if cached:
-            return cached
-        
+        params = {
+            "vs_currency": vs_currency,
+            "order": order,
+            "per_page": limit,
+            "page": 1,
+            "sparkline": False
+        }
+        return await self._cache.get_or_fetch(cache_key, lambda: self._fetch_top_cryptos(params, vs_currency))
+    
+    async def _fetch_top_cryptos(self, params: Dict[str, Any], vs_currency: str) -> List[Dict[str, Any]]:
         try:
-            params = {
-                "vs_currency": vs_currency,
-                "order": order,
-                "per_page": limit,
-                "page": 1,
-                "sparkline": False
-            }
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.BASE_URL}/coins/markets",
-                    params=params,
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                data = response.json()
+            client = get_http_client("coingecko")
+            response = await client.get(
+                f"{self.BASE_URL}/coins/markets",
+                params=params
+            )
+            response.raise_for_status()
+            data = response.json()
                 
-                # Normalize response
-                results = []
-                for coin in data:
-                    results.append({
-                        "id": coin.get("id"),
-                        "simbolo": coin.get("symbol", "").upper(),
-                        "nombre": coin.get("name"),
-                        "precio_actual": coin.get("current_price"),
-                        "market_cap": coin.get("market_cap"),
-                        "volumen_24h": coin.get("total_volume"),
-                        "cambio_24h": coin.get("price_change_percentage_24h"),
-                        "imagen": coin.get("image"),
-                        "moneda": vs_currency.upper()
-                    })
-                
-                self._set_cache(cache_key, results)
-                return results
+            # Normalize response
+            results = []
+            for coin in data:
+                results.append({
+                    "id": coin.get("id"),
+                    "simbolo": coin.get("symbol", "").upper(),
+                    "nombre": coin.get("name"),
+                    "precio_actual": coin.get("current_price"),
+                    "market_cap": coin.get("market_cap"),
+                    "volumen_24h": coin.get("total_volume"),
+                    "cambio_24h": coin.get("price_change_percentage_24h"),
+                    "imagen": coin.get("image"),
+                    "moneda": vs_currency.upper()
+                })
+            return results
         except Exception as e:
             raise ValueError(f"Error fetching top cryptos: {str(e)}")
     
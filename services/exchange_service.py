@@ -1,6 +1,8 @@
-import httpx
 from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from datetime import timedelta
+
+from .cache import QuoteCache
+from .http_client import get_http_client
 
 class ExchangeService:
     """
@@ -10,37 +12,23 @@ class ExchangeService:
     
     BASE_URL = "https://dolarapi.com/v1"
     CACHE_DURATION = timedelta(minutes=15)  # Cache for 15 minutes
+    STALE_DURATION = timedelta(hours=1)  # Served while a background refresh runs
     
     def __init__(self):
-        self._cache: Dict[str, tuple[datetime, Any]] = {}
-    
-    def _get_cached(self, key: str) -> Any:
-        """Get cached data if still valid"""
-        if key in self._cache:
-            timestamp, data = self._cache[key]
-            if datetime.now() - timestamp < self.CACHE_DURATION:
-                return data
-        return None
-    
-    def _set_cache(self, key: str, data: Any):
-        """Set cache data"""
-        self._cache[key] = (datetime.now(), data)
+        self._cache = QuoteCache(
+            "exchange", self.CACHE_DURATION, self.STALE_DURATION, hot_keys=("all_dolares",), max_entries=50
+        )
     
     async def get_all_dolares(self) -> List[Dict[str, Any]]:
         """Get all USD/ARS exchange rates"""
-        cache_key = "all_dolares"
-        cached = self._get_cached(cache_key)
-        if cached:
-            return cached
-        
+        return await self._cache.get_or_fetch("all_dolares", self._fetch_all_dolares)
+    
+    async def _fetch_all_dolares(self) -> List[Dict[str, Any]]:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.BASE_URL}/dolares", timeout=10.0)
-                response.raise_for_status()
-                data = response.json()
-                
-                self._set_cache(cache_key, data)
-                return data
+            client = get_http_client("dolarapi")
+            response = await client.get(f"{self.BASE_URL}/dolares")
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
             raise ValueError(f"Error fetching exchange rates: {str(e)}")
     
@@ -54,30 +42,26 @@ class ExchangeService:
         Returns:
             Dict with compra, venta, fechaActualizacion
         """
-        cache_key = f"dolar_{tipo}"
-        cached = self._get_cached(cache_key)
-        if cached:
-            return cached
-        
+        return await self._cache.get_or_fetch(f"dolar_{tipo}", lambda: self._fetch_dolar_especifico(tipo))
+    
+    async def _fetch_dolar_especifico(self, tipo: str) -> Dict[str, Any]:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.BASE_URL}/dolares/{tipo}", timeout=10.0)
-                response.raise_for_status()
-                data = response.json()
-                
-                # Normalize response
-                result = {
-                    "tipo": tipo,
-                    "moneda": data.get("moneda", "USD"),
-                    "casa": data.get("casa", tipo),
-                    "nombre": data.get("nombre", tipo.title()),
-                    "compra": data.get("compra"),
-                    "venta": data.get("venta"),
-                    "fecha_actualizacion": data.get("fechaActualizacion")
-                }
+            client = get_http_client("dolarapi")
+            response = await client.get(f"{self.BASE_URL}/dolares/{tipo}")
+            response.raise_for_status()
+            data = response.json()
                 
-                self._set_cache(cache_key, result)
-                return result
+            # Normalize response
+            result = {
+                "tipo": tipo,
+                "moneda": data.get("moneda", "USD"),
+                "casa": data.get("casa", tipo),
+                "nombre": data.get("nombre", tipo.title()),
+                "compra": data.get("compra"),
+                "venta": data.get("venta"),
+                "fecha_actualizacion": data.get("fechaActualizacion")
+            }
+            return result
         except Exception as e:
             raise ValueError(f"Error fetching {tipo} rate: {str(e)}")
     
@@ -0,0 +1,117 @@
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from .cafci import normalize_string
+
+_TOKEN = re.compile(r"\w+")
+
+
+def _clave(value: Any) -> Optional[str]:
+    """Lookup key the way the linear searches compared ids: str() and strip()."""
+    if value is None:
+        return None
+    return str(value).strip()
+
+
+class NameIndex:
+    """
+    Accent-folded inverted token index over a list of names, answering the
+    catalog's AND-keyword queries: every keyword must appear in the name as
+    a substring, ignoring case and accents.
+
+    A keyword only matches inside a name if each of its word pieces lies in
+    one of the name's tokens, so candidates come from the posting lists of
+    the vocabulary tokens containing each piece (a scan of the vocabulary,
+    not of the names) and only those candidates are checked against the
+    folded names.
+    """
+
+    def __init__(self, names: Iterable[Optional[str]]):
+        self.folded = [normalize_string(name or "") for name in names]
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for position, folded in enumerate(self.folded):
+            for token in dict.fromkeys(_TOKEN.findall(folded)):
+                postings[token].append(position)
+        self._postings = dict(postings)
+        self._memo: Dict[str, frozenset] = {}
+
+    def _candidates(self, piece: str) -> frozenset:
+        found = self._memo.get(piece)
+        if found is None:
+            found = frozenset(
+                position
+                for token, positions in self._postings.items() if piece in token
+                for position in positions
+            )
+            if len(self._memo) < 4096:
+                self._memo[piece] = found
+        return found
+
+    def search(self, keywords: List[str]) -> List[int]:
+        """Positions, in catalog order, of the names containing every keyword."""
+        folded_keywords = [normalize_string(kw) for kw in keywords]
+        candidates: Optional[frozenset] = None
+        for piece in {piece for kw in folded_keywords for piece in _TOKEN.findall(kw)}:
+            matches = self._candidates(piece)
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return []
+
+        positions = range(len(self.folded)) if candidates is None else sorted(candidates)
+        return [p for p in positions if all(kw in self.folded[p] for kw in folded_keywords)]
+
+
+class FCICatalogIndex:
+    """
+    Lookup structures over one load of the CAFCI fondo list (FCIService.fetch_catalog):
+    fondos by codigoCNV, clase_fondos by id and by fondoId, and a NameIndex
+    over fondo and clase names. `project_fondo` / `project_clase` build the
+    response dicts once per load; searches return those same dicts.
+    """
+
+    def __init__(self, catalog: List[Dict[str, Any]], project_fondo, project_clase):
+        self.fondos = [project_fondo(fondo) for fondo in catalog]
+        clases_raw = [cf for fondo in catalog for cf in (fondo.get("clase_fondos") or [])]
+        self.clases = [project_clase(cf) for cf in clases_raw]
+
+        self._fondos_por_cnv: Dict[str, List[int]] = defaultdict(list)
+        for position, fondo in enumerate(catalog):
+            codigo = _clave(fondo.get("codigoCNV"))
+            if codigo is not None:
+                self._fondos_por_cnv[codigo].append(position)
+
+        self._clases_por_id: Dict[str, List[int]] = defaultdict(list)
+        self._clases_por_fondo: Dict[str, List[int]] = defaultdict(list)
+        for position, cf in enumerate(clases_raw):
+            self._clases_por_id[_clave(cf.get("id", ""))].append(position)
+            self._clases_por_fondo[_clave(cf.get("fondoId", ""))].append(position)
+
+        self._nombres_fondo = NameIndex(fondo.get("nombre") for fondo in catalog)
+        self._nombres_clase = NameIndex(cf.get("nombre") for cf in clases_raw)
+
+    @staticmethod
+    def _intersect(*groups: Optional[Iterable[int]]) -> Optional[List[int]]:
+        """Positions present in every non-None group, in catalog order; None if all are None."""
+        result: Optional[set] = None
+        for group in groups:
+            if group is not None:
+                result = set(group) if result is None else result & set(group)
+        return None if result is None else sorted(result)
+
+    def search_fondos(self, codigo_cnv: str = "", keywords: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        positions = self._intersect(
+            self._fondos_por_cnv.get(codigo_cnv, []) if codigo_cnv else None,
+            self._nombres_fondo.search(keywords) if keywords else None,
+        )
+        return [self.fondos[p] for p in (positions if positions is not None else range(len(self.fondos)))]
+
+    def search_clases(
+        self, id: str = "", fondo_id: str = "", keywords: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        positions = self._intersect(
+            self._clases_por_id.get(id, []) if id else None,
+            self._clases_por_fondo.get(fondo_id, []) if fondo_id else None,
+            self._nombres_clase.search(keywords) if keywords else None,
+        )
+        return [self.clases[p] for p in (positions if positions is not None else range(len(self.clases)))]
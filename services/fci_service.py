@@ -3,6 +3,9 @@ import logging
 from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
 
+from .cache import QuoteCache
+from .http_client import get_http_client
+
 logger = logging.getLogger("services.fci_service")
 
 
@@ -34,7 +37,8 @@ class FCIService:
         "&order=clase_fondos.nombre"
     )
     CACHE_DURATION = timedelta(minutes=15)
-    LIST_CACHE_DURATION = timedelta(hours=24)
+    # How long past expiry a quote is still served while a background refresh runs
+    STALE_DURATION = timedelta(hours=1)
 
     HEADERS = {
         "User-Agent": (
@@ -51,18 +55,7 @@ class FCIService:
     }
 
     def __init__(self):
-        self._cache: Dict[str, tuple[datetime, Any]] = {}
-        self._list_cache: Optional[tuple[datetime, List[Dict[str, Any]]]] = None
-
-    def _get_cached(self, key: str) -> Any:
-        if key in self._cache:
-            timestamp, data = self._cache[key]
-            if datetime.now() - timestamp < self.CACHE_DURATION:
-                return data
-        return None
-
-    def _set_cache(self, key: str, data: Any):
-        self._cache[key] = (datetime.now(), data)
+        self._cache = QuoteCache("fci", self.CACHE_DURATION, self.STALE_DURATION)
 
     @staticmethod
     def _validate_numeric(value: str, field: str) -> str:
@@ -99,13 +92,14 @@ class FCIService:
         fondo_id_v = self._validate_numeric(fondo_id, "fondo_id")
         clase_id_v = self._validate_numeric(clase_id, "clase_id")
 
-        cache_key = f"fci_{fondo_id_v}_{clase_id_v}"
-        cached = self._get_cached(cache_key)
-        if cached:
-            if log:
-                logger.info(f"FCI get_quote cache hit for {fondo_id_v}/{clase_id_v}")
-            return cached
+        quote, origen = await self._cache.get_or_fetch_with_source(
+            f"fci_{fondo_id_v}_{clase_id_v}", lambda: self._fetch_quote(fondo_id_v, clase_id_v, log)
+        )
+        if log and origen != "upstream":
+            logger.info(f"FCI get_quote served {fondo_id_v}/{clase_id_v} from cache ({origen})")
+        return quote
 
+    async def _fetch_quote(self, fondo_id_v: str, clase_id_v: str, log: bool) -> Dict[str, Any]:
         ficha_url = self.FICHA_URL.format(fondo_id=fondo_id_v, clase_id=clase_id_v)
         api_url = self.API_URL.format(fondo_id=fondo_id_v, clase_id=clase_id_v)
 
@@ -114,20 +108,20 @@ class FCIService:
             logger.info(f"FCI get_quote will call ficha_url={ficha_url} and api_url={api_url}")
 
         try:
-            async with httpx.AsyncClient(follow_redirects=True, timeout=15.0) as client:
-                ficha_resp = await client.get(ficha_url, headers=self.HEADERS)
-                if log:
-                    logger.info(f"HTTP GET {ficha_url} -> status={ficha_resp.status_code}, bytes={len(ficha_resp.content) if ficha_resp.content is not None else 0}")
-                if ficha_resp.status_code >= 400:
-                    raise ValueError(
-                        f"CAFCI ficha page returned status {ficha_resp.status_code} "
-                        f"for fondo_id={fondo_id_v} clase_id={clase_id_v}"
-                    )
-
-                api_headers = {**self.HEADERS, "Accept": "application/json", "Referer": ficha_url}
-                api_resp = await client.get(api_url, headers=api_headers)
-                if log:
-                    logger.info(f"HTTP GET {api_url} -> status={api_resp.status_code}, bytes={len(api_resp.content) if api_resp.content is not None else 0}")
+            client = get_http_client("cafci")
+            ficha_resp = await client.get(ficha_url, headers=self.HEADERS)
+            if log:
+                logger.info(f"HTTP GET {ficha_url} -> status={ficha_resp.status_code}, bytes={len(ficha_resp.content) if ficha_resp.content is not None else 0}")
+            if ficha_resp.status_code >= 400:
+                raise ValueError(
+                    f"CAFCI ficha page returned status {ficha_resp.status_code} "
+                    f"for fondo_id={fondo_id_v} clase_id={clase_id_v}"
+                )
+
+            api_headers = {**self.HEADERS, "Accept": "application/json", "Referer": ficha_url}
+            api_resp = await client.get(api_url, headers=api_headers)
+            if log:
+                logger.info(f"HTTP GET {api_url} -> status={api_resp.status_code}, bytes={len(api_resp.content) if api_resp.content is not None else 0}")
         except httpx.RequestError as e:
             logger.exception("FCI get_quote network error")
             raise ConnectionError(
@@ -181,31 +175,22 @@ class FCIService:
         }
         if log:
             logger.info(f"FCI get_quote result for {fondo_id_v}/{clase_id_v}: vcp_unitario={vcp_unitario}, fecha={result.get('fecha')}")
-        self._set_cache(cache_key, result)
         return result
 
-    async def list_all(self, clear_cache: bool = False, log: bool = False) -> List[Dict[str, Any]]:
+    async def fetch_catalog(self, log: bool = False) -> List[Dict[str, Any]]:
         """
-        Fetch the full FCI catalog from CAFCI.
-
-        Cached for 24 hours; pass clear_cache=True to force a refresh.
+        Download the full FCI catalog (>1000 entities with all includes) from
+        CAFCI, uncached: CatalogoCAFCI loads it into the shared catalog.
         If log=True, only log the number of entities returned (do not log full payload).
         """
-        if not clear_cache and self._list_cache is not None:
-            ts, data = self._list_cache
-            if datetime.now() - ts < self.LIST_CACHE_DURATION:
-                if log:
-                    logger.info(f"FCI list_all cache hit -> {len(data)} entities")
-                return data
-
         headers = {**self.HEADERS, "Accept": "application/json"}
         try:
-            async with httpx.AsyncClient(follow_redirects=True, timeout=60.0) as client:
-                resp = await client.get(self.LIST_URL, headers=headers)
-                if log:
-                    logger.info(f"HTTP GET LIST_URL -> status={resp.status_code}, bytes={len(resp.content) if resp.content is not None else 0}")
+            client = get_http_client("cafci")
+            resp = await client.get(self.LIST_URL, headers=headers, timeout=60.0)
+            if log:
+                logger.info(f"HTTP GET LIST_URL -> status={resp.status_code}, bytes={len(resp.content) if resp.content is not None else 0}")
         except httpx.RequestError as e:
-            logger.exception("FCI list_all network error")
+            logger.exception("FCI catalog network error")
             raise ConnectionError(f"Error reaching CAFCI fondo list: {str(e)}")
 
         if resp.status_code >= 400:
@@ -220,11 +205,16 @@ class FCIService:
             raise ValueError("CAFCI fondo list reported failure")
 
         data = payload.get("data") or []
-        self._list_cache = (datetime.now(), data)
         if log:
-            logger.info(f"FCI list_all returned {len(data)} entities")
+            logger.info(f"FCI catalog returned {len(data)} entities")
         return data
 
+    @staticmethod
+    def _catalogo():
+        # Imported here: the catalog module loads the fondo list through this service
+        from .catalogo_cafci import get_catalogo_cafci
+        return get_catalogo_cafci()
+
     @staticmethod
     def _parse_keywords(raw: Optional[str]) -> List[str]:
         """Split a comma-separated keyword list, trim, drop empties."""
@@ -232,16 +222,6 @@ class FCIService:
             return []
         return [kw.strip() for kw in raw.split(",") if kw.strip()]
 
-    @staticmethod
-    def _name_matches(name: Optional[str], keywords: List[str]) -> bool:
-        """All keywords must appear in `name` (case-insensitive)."""
-        if not keywords:
-            return True
-        if not name:
-            return False
-        haystack = name.lower()
-        return all(kw.lower() in haystack for kw in keywords)
-
     @staticmethod
     def _opt_str(value: Any) -> Optional[str]:
         """Return None for None values; everything else becomes str()."""
@@ -284,9 +264,9 @@ class FCIService:
         Args:
             codigo_cnv: optional exact CNV code.
             nombre: optional comma-separated keyword list. Every keyword must
-                appear in the fund's `nombre` (case-insensitive).
-            clear_cache: if True, refresh the catalog cache (24h) and this
-                search's result cache before searching.
+                appear in the fund's `nombre` (ignoring case and accents).
+            clear_cache: if True, reload the CAFCI catalog (see CatalogoCAFCI)
+                before searching.
 
         Returns:
             List of dicts, each with `codigoCNV`, `nombre` and a `clase_fondos`
@@ -300,30 +280,11 @@ class FCIService:
                 "at least one of codigoCNV or nombre must be provided"
             )
 
-        norm_keywords = ",".join(sorted(kw.lower() for kw in keywords))
-        cache_key = f"fci_search_{code}|{norm_keywords}"
-
-        if not clear_cache:
-            cached = self._get_cached(cache_key)
-            if cached is not None:
-                if log:
-                    logger.info(f"FCI search cache hit for key={cache_key} -> {len(cached)} results")
-                return cached
-
-        catalog = await self.list_all(clear_cache=clear_cache, log=log)
-
-        matches: List[Dict[str, Any]] = []
-        for entity in catalog:
-            if code:
-                entity_code = entity.get("codigoCNV")
-                if entity_code is None or str(entity_code).strip() != code:
-                    continue
-            if keywords and not self._name_matches(entity.get("nombre"), keywords):
-                continue
-
-            matches.append(self._project_fondo(entity))
-
-        self._set_cache(cache_key, matches)
+        matches = await self._catalogo().search_fondos(
+            codigo_cnv=code, keywords=keywords, refresh=clear_cache, log=log
+        )
+        if log:
+            logger.info(f"FCI search codigoCNV={code!r} keywords={keywords} -> {len(matches)} results")
         return matches
 
     async def search_clase_fondos(
@@ -342,10 +303,10 @@ class FCIService:
         Args:
             id: optional exact clase_fondo id.
             nombre: optional comma-separated keyword list. Every keyword must
-                appear in the clase_fondo's `nombre` (case-insensitive).
+                appear in the clase_fondo's `nombre` (ignoring case and accents).
             fondo_id: optional parent fondo id (matches `clase_fondo.fondoId`).
-            clear_cache: if True, refresh the catalog cache (24h) and this
-                search's result cache before searching.
+            clear_cache: if True, reload the CAFCI catalog (see CatalogoCAFCI)
+                before searching.
 
         Returns:
             List of dicts with `id`, `nombre`, `monedaId`, `fondoId`.
@@ -359,30 +320,11 @@ class FCIService:
                 "at least one of id, nombre, or fondoId must be provided"
             )
 
-        norm_keywords = ",".join(sorted(kw.lower() for kw in keywords))
-        cache_key = f"cf_search_{cf_id}|{parent_id}|{norm_keywords}"
-
-        if not clear_cache:
-            cached = self._get_cached(cache_key)
-            if cached is not None:
-                if log:
-                    logger.info(f"FCI search_clase_fondos cache hit for key={cache_key} -> {len(cached)} results")
-                return cached
-
-        catalog = await self.list_all(clear_cache=clear_cache, log=log)
-
-        matches: List[Dict[str, Any]] = []
-        for fondo in catalog:
-            for cf in (fondo.get("clase_fondos") or []):
-                if cf_id and str(cf.get("id", "")).strip() != cf_id:
-                    continue
-                if parent_id and str(cf.get("fondoId", "")).strip() != parent_id:
-                    continue
-                if keywords and not self._name_matches(cf.get("nombre"), keywords):
-                    continue
-                matches.append(self._project_clase_fondo(cf))
-
-        self._set_cache(cache_key, matches)
+        matches = await self._catalogo().search_clase_fondos(
+            id=cf_id, fondo_id=parent_id, keywords=keywords, refresh=clear_cache, log=log
+        )
+        if log:
+            logger.info(f"FCI search_clase_fondos id={cf_id!r} fondoId={parent_id!r} keywords={keywords} -> {len(matches)} results")
         return matches
 
 
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from config import env_bool, env_float
+
+try:
+    import h2  # noqa: F401 - httpx only negotiates HTTP/2 when it is installed
+except ImportError:  # HTTP/1.1 keep-alive only
+    h2 = None
+
+logger = logging.getLogger("services.http_client")
+
+
+@dataclass(frozen=True)
+class Upstream:
+    timeout: float
+    follow_redirects: bool = False
+
+
+# One pooled client per upstream; the timeouts are the ones each service used per call
+UPSTREAMS: Dict[str, Upstream] = {
+    "dolarapi": Upstream(timeout=10.0),
+    "coingecko": Upstream(timeout=10.0),
+    "iol": Upstream(timeout=10.0, follow_redirects=True),
+    # www.cafci.org.ar + api.pub.cafci.org.ar share a client so the ficha cookies reach the API
+    "cafci": Upstream(timeout=15.0, follow_redirects=True),
+    "cafci_estadisticas": Upstream(timeout=30.0),
+    "cafci_planilla": Upstream(timeout=30.0, follow_redirects=True),
+}
+
+
+
+
+def _client_kwargs(nombre: str, upstream: Upstream) -> dict:
+    """
+    Client options from the environment:
+      HTTP_MAX_CONNECTIONS      open connections per upstream, default 10
+      HTTP_MAX_KEEPALIVE        idle connections kept per upstream, default 5
+      HTTP_KEEPALIVE_EXPIRY     seconds an idle connection is kept, default 60
+      HTTP_CONNECT_TIMEOUT      seconds to open a connection, default 5
+      HTTP_TIMEOUT_<UPSTREAM>   read/write/pool timeout, e.g. HTTP_TIMEOUT_CAFCI=20;
+                                defaults to the upstream's timeout in UPSTREAMS
+      HTTP2                     offer HTTP/2 (needs the h2 package), default on; upstreams
+                                that do not support it fall back to HTTP/1.1 via ALPN
+    """
+    timeout = env_float(f"HTTP_TIMEOUT_{nombre.upper()}", upstream.timeout)
+    return {
+        "http2": h2 is not None and env_bool("HTTP2", True),
+        "follow_redirects": upstream.follow_redirects,
+        "timeout": httpx.Timeout(timeout, connect=min(timeout, env_float("HTTP_CONNECT_TIMEOUT", 5.0))),
+        "limits": httpx.Limits(
+            max_connections=int(env_float("HTTP_MAX_CONNECTIONS", 10)),
+            max_keepalive_connections=int(env_float("HTTP_MAX_KEEPALIVE", 5)),
+            keepalive_expiry=env_float("HTTP_KEEPALIVE_EXPIRY", 60.0),
+        ),
+    }
+
+
+# nombre -> (event loop the client's connections belong to, client)
+_clients: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def get_http_client(nombre: str) -> httpx.AsyncClient:
+    """
+    Shared AsyncClient for an upstream in UPSTREAMS, created on first use and
+    reused so warm calls skip DNS, TCP and TLS. Pooled connections belong to
+    the event loop that opened them: a call from a different loop gets a fresh
+    client. Do not close it after a request; close_http_clients() does that at
+    app shutdown.
+    """
+    loop = asyncio.get_running_loop()
+    actual = _clients.get(nombre)
+    if actual is not None:
+        client_loop, client = actual
+        if client_loop is loop and not client.is_closed:
+            return client
+        if not client_loop.is_closed():
+            logger.debug(f"HTTP client '{nombre}' belongs to another event loop, creating a new one")
+
+    upstream = UPSTREAMS.get(nombre)
+    if upstream is None:
+        raise KeyError(f"Unknown upstream '{nombre}'")
+    client = httpx.AsyncClient(**_client_kwargs(nombre, upstream))
+    _clients[nombre] = (loop, client)
+    return client
+
+
+async def close_http_clients():
+    """Close every pooled client opened on the running event loop (app lifespan shutdown)."""
+    loop = asyncio.get_running_loop()
+    for nombre, (client_loop, client) in list(_clients.items()):
+        if client_loop is loop:
+            await client.aclose()
+        del _clients[nombre]
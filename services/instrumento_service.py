@@ -3,6 +3,9 @@ import httpx
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 
+from .cache import QuoteCache
+from .http_client import get_http_client
+
 
 class InstrumentoService:
     """
@@ -19,6 +22,8 @@ class InstrumentoService:
 
     BASE_URL = "https://iol.invertironline.com/titulo/cotizacion/BCBA/{ticker}"
     CACHE_DURATION = timedelta(minutes=2)
+    # No longer than the TTL: a price served stale is at most 4 minutes old
+    STALE_DURATION = timedelta(minutes=2)
 
     # Outer container that wraps both the currency symbol and the price.
     # The lazy `.*?</span>` plus `\s*</span>` anchors on two consecutive closing
@@ -49,17 +54,7 @@ class InstrumentoService:
     }
 
     def __init__(self):
-        self._cache: Dict[str, tuple[datetime, Any]] = {}
-
-    def _get_cached(self, key: str) -> Any:
-        if key in self._cache:
-            timestamp, data = self._cache[key]
-            if datetime.now() - timestamp < self.CACHE_DURATION:
-                return data
-        return None
-
-    def _set_cache(self, key: str, data: Any):
-        self._cache[key] = (datetime.now(), data)
+        self._cache = QuoteCache("instrumento", self.CACHE_DURATION, self.STALE_DURATION)
 
     @staticmethod
     def _parse_ar_number(raw: str) -> float:
@@ -99,16 +94,14 @@ class InstrumentoService:
         if not ticker_upper:
             raise ValueError("ticker must not be empty")
 
-        cache_key = f"instrumento_{ticker_upper}"
-        cached = self._get_cached(cache_key)
-        if cached:
-            return cached
+        return await self._cache.get_or_fetch(f"instrumento_{ticker_upper}", lambda: self._fetch_price(ticker_upper))
 
+    async def _fetch_price(self, ticker_upper: str) -> Dict[str, Any]:
         url = self.BASE_URL.format(ticker=ticker_upper)
 
         try:
-            async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
-                response = await client.get(url, headers=self.HEADERS)
+            client = get_http_client("iol")
+            response = await client.get(url, headers=self.HEADERS)
         except httpx.RequestError as e:
             raise ConnectionError(f"Error reaching IOL page for '{ticker_upper}': {str(e)}")
 
@@ -152,7 +145,6 @@ class InstrumentoService:
             "url": url,
             "fecha_consulta": datetime.now().isoformat(timespec="seconds"),
         }
-        self._set_cache(cache_key, result)
         return result
 
 
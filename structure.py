@@ -1,5 +1,5 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import DateTime, String, Text, Boolean, ForeignKey
+from sqlalchemy import DateTime, String, Text, Boolean, ForeignKey, Index, Integer, text
 from sqlalchemy.dialects.postgresql import UUID
 from typing import Optional
 from datetime import datetime
@@ -11,12 +11,21 @@ class CategoriaDeletionError(Exception):
 class SubcategoriaDeletionError(Exception):
     pass
 
+class InvalidCursorError(ValueError):
+    pass
+
+class InvalidQueryParamError(ValueError):
+    pass
+
 class Base(DeclarativeBase):
     pass
 
 class Categoria(Base):
     __tablename__ = "finanzas_categoria"
-    __table_args__ = { 'schema': 'misgestiones'}
+    __table_args__ = (
+        Index("idx_categoria_nombre_trgm", "nombre", postgresql_using="gin", postgresql_ops={"nombre": "gin_trgm_ops"}),
+        { 'schema': 'misgestiones'},
+    )
 
     id: Mapped[str] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nombre: Mapped[str] = mapped_column(String(255))
@@ -29,7 +38,10 @@ class Categoria(Base):
 
 class Subcategoria(Base):
     __tablename__ = "finanzas_subcategoria"
-    __table_args__ = { 'schema': 'misgestiones'}
+    __table_args__ = (
+        Index("idx_subcategoria_nombre_trgm", "nombre", postgresql_using="gin", postgresql_ops={"nombre": "gin_trgm_ops"}),
+        { 'schema': 'misgestiones'},
+    )
 
     id: Mapped[str] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nombre: Mapped[str] = mapped_column(String(255))
@@ -56,22 +68,51 @@ class DetalleSubcategoria(Base):
 
 class MovimientoGasto(Base):
     __tablename__ = "finanzas_movimientogasto"
-    __table_args__ = { 'schema': 'misgestiones'}
-
+    # Partial on active because every screen filters active = true. The (fecha, id)
+    # index is read backwards for the default ORDER BY fecha DESC, id DESC pages.
+    # Created by the migrations in migrations/versions.
+    __table_args__ = (
+        Index("idx_movimientogasto_activo_fecha", "fecha", "id", postgresql_where=text("active")),
+        Index("idx_movimientogasto_activo_subcategoria_fecha", "subcategoria", "fecha", postgresql_where=text("active")),
+        Index("idx_movimientogasto_comentarios_trgm", "comentarios", postgresql_using="gin", postgresql_ops={"comentarios": "gin_trgm_ops"}),
+        { 'schema': 'misgestiones'},
+    )
+
+    # active_history on the columns that key MovimientoGastoResumenMensual so the
+    # previous values are available when the rollup is adjusted on flush
     id: Mapped[str] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    subcategoriaId: Mapped[str] = mapped_column('subcategoria', ForeignKey("misgestiones.finanzas_subcategoria.id"))
+    subcategoriaId: Mapped[str] = mapped_column('subcategoria', ForeignKey("misgestiones.finanzas_subcategoria.id"), active_history=True)
     subcategoria: Mapped[Subcategoria] = relationship()
     detalleSubcategoriaId: Mapped[Optional[str]] = mapped_column('detallesubcategoria', ForeignKey("misgestiones.finanzas_detallesubcategoria.id"), nullable=True)
     detalleSubcategoria: Mapped[Optional[DetalleSubcategoria]] = relationship()
-    tipoDePago: Mapped[str] = mapped_column("tipodepago", String(255))
-    monto: Mapped[float] = mapped_column()
+    tipoDePago: Mapped[str] = mapped_column("tipodepago", String(255), active_history=True)
+    monto: Mapped[float] = mapped_column(active_history=True)
     comentarios: Mapped[Optional[str]] = mapped_column(Text)
-    fecha: Mapped[Optional[datetime]] = mapped_column(DateTime)
-    active: Mapped[bool] = mapped_column(Boolean, default=True)
+    fecha: Mapped[Optional[datetime]] = mapped_column(DateTime, active_history=True)
+    active: Mapped[bool] = mapped_column(Boolean, default=True, active_history=True)
+
+class MovimientoGastoResumenMensual(Base):
+    """
+    Monthly totals of active movimientos per subcategoria and tipoDePago.
+    Kept current by db.py on every flush; rebuilt from scratch with
+    reconstruir_resumen_mensual.py. Movimientos without fecha are not included.
+    """
+    __tablename__ = "finanzas_movimientogasto_resumenmensual"
+    __table_args__ = { 'schema': 'misgestiones'}
+
+    mes: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    subcategoriaId: Mapped[str] = mapped_column('subcategoria', ForeignKey("misgestiones.finanzas_subcategoria.id"), primary_key=True)
+    tipoDePago: Mapped[str] = mapped_column("tipodepago", String(255), primary_key=True)
+    total: Mapped[float] = mapped_column(default=0)
+    cantidad: Mapped[int] = mapped_column(Integer, default=0)
 
 class Vencimiento(Base):
     __tablename__ = "finanzas_vencimiento"
-    __table_args__ = { 'schema': 'misgestiones'}
+    __table_args__ = (
+        Index("idx_vencimiento_activo_fecha", "fecha", "id", postgresql_where=text("active")),
+        Index("idx_vencimiento_comentarios_trgm", "comentarios", postgresql_using="gin", postgresql_ops={"comentarios": "gin_trgm_ops"}),
+        { 'schema': 'misgestiones'},
+    )
 
     id: Mapped[str] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     subcategoriaId: Mapped[str] = mapped_column('subcategoria', ForeignKey("misgestiones.finanzas_subcategoria.id"))
@@ -88,7 +129,11 @@ class Vencimiento(Base):
 
 class Instrumento(Base):
     __tablename__ = "instrumento"
-    __table_args__ = { 'schema': 'inversiones'}
+    __table_args__ = (
+        Index("idx_instrumento_codigo", "codigo"),
+        Index("idx_instrumento_nombre_trgm", "nombre", postgresql_using="gin", postgresql_ops={"nombre": "gin_trgm_ops"}),
+        { 'schema': 'inversiones'},
+    )
 
     id: Mapped[str] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nombre: Mapped[str] = mapped_column(String(256))
@@ -109,7 +154,11 @@ class Instrumento(Base):
 
 class Precio(Base):
     __tablename__ = "precio"
-    __table_args__ = { 'schema': 'inversiones'}
+    # Latest prices per instrumento: WHERE instrumento_id IN (...) ORDER BY fecha DESC
+    __table_args__ = (
+        Index("idx_precio_instrumento_fecha", "instrumento_id", text("fecha DESC")),
+        { 'schema': 'inversiones'},
+    )
 
     id: Mapped[str] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     active: Mapped[bool] = mapped_column(Boolean, default=True)